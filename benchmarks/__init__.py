@@ -0,0 +1,52 @@
+"""
+Micro-benchmarks, run with `python -m benchmarks.<name>`.
+"""
+from datetime import datetime, timedelta
+from statistics import median
+from time import perf_counter
+from typing import Any, Callable
+
+from schoolsyst_api import codec
+from schoolsyst_api.homework.models import Homework, HomeworkType, Task
+from schoolsyst_api.models import objectkey, userkey
+
+
+def make_homework_documents(count: int) -> list[dict[str, Any]]:
+    """
+    Documents as read from the database, stored like `ResourceRoutesGenerator.create`
+    does it.
+    """
+    owner_key = userkey()
+    subject_key = objectkey(owner_key)
+    return [
+        codec.loads(
+            codec.dumps(
+                Homework(
+                    owner_key=owner_key,
+                    title=f"Homework #{i}",
+                    subject_key=subject_key,
+                    type=list(HomeworkType)[i % len(HomeworkType)],
+                    details="Exercises 1 to 5, page 42",
+                    due_at=datetime.now() + timedelta(days=i % 30),
+                    tasks=[
+                        Task(title=f"Exercise {n}", completed=n < i % 5)
+                        for n in range(5)
+                    ],
+                ).to_db()
+            )
+        )
+        for i in range(count)
+    ]
+
+
+def measure(function: Callable[[Any], Any], values: list, samples: int) -> float:
+    """
+    Median time (in seconds) it takes to call `function` on every value.
+    """
+    timings = []
+    for _ in range(samples):
+        start = perf_counter()
+        for value in values:
+            function(value)
+        timings.append(perf_counter() - start)
+    return median(timings)
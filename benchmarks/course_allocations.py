@@ -0,0 +1,188 @@
+"""
+Compares the models built, and the memory allocated, while generating the courses
+of a school year, when courses and their mutated ranges are pydantic models the
+whole way through, and when they are tuples turned into models once done:
+
+    python -m benchmarks.course_allocations --events 30
+"""
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterator, Optional
+
+from pydantic import BaseModel as PydanticBaseModel
+from schoolsyst_api.models import DatetimeRange, userkey
+from schoolsyst_api.schedule.courses import (
+    Occurrence,
+    course_object_key,
+    days_between,
+    generate_courses,
+)
+from schoolsyst_api.schedule.models import Course, EventMutation
+from schoolsyst_api.schedule.mutations import MutationIndex
+from schoolsyst_api.schedule.template import WeeklyTemplate
+from schoolsyst_api.settings.models import Settings
+
+from benchmarks import measure
+from benchmarks.course_expansion import YEAR, make_events
+
+
+def make_mutations(owner_key: str, events: list, count: int) -> list[EventMutation]:
+    """
+    `count` reschedulings of courses, an hour later, spread over the year.
+    """
+    mutations = []
+    for i in range(count):
+        event = events[i % len(events)]
+        day = YEAR.start + timedelta(weeks=i % 40, days=event.day - 1)
+        start = datetime.combine(day, event.start)
+        mutations.append(
+            EventMutation(
+                owner_key=owner_key,
+                event_key=event._key,
+                deleted_in=DatetimeRange(start=start, end=start + timedelta(hours=1)),
+                added_in=DatetimeRange(
+                    start=start + timedelta(hours=1), end=start + timedelta(hours=2)
+                ),
+            )
+        )
+    return mutations
+
+
+def with_models(
+    owner_key: str, user_settings: Settings, events: list, mutations: MutationIndex
+) -> list[Course]:
+    """
+    Generation as it was done before courses and ranges were tuples.
+    """
+    template = WeeklyTemplate(events)
+    school_days = user_settings.school_days()
+    courses = []
+    for day in days_between(YEAR.start, YEAR.end):
+        if not school_days.is_school_day(day):
+            continue
+        week_types = frozenset({school_days.week_type(day)})
+        for slot in template.on(day.isoweekday(), week_types):
+            event = slot.event
+            course = Course(
+                object_key=course_object_key(day, event._key),
+                owner_key=owner_key,
+                start=datetime.combine(day, event.start),
+                end=datetime.combine(day, event.end),
+                subject_key=event.subject_key,
+                location=event.location,
+            )
+            for mutation in mutations.on(event._key, day):
+                course.location = mutation.location or course.location
+                course.subject_key = mutation.subject_key or course.subject_key
+                course_daterange = DatetimeRange(start=course.start, end=course.end)
+                if mutation.deleted_in:
+                    course_daterange ^= mutation.deleted_in
+                if mutation.added_in:
+                    course_daterange |= mutation.added_in
+                if course_daterange.duration:
+                    course.start = course_daterange.start
+                    course.end = course_daterange.end
+            courses.append(course)
+    return courses
+
+
+class ModelCount:
+    """
+    Counts the pydantic models built while in use: those that are validated,
+    and those built from trusted values with `construct`.
+    """
+
+    def __init__(self) -> None:
+        self.validated = self.constructed = 0
+
+    def __enter__(self) -> "ModelCount":
+        init = PydanticBaseModel.__init__
+        construct = PydanticBaseModel.__dict__["construct"]
+
+        def counted_init(__pydantic_self__, **data: Any) -> None:
+            self.validated += 1
+            init(__pydantic_self__, **data)
+
+        def counted_construct(cls, *args: Any, **kwargs: Any) -> Any:
+            self.constructed += 1
+            return construct.__func__(cls, *args, **kwargs)
+
+        self.originals = init, construct
+        PydanticBaseModel.__init__ = counted_init
+        PydanticBaseModel.construct = classmethod(counted_construct)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        PydanticBaseModel.__init__, PydanticBaseModel.construct = self.originals
+
+
+def peak_memory(function: Callable[[], Any]) -> int:
+    """
+    Peak memory (in bytes) allocated while `function` ran.
+    """
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = ArgumentParser(prog="python -m benchmarks.course_allocations")
+    parser.add_argument("--events", type=int, default=30)
+    parser.add_argument("--mutations", type=int, default=200)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    owner_key = userkey()
+    user_settings = Settings(_key=owner_key, year_layout=[YEAR])
+    events = make_events(owner_key, args.events)
+    mutations = MutationIndex(make_mutations(owner_key, events, args.mutations))
+
+    def models() -> list[Course]:
+        return with_models(owner_key, user_settings, events, mutations)
+
+    def occurrences() -> Iterator[Occurrence]:
+        return generate_courses(
+            owner_key,
+            user_settings,
+            events,
+            mutations,
+            days_between(YEAR.start, YEAR.end),
+        )
+
+    def tuples() -> list[Occurrence]:
+        return list(occurrences())
+
+    def tuples_then_models() -> list[Course]:
+        now = datetime.now()
+        return [
+            occurrence.course.to_model(created_at=now) for occurrence in occurrences()
+        ]
+
+    count = len(tuples())
+    print(
+        f"A school year of {args.events} weekly events "
+        f"and {args.mutations} mutations ({count} courses):"
+    )
+    print(f"  {'':19}  validated  constructed  {'peak':>12}  {'time':>9}")
+    for name, function in (
+        ("models", models),
+        ("tuples", tuples),
+        ("tuples, then models", tuples_then_models),
+    ):
+        with ModelCount() as built:
+            function()
+        peak = peak_memory(function)
+        duration = measure(lambda _: function(), [None], args.samples)
+        print(
+            f"  {name:19}  {built.validated:9d}  {built.constructed:11d}  "
+            f"{peak / 1024:8.1f} KiB  {duration * 1000:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Compares generating the courses of a school year by looking for the events of each
+day among all of them, and by stamping weekly templates on compiled school days:
+
+    python -m benchmarks.course_expansion --events 30
+"""
+from argparse import ArgumentParser
+from datetime import date, datetime, time
+from typing import Optional
+
+from schoolsyst_api.models import DateRange, WeekType, userkey
+from schoolsyst_api.schedule import current_week_type
+from schoolsyst_api.schedule.courses import (
+    course_object_key,
+    days_between,
+    generate_courses,
+)
+from schoolsyst_api.schedule.models import Course, Event
+from schoolsyst_api.schedule.mutations import MutationIndex
+from schoolsyst_api.settings.models import Settings
+
+from benchmarks import measure
+
+YEAR = DateRange(start=date(2025, 9, 1), end=date(2026, 7, 4))
+
+
+def make_events(owner_key: str, count: int) -> list[Event]:
+    """
+    `count` weekly events spread over the week, a fourth of them every other week.
+    """
+    return [
+        Event(
+            owner_key=owner_key,
+            day=i % 5 + 1,
+            start=time(8 + i // 5),
+            end=time(9 + i // 5),
+            on_even_weeks=i % 4 != 1,
+            on_odd_weeks=i % 4 != 2,
+        )
+        for i in range(count)
+    ]
+
+
+def day_by_day(
+    owner_key: str, user_settings: Settings, events: list[Event]
+) -> list[Course]:
+    """
+    Generation as it was done before weekly templates and compiled school days.
+    """
+    courses = []
+    for day in days_between(YEAR.start, YEAR.end):
+        if not any(day in year_part for year_part in user_settings.year_layout):
+            continue
+        if any(day in offday for offday in user_settings.offdays):
+            continue
+        week_types = [
+            current_week_type(
+                user_settings.starting_week_type, YEAR.start, current_date=day
+            )
+        ]
+        for event in events:
+            if (
+                (event.on_even_weeks and WeekType.even in week_types)
+                or (event.on_odd_weeks and WeekType.odd in week_types)
+            ) and event.day == day.isoweekday():
+                courses.append(
+                    Course(
+                        object_key=course_object_key(day, event._key),
+                        owner_key=owner_key,
+                        start=datetime.combine(day, event.start),
+                        end=datetime.combine(day, event.end),
+                        subject_key=event.subject_key,
+                        location=event.location,
+                    )
+                )
+    return courses
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = ArgumentParser(prog="python -m benchmarks.course_expansion")
+    parser.add_argument("--events", type=int, default=30)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    owner_key = userkey()
+    user_settings = Settings(
+        _key=owner_key,
+        year_layout=[YEAR],
+        offdays=[
+            DateRange(start=date(2025, 10, 18), end=date(2025, 11, 3)),
+            DateRange(start=date(2025, 12, 20), end=date(2026, 1, 5)),
+            DateRange(start=date(2026, 2, 14), end=date(2026, 3, 2)),
+            DateRange(start=date(2026, 4, 11), end=date(2026, 4, 27)),
+        ],
+    )
+    events = make_events(owner_key, args.events)
+    mutations = MutationIndex([])
+
+    def templated(_) -> list[Course]:
+        now = datetime.now()
+        return [
+            occurrence.course.to_model(created_at=now)
+            for occurrence in generate_courses(
+                owner_key,
+                user_settings,
+                events,
+                mutations,
+                days_between(YEAR.start, YEAR.end),
+            )
+        ]
+
+    count = len(templated(None))
+    before = measure(
+        lambda _: day_by_day(owner_key, user_settings, events), [None], args.samples
+    )
+    after = measure(templated, [None], args.samples)
+    print(f"A school year of {args.events} weekly events ({count} courses):")
+    print(f"  day by day  {before * 1000:8.1f} ms")
+    print(f"  templates   {after * 1000:8.1f} ms  ({before / after:.1f}x faster)")
+
+    days = list(days_between(YEAR.start, YEAR.end))
+    school_days = user_settings.school_days()
+    scanned = measure(
+        lambda day: any(day in part for part in user_settings.year_layout)
+        and not any(day in offday for offday in user_settings.offdays),
+        days,
+        args.samples,
+    )
+    compiled = measure(school_days.is_school_day, days, args.samples)
+    print(f"Checking the {len(days)} days of the year:")
+    print(f"  scanning ranges  {scanned * 1000:8.2f} ms")
+    print(
+        f"  compiled         {compiled * 1000:8.2f} ms  "
+        f"({scanned / compiled:.1f}x faster)"
+    )
+
+
+if __name__ == "__main__":
+    main()
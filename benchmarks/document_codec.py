@@ -0,0 +1,44 @@
+"""
+Compares the ways of encoding models into what is sent to the database:
+
+    python -m benchmarks.document_codec --count 5000
+
+- "json round-trip": `json.loads(model.json(by_alias=True))`, then serialized
+  again by the database client with the standard `json` module (the former path)
+- "codec": `model.to_db()`, serialized by the client with `codec.dumps`
+"""
+import json
+from argparse import ArgumentParser
+from typing import Optional
+
+from schoolsyst_api import codec
+from schoolsyst_api.homework.models import Homework
+
+from benchmarks import make_homework_documents, measure
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = ArgumentParser(prog="python -m benchmarks.document_codec")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    homework = [
+        Homework.from_db(document) for document in make_homework_documents(args.count)
+    ]
+    round_trip = measure(
+        lambda model: json.dumps(json.loads(model.json(by_alias=True))),
+        homework,
+        args.samples,
+    )
+    encoded = measure(lambda model: codec.dumps(model.to_db()), homework, args.samples)
+    print(f"{args.count} homework:")
+    print(f"  json round-trip  {round_trip * 1000:8.1f} ms")
+    print(
+        f"  codec            {encoded * 1000:8.1f} ms  "
+        f"({round_trip / encoded:.1f}x faster)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Compares building models from database documents with and without validation:
+
+    python -m benchmarks.trusted_reads --count 5000
+"""
+from argparse import ArgumentParser
+from typing import Optional
+
+from schoolsyst_api.homework.models import Homework
+
+from benchmarks import make_homework_documents, measure
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = ArgumentParser(prog="python -m benchmarks.trusted_reads")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    documents = make_homework_documents(args.count)
+    validated = measure(lambda document: Homework(**document), documents, args.samples)
+    trusted = measure(Homework.from_db, documents, args.samples)
+    print(f"{args.count} homework documents:")
+    print(f"  validated  {validated * 1000:8.1f} ms")
+    print(f"  trusted    {trusted * 1000:8.1f} ms  ({validated / trusted:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
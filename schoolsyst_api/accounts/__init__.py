@@ -1,7 +1,9 @@
 import os
 from datetime import datetime, timedelta
+from time import time
 from typing import Optional
 
+import nanoid
 from arango.database import StandardDatabase
 from fastapi_utils.inferring_router import InferringRouter
 from jose import jwt
@@ -19,12 +21,24 @@ def get_user(db: StandardDatabase, username: str) -> Optional[DBUser]:
     user_dict = db.collection("users").find({"username": username.lower()}).batch()
     if not user_dict:
         return None
-    return DBUser(**user_dict[0])
+    return DBUser.from_db(user_dict[0])
 
 
 def create_jwt_token(sub_format: str, sub_value: str, valid_for: timedelta) -> str:
+    """
+    Creates a token for `sub_format.format(sub_value)`, expiring after `valid_for`.
+    Tokens carry a unique ID (`jti`) and their emission date (`iat`) so that they
+    can be revoked (see `schoolsyst_api.accounts.revocation`).
+    """
     return jwt.encode(
-        {"sub": sub_format.format(sub_value), "exp": datetime.utcnow() + valid_for},
+        {
+            "sub": sub_format.format(sub_value),
+            "exp": datetime.utcnow() + valid_for,
+            # Not rounded to the second, so that tokens emitted right after
+            # a revocation of all of the user's tokens are not revoked
+            "iat": time(),
+            "jti": nanoid.generate(),
+        },
         key=os.getenv("SECRET_KEY"),
         algorithm=JWT_SIGN_ALGORITHM,
     )
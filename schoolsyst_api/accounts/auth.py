@@ -4,7 +4,7 @@ from typing import Any, Literal, Optional, Union
 
 from arango.database import StandardDatabase
 from dotenv import load_dotenv
-from fastapi import Depends, HTTPException, status
+from fastapi import BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from parse import parse
 from passlib.context import CryptContext
@@ -36,12 +36,39 @@ class TokenData(BaseModel):
     username: str
 
 
+# passlib's name for each argon2 parameter -> environment variable
+ARGON2_PARAMETERS_VARIABLES = {
+    "memory_cost": "ARGON2_MEMORY_COST",
+    "rounds": "ARGON2_TIME_COST",
+    "parallelism": "ARGON2_PARALLELISM",
+}
+
+
+def argon2_parameters() -> dict[str, int]:
+    """
+    Argon2 cost parameters, as set in the environment
+    (see `python -m schoolsyst_api.accounts.calibration`).
+    Parameters that are not set are left to passlib's defaults.
+    """
+    parameters = {}
+    for parameter, variable in ARGON2_PARAMETERS_VARIABLES.items():
+        if value := os.getenv(variable):
+            parameters[parameter] = int(value)
+    return parameters
+
+
 # Context for password hashing
-password_context = CryptContext(schemes=["argon2"], deprecated="auto")
+password_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    **{f"argon2__{name}": value for name, value in argon2_parameters().items()},
+)
 
 # Special FastAPI class to inject as a dependency
 # and get appropriate openapi.json integration
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth")
+# For routes that also answer to clients that are not logged in
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth", auto_error=False)
 
 
 def is_password_strong_enough(password_analysis: dict[str, Any]) -> bool:
@@ -108,28 +135,57 @@ def extract_username_from_jwt_payload(payload: dict) -> Optional[str]:
     return username[0]
 
 
+def rehash_password(
+    db: StandardDatabase, user_key: str, old_password_hash: str, plain_password: str
+) -> None:
+    """
+    Replaces the user's password hash with one made using the current argon2 parameters.
+    Does nothing if the password was changed in the meantime.
+    """
+    db.aql.execute(
+        """
+        FOR user IN users
+            FILTER user._key == @key AND user.password_hash == @old_password_hash
+            UPDATE user WITH { password_hash: @new_password_hash } IN users
+        """,
+        bind_vars={
+            "key": user_key,
+            "old_password_hash": old_password_hash,
+            "new_password_hash": hash_password(plain_password),
+        },
+    )
+
+
 def authenticate_user(
-    db: StandardDatabase, username: str, password: str
+    db: StandardDatabase,
+    username: str,
+    password: str,
+    tasks: Optional[BackgroundTasks] = None,
 ) -> Union[DBUser, Literal[False]]:
     """
     Tries to authentificate the user with `username` and `password`.
     Returns `False` if the password is incorrect or if the user is not found.
+    If `tasks` is given and the password hash was made with outdated argon2 parameters,
+    the password is re-hashed in the background.
     """
     user = get_user(db, username)
     if not user:
         return False
     if not verify_password(password, user.password_hash):
         return False
+    if tasks is not None and password_context.needs_update(user.password_hash):
+        tasks.add_task(rehash_password, db, user.key, user.password_hash, password)
     return user
 
 
 @router.post("/auth/")
 async def login(
+    tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: StandardDatabase = Depends(database.get),
 ) -> Token:
     # Try to auth the user
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = authenticate_user(db, form_data.username, form_data.password, tasks)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,116 @@
+"""
+Picks argon2 parameters so that verifying a password takes about `--target-ms`
+milliseconds on the machine this runs on, and stores them in the .env file:
+
+    python -m schoolsyst_api.accounts.calibration --target-ms 250 --write .env
+
+Existing hashes are upgraded to the new parameters the next time their owner logs in
+(see `authenticate_user`), so this can be re-run whenever the hardware changes.
+"""
+import os
+from argparse import ArgumentParser
+from statistics import median
+from time import perf_counter
+from typing import Optional
+
+from dotenv import set_key
+from passlib.hash import argon2
+from schoolsyst_api.accounts.auth import ARGON2_PARAMETERS_VARIABLES
+
+# Lower bounds, as recommended by OWASP (19 MiB, 2 iterations)
+MIN_MEMORY_COST = 19 * 1024
+MIN_TIME_COST = 2
+# Do not make a single login use more than this much memory (in KiB)
+DEFAULT_MAX_MEMORY_COST = 256 * 1024
+CALIBRATION_PASSWORD = "correct-battery-horse-staple"
+
+
+def measure_verify_time(
+    memory_cost: int, time_cost: int, parallelism: int, samples: int = 3
+) -> float:
+    """
+    Median time (in seconds) it takes to verify a password hashed with those parameters.
+    """
+    handler = argon2.using(
+        memory_cost=memory_cost, rounds=time_cost, parallelism=parallelism
+    )
+    password_hash = handler.hash(CALIBRATION_PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = perf_counter()
+        handler.verify(CALIBRATION_PASSWORD, password_hash)
+        timings.append(perf_counter() - start)
+    return median(timings)
+
+
+def calibrate(
+    target: float,
+    parallelism: int,
+    max_memory_cost: int = DEFAULT_MAX_MEMORY_COST,
+    samples: int = 3,
+) -> dict[str, int]:
+    """
+    Finds the costliest parameters whose verification time stays under `target` seconds.
+    Memory is doubled first (it is what makes attacks expensive),
+    then the number of iterations is increased.
+    The minimums are returned if even they exceed the target.
+    """
+    memory_cost, time_cost = MIN_MEMORY_COST, MIN_TIME_COST
+    while (
+        memory_cost * 2 <= max_memory_cost
+        and measure_verify_time(memory_cost * 2, time_cost, parallelism, samples)
+        <= target
+    ):
+        memory_cost *= 2
+    while (
+        measure_verify_time(memory_cost, time_cost + 1, parallelism, samples) <= target
+    ):
+        time_cost += 1
+    return {"memory_cost": memory_cost, "rounds": time_cost, "parallelism": parallelism}
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = ArgumentParser(
+        prog="python -m schoolsyst_api.accounts.calibration",
+        description="Calibrate argon2's cost parameters for this machine.",
+    )
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=250,
+        help="Time a password verification should take, in milliseconds",
+    )
+    parser.add_argument(
+        "--parallelism",
+        type=int,
+        default=min(os.cpu_count() or 1, 4),
+        help="Number of threads used for a single hash",
+    )
+    parser.add_argument(
+        "--max-memory-mb", type=int, default=DEFAULT_MAX_MEMORY_COST // 1024
+    )
+    parser.add_argument(
+        "--write",
+        metavar="DOTENV_FILE",
+        help="Store the parameters in this .env file instead of just printing them",
+    )
+    args = parser.parse_args(argv)
+
+    parameters = calibrate(
+        target=args.target_ms / 1000,
+        parallelism=args.parallelism,
+        max_memory_cost=args.max_memory_mb * 1024,
+    )
+    took = measure_verify_time(
+        parameters["memory_cost"], parameters["rounds"], parameters["parallelism"]
+    )
+    print(f"# Verifying a password takes {took * 1000:.0f} ms with these parameters")
+    for name, value in parameters.items():
+        variable = ARGON2_PARAMETERS_VARIABLES[name]
+        print(f"{variable}={value}")
+        if args.write:
+            set_key(args.write, variable, str(value), quote_mode="never")
+
+
+if __name__ == "__main__":
+    main()
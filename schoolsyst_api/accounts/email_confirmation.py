@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 
 from arango.database import StandardDatabase
 from dotenv import load_dotenv
-from fastapi import BackgroundTasks, Depends, HTTPException, status
+from fastapi import Depends, HTTPException, status
 from jose import jwt
 from pydantic import BaseModel
 from schoolsyst_api import database
@@ -16,6 +16,8 @@ from schoolsyst_api.accounts import (
 from schoolsyst_api.accounts.models import User, UserKey
 from schoolsyst_api.accounts.password_reset import VALID_FOR
 from schoolsyst_api.accounts.users import get_current_user
+from schoolsyst_api.mail import compose, queue_email
+from schoolsyst_api.mail.models import OutgoingEmail
 
 load_dotenv(".env")
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -23,32 +25,28 @@ TOKEN_VALID_FOR = timedelta(hours=24)
 JWT_SUB_FORMAT = "email-confirmation:{}"
 
 
-def send_email_confirmation_email(
-    to_email: str, to_username: str, email_confirm_request_token: str
-) -> bool:
-    email = f"""\
-From: schoolsyst password reset system <reset-password@schoolsyst.com>
-To: {to_username} <{to_email}>
-Subject: Confirm your email address
-
+def compose_email_confirmation_email(
+    to_email: str,
+    to_username: str,
+    email_confirm_request_token: str,
+    owner_key: UserKey,
+) -> OutgoingEmail:
+    return compose(
+        from_name="schoolsyst password reset system",
+        from_email="reset-password@schoolsyst.com",
+        to_name=to_username,
+        to_email=to_email,
+        subject="Confirm your email address",
+        body=f"""\
 Go to https://app.schoolsyst.com/email-confirm/{email_confirm_request_token} to confirm your email address.
 If you didn't request an email confirmation or don't know what schoolsyst is,
 this means that someone tried to register an account and/or confirm an email address using
 yours instead of theirs. Just ignore this and your email address won't be confirmed.
 If you have any reason to think that this person has access to your mailbox, you may change your
 email account's password.
-"""
-    print("[fake] sending email:")
-    print("---")
-    print(email)
-    print("---")
-    # host = SMTP("email.schoolsyst.com", SMTP_SSL_PORT, "localhost")
-    # host.sendmail(
-    #     from_addr="reset-password@schoolsyst.com",
-    #     to_addrs=[to_email],
-    #     msg=email,
-    # )
-    return True
+""",
+        owner_key=owner_key,
+    )
 
 
 class EmailConfirmationRequest(BaseModel):
@@ -88,15 +86,16 @@ and can only be used once.
     status_code=status.HTTP_202_ACCEPTED,
 )
 async def post_users_password_reset_request(
-    tasks: BackgroundTasks,
     user: User = Depends(get_current_user),
     db: StandardDatabase = Depends(database.get),
 ):
     # create a token
     token = create_jwt_token(JWT_SUB_FORMAT, user.username, VALID_FOR)
 
-    # send an email
-    tasks.add_task(send_email_confirmation_email, user.email, user.username, token)
+    # send an email (repeated requests are ignored until it is sent)
+    queue_email(
+        db, compose_email_confirmation_email(user.email, user.username, token, user.key)
+    )
     return
 
 
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 
 from arango.database import StandardDatabase
 from dotenv import load_dotenv
-from fastapi import BackgroundTasks, Depends, HTTPException, status
+from fastapi import Depends, HTTPException, status
 from pydantic import BaseModel
 from schoolsyst_api import database
 from schoolsyst_api.accounts import create_jwt_token, router, verify_jwt_token
@@ -13,7 +13,10 @@ from schoolsyst_api.accounts.auth import (
     is_password_strong_enough,
 )
 from schoolsyst_api.accounts.models import User
+from schoolsyst_api.accounts.revocation import revoke_all_tokens
 from schoolsyst_api.accounts.users import get_current_confirmed_user
+from schoolsyst_api.mail import compose, queue_email
+from schoolsyst_api.mail.models import OutgoingEmail
 from schoolsyst_api.models import UserKey
 
 load_dotenv(".env")
@@ -28,28 +31,24 @@ class PasswordResetRequest(BaseModel):
     emitted_by_key: UserKey
 
 
-def send_password_reset_email(
-    to_email: str, to_username: str, password_reset_request_token: str
-) -> bool:
-    email = f"""\
-From: schoolsyst password reset system <reset-password@schoolsyst.com>
-To: {to_username} <{to_email}>
-Subject: Reset your schoolsyst password
-
+def compose_password_reset_email(
+    to_email: str,
+    to_username: str,
+    password_reset_request_token: str,
+    owner_key: UserKey,
+) -> OutgoingEmail:
+    return compose(
+        from_name="schoolsyst password reset system",
+        from_email="reset-password@schoolsyst.com",
+        to_name=to_username,
+        to_email=to_email,
+        subject="Reset your schoolsyst password",
+        body=f"""\
 Go to https://app.schoolsyst.com/reset-password/{password_reset_request_token} to reset it.
 If you didn't request a password reset, just ignore this, and your password won't be modified.
-"""
-    print("[fake] sending email:")
-    print("---")
-    print(email)
-    print("---")
-    # host = SMTP("email.schoolsyst.com", SMTP_SSL_PORT, "localhost")
-    # host.sendmail(
-    #     from_addr="reset-password@schoolsyst.com",
-    #     to_addrs=[to_email],
-    #     msg=email,
-    # )
-    return True
+""",
+        owner_key=owner_key,
+    )
 
 
 @router.post(
@@ -70,13 +69,16 @@ and can only be used once.
     status_code=status.HTTP_202_ACCEPTED,
 )
 async def post_users_password_reset_request(
-    tasks: BackgroundTasks, user: User = Depends(get_current_confirmed_user),
+    user: User = Depends(get_current_confirmed_user),
+    db: StandardDatabase = Depends(database.get),
 ):
     # create a request
     token = create_jwt_token(JWT_SUB_FORMAT, user.username, VALID_FOR)
 
-    # send an email
-    tasks.add_task(send_password_reset_email, user.email, user.username, token)
+    # send an email (repeated requests are ignored until it is sent)
+    queue_email(
+        db, compose_password_reset_email(user.email, user.username, token, user.key)
+    )
     return
 
 
@@ -129,4 +131,6 @@ async def post_users_password_reset(
     db.collection("users").update(
         {"_key": user.key, "password_hash": hash_password(change_data.new_password)}
     )
+    # log out every session that used the old password
+    revoke_all_tokens(db, user)
     return
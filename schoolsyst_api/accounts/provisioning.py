@@ -0,0 +1,308 @@
+"""
+Bulk creation of user accounts, used to onboard a whole school at once.
+
+Reads a CSV file with a header row and the columns `username`, `email` and `password`,
+creates the accounts (along with their default settings) and writes a per-row report:
+
+    python -m schoolsyst_api.accounts.provisioning students.csv --report report.csv
+
+Rows go through the same checks as `POST /users/`, but the expensive parts
+(password analysis and hashing) are spread across a process pool and the database
+is hit once per batch instead of three times per account.
+"""
+import csv
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from enum import auto
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from arango.database import StandardDatabase
+from fastapi_utils.enums import StrEnum
+from pydantic import ValidationError
+from schoolsyst_api import database
+from schoolsyst_api.accounts import create_jwt_token
+from schoolsyst_api.accounts.auth import (
+    analyze_password,
+    hash_password,
+    is_password_strong_enough,
+)
+from schoolsyst_api.accounts.email_confirmation import (
+    JWT_SUB_FORMAT,
+    TOKEN_VALID_FOR,
+    compose_email_confirmation_email,
+)
+from schoolsyst_api.accounts.models import DBUser, InUser
+from schoolsyst_api.accounts.users import is_username_disallowed
+from schoolsyst_api.mail import queue_emails
+from schoolsyst_api.models import BaseModel, UserKey
+from schoolsyst_api.settings.models import Settings
+
+# Number of rows validated, hashed and inserted together
+BATCH_SIZE = 500
+
+
+class ProvisioningStatus(StrEnum):
+    created = auto()
+    rejected = auto()
+
+
+class ProvisioningResult(BaseModel):
+    """
+    The outcome of provisioning one row of the CSV file.
+    `row` is the line number in the file (the header is line 1).
+    """
+
+    row: int
+    username: str = ""
+    email: str = ""
+    status: ProvisioningStatus
+    detail: str = ""
+    key: Optional[UserKey] = None
+
+
+def analyze_and_hash_password(password: str, username: str, email: str) -> str:
+    """
+    Hashes `password`, or returns an empty string if it is not strong enough.
+    Runs in the worker processes of the pool.
+
+    >>> analyze_and_hash_password("hunter2", "john", "john@example.com")
+    ''
+    >>> analyze_and_hash_password(
+    ...     "dice-wears-hats9-star-game", "john", "john@example.com"
+    ... ).startswith("$argon2")
+    True
+    """
+    if not is_password_strong_enough(analyze_password(password, username, email)):
+        return ""
+    return hash_password(password)
+
+
+def find_taken(
+    db: StandardDatabase, usernames: list[str], emails: list[str]
+) -> tuple[set[str], set[str]]:
+    """
+    Returns the usernames and the emails that are already used by existing accounts,
+    in a single query.
+    """
+    taken = db.aql.execute(
+        """
+        FOR user IN users
+            FILTER user.username IN @usernames OR user.email IN @emails
+            RETURN { username: user.username, email: user.email }
+        """,
+        bind_vars={"usernames": usernames, "emails": emails},
+    )
+    taken_usernames, taken_emails = set(), set()
+    for user in taken:
+        taken_usernames.add(user["username"])
+        taken_emails.add(user["email"])
+    return taken_usernames, taken_emails
+
+
+def validate_rows(
+    rows: Iterable[tuple[int, dict[str, str]]],
+    seen_usernames: set[str],
+    seen_emails: set[str],
+) -> tuple[list[tuple[int, InUser]], list[ProvisioningResult]]:
+    """
+    Validates rows without touching the database.
+    Returns the valid rows as `InUser`s and a rejection for every other row.
+    `seen_usernames` and `seen_emails` are updated so that duplicates
+    spanning several batches are caught.
+    """
+    valid, rejected = [], []
+    for row_number, row in rows:
+        username, email = row.get("username") or "", row.get("email") or ""
+        try:
+            user_in = InUser(
+                username=username, email=email, password=row.get("password") or ""
+            )
+        except ValidationError as error:
+            detail = "; ".join(
+                f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors()
+            )
+        else:
+            if is_username_disallowed(user_in.username):
+                detail = "This username is not allowed."
+            elif user_in.username in seen_usernames:
+                detail = "This username appears more than once in the file"
+            elif user_in.email in seen_emails:
+                detail = "This email appears more than once in the file"
+            else:
+                seen_usernames.add(user_in.username)
+                seen_emails.add(user_in.email)
+                valid.append((row_number, user_in))
+                continue
+        rejected.append(
+            ProvisioningResult(
+                row=row_number,
+                username=username,
+                email=email,
+                status=ProvisioningStatus.rejected,
+                detail=detail,
+            )
+        )
+    return valid, rejected
+
+
+def provision_batch(
+    db: StandardDatabase,
+    rows: list[tuple[int, dict[str, str]]],
+    pool: Executor,
+    seen_usernames: set[str],
+    seen_emails: set[str],
+) -> list[ProvisioningResult]:
+    valid, results = validate_rows(rows, seen_usernames, seen_emails)
+    if not valid:
+        return results
+
+    # Check uniqueness against existing accounts
+    taken_usernames, taken_emails = find_taken(
+        db, [u.username for _, u in valid], [u.email for _, u in valid]
+    )
+    # Analyze and hash the passwords in parallel
+    password_hashes = pool.map(
+        analyze_and_hash_password,
+        [u.password for _, u in valid],
+        [u.username for _, u in valid],
+        [u.email for _, u in valid],
+        chunksize=max(1, len(valid) // 64),
+    )
+
+    created: list[tuple[int, DBUser]] = []
+    for (row_number, user_in), password_hash in zip(valid, password_hashes):
+        if user_in.username in taken_usernames:
+            detail = "This username is already taken"
+        elif user_in.email in taken_emails:
+            detail = "This email is already taken"
+        elif not password_hash:
+            detail = "The password is not strong enough"
+        else:
+            created.append(
+                (
+                    row_number,
+                    DBUser(
+                        joined_at=datetime.utcnow(),
+                        email_is_confirmed=False,
+                        password_hash=password_hash,
+                        username=user_in.username,
+                        email=user_in.email,
+                    ),
+                )
+            )
+            continue
+        results.append(
+            ProvisioningResult(
+                row=row_number,
+                username=user_in.username,
+                email=user_in.email,
+                status=ProvisioningStatus.rejected,
+                detail=detail,
+            )
+        )
+
+    if not created:
+        return results
+
+    # Insert the users, then default settings for the ones that made it
+    insertions = db.collection("users").insert_many(
+        [user.to_db() for _, user in created]
+    )
+    inserted: list[DBUser] = []
+    for (row_number, user), insertion in zip(created, insertions):
+        if isinstance(insertion, Exception):
+            status, detail = ProvisioningStatus.rejected, str(insertion)
+        else:
+            status, detail = ProvisioningStatus.created, ""
+            inserted.append(user)
+        results.append(
+            ProvisioningResult(
+                row=row_number,
+                username=user.username,
+                email=user.email,
+                status=status,
+                detail=detail,
+                key=user.key if status == ProvisioningStatus.created else None,
+            )
+        )
+    db.collection("settings").insert_many(
+        [Settings(_key=user.key).to_db() for user in inserted]
+    )
+
+    # Ask everyone to confirm their email address
+    queue_emails(
+        db,
+        [
+            compose_email_confirmation_email(
+                user.email,
+                user.username,
+                create_jwt_token(JWT_SUB_FORMAT, user.username, TOKEN_VALID_FOR),
+                user.key,
+            )
+            for user in inserted
+        ],
+    )
+
+    return results
+
+
+def provision_users(
+    db: StandardDatabase,
+    rows: Iterable[dict[str, str]],
+    pool: Executor,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[ProvisioningResult]:
+    """
+    Creates an account for every row of `rows`, `batch_size` rows at a time,
+    yielding a result for every row, in order.
+    """
+    seen_usernames: set[str] = set()
+    seen_emails: set[str] = set()
+    # Line 1 is the CSV header
+    numbered_rows = enumerate(rows, start=2)
+    while batch := list(islice(numbered_rows, batch_size)):
+        yield from sorted(
+            provision_batch(db, batch, pool, seen_usernames, seen_emails),
+            key=lambda result: result.row,
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = ArgumentParser(
+        prog="python -m schoolsyst_api.accounts.provisioning",
+        description="Create user accounts in bulk from a CSV file "
+        "with the columns username, email and password.",
+    )
+    parser.add_argument("csv_file", help="Path to the CSV file, - for stdin")
+    parser.add_argument(
+        "--report", default="provisioning-report.csv", help="Where to write the report"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    db = database.initialize()
+    source = sys.stdin if args.csv_file == "-" else open(args.csv_file, newline="")
+    with source, open(args.report, "w", newline="") as report, ProcessPoolExecutor(
+        args.workers
+    ) as pool:
+        writer = csv.DictWriter(report, fieldnames=list(ProvisioningResult.__fields__))
+        writer.writeheader()
+        created = rejected = 0
+        for result in provision_users(
+            db, csv.DictReader(source), pool, args.batch_size
+        ):
+            writer.writerow(result.serialize())
+            if result.status == ProvisioningStatus.created:
+                created += 1
+            else:
+                rejected += 1
+
+    print(f"{created} accounts created, {rejected} rows rejected. See {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Revocation of access tokens (on logout, password change, etc.).
+
+Revocations are stored in the `revoked_tokens` collection, either for a single token
+(keyed by its `jti` claim) or for every token of a user issued before some point in
+time (keyed by the user's key). Each worker mirrors that collection in memory and only
+fetches what changed since its last refresh, every `REFRESH_EVERY` at most,
+so that checking a token is a couple of dict lookups.
+"""
+from threading import Lock
+from time import monotonic, time
+from typing import Any
+
+from arango.database import StandardDatabase
+from schoolsyst_api.accounts.models import User
+
+# How stale the in-memory mirror can get, in seconds
+REFRESH_EVERY = 10
+# Revocations are fetched again for this many seconds before the last refresh,
+# to account for clock differences between workers
+REFRESH_OVERLAP = 5
+
+
+class RevocationList:
+    """
+    In-memory mirror of the `revoked_tokens` collection.
+    """
+
+    def __init__(self) -> None:
+        # jti -> expiration timestamp of the revoked token
+        self.jtis: dict[str, int] = {}
+        # username -> tokens issued (strictly) before that timestamp are revoked
+        self.issued_before: dict[str, float] = {}
+        self.synced_up_to = 0.0
+        self.next_refresh_at = 0.0
+        self.lock = Lock()
+
+    def is_revoked(self, username: str, payload: dict[str, Any]) -> bool:
+        if payload.get("jti") in self.jtis:
+            return True
+        return payload.get("iat", 0) < self.issued_before.get(username, 0)
+
+    def apply(self, revocation: dict[str, Any]) -> None:
+        if revocation.get("jti"):
+            self.jtis[revocation["jti"]] = revocation["expires_at"]
+        if revocation.get("issued_before"):
+            self.issued_before[revocation["username"]] = max(
+                revocation["issued_before"],
+                self.issued_before.get(revocation["username"], 0),
+            )
+
+    def refresh(self, db: StandardDatabase, force: bool = False) -> None:
+        """
+        Fetches revocations made since the last refresh,
+        if the last one is older than `REFRESH_EVERY` seconds.
+        """
+        if not force and monotonic() < self.next_refresh_at:
+            return
+        with self.lock:
+            if not force and monotonic() < self.next_refresh_at:
+                return
+            started_at = time()
+            for revocation in db.aql.execute(
+                """
+                FOR revocation IN revoked_tokens
+                    FILTER revocation.revoked_at >= @since
+                    RETURN revocation
+                """,
+                bind_vars={"since": self.synced_up_to - REFRESH_OVERLAP},
+            ):
+                self.apply(revocation)
+            # Forget revoked tokens that have expired anyway
+            self.jtis = {
+                jti: expires_at
+                for jti, expires_at in self.jtis.items()
+                if expires_at > started_at
+            }
+            self.synced_up_to = started_at
+            self.next_refresh_at = monotonic() + REFRESH_EVERY
+
+
+revoked_tokens = RevocationList()
+
+
+def revoke_token(db: StandardDatabase, user: User, payload: dict[str, Any]) -> None:
+    """
+    Revokes the token with this (decoded) `payload`.
+    """
+    if not payload.get("jti"):
+        # Tokens emitted before revocation was a thing
+        revoke_all_tokens(db, user)
+        return
+    revocation = {
+        "_key": payload["jti"],
+        "owner_key": user.key,
+        "username": user.username,
+        "jti": payload["jti"],
+        "expires_at": payload["exp"],
+        "revoked_at": time(),
+    }
+    # Removed by the database once the token expires (see database.create_indexes)
+    db.collection("revoked_tokens").insert(revocation, overwrite=True)
+    revoked_tokens.apply(revocation)
+
+
+def revoke_all_tokens(db: StandardDatabase, user: User) -> None:
+    """
+    Revokes every token of `user` issued until now.
+    """
+    revocation = {
+        "_key": user.key,
+        "owner_key": user.key,
+        "username": user.username,
+        "issued_before": time(),
+        "revoked_at": time(),
+    }
+    db.collection("revoked_tokens").insert(revocation, overwrite=True)
+    revoked_tokens.apply(revocation)
@@ -1,10 +1,14 @@
+import hmac
 import os
+from base64 import urlsafe_b64encode
 from datetime import datetime
+from hashlib import sha256
 from pathlib import Path
+from typing import Callable
 
 from arango.database import StandardDatabase
 from dotenv import load_dotenv
-from fastapi import Depends, HTTPException, Response, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from jose import JWTError, jwt
 from pydantic import EmailStr
 from schoolsyst_api import database
@@ -18,7 +22,15 @@ from schoolsyst_api.accounts.auth import (
     oauth2_scheme,
 )
 from schoolsyst_api.accounts.models import DBUser, InUser, User
-from schoolsyst_api.database import COLLECTIONS
+from schoolsyst_api.accounts.revocation import (
+    revoke_all_tokens,
+    revoke_token,
+    revoked_tokens,
+)
+from schoolsyst_api.database import COLLECTIONS, USER_DATA_COLLECTIONS
+from schoolsyst_api.jobs import enqueue, job_type
+from schoolsyst_api.jobs.models import Job, PublicJob
+from schoolsyst_api.single_flight import share
 
 load_dotenv(".env")
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -83,6 +95,10 @@ async def get_current_user(
     # In that case the jwt token is invalid
     if username is None:
         raise credentials_exception
+    # Reject revoked tokens (this only hits the database every few seconds)
+    revoked_tokens.refresh(db)
+    if revoked_tokens.is_revoked(username, payload):
+        raise credentials_exception
     # Store the token data in TokenData
     print("./schoolsyst_api/users.py:83 => username")
     print("\t" + repr(username))
@@ -98,6 +114,44 @@ async def get_current_user(
     return User(**user.dict(by_alias=True))
 
 
+@router.post(
+    "/auth/logout",
+    summary="Revoke the current access token",
+    responses=get_current_user_responses,
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def logout(
+    token: str = Depends(oauth2_scheme),
+    user: User = Depends(get_current_user),
+    db: StandardDatabase = Depends(database.get),
+):
+    """
+    Revokes the access token used to make this request.
+    Other sessions of the user stay logged in.
+    """
+    revoke_token(
+        db, user, jwt.decode(token, SECRET_KEY, algorithms=[JWT_SIGN_ALGORITHM])
+    )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post(
+    "/auth/logout/everywhere",
+    summary="Revoke all of the user's access tokens",
+    responses=get_current_user_responses,
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def logout_everywhere(
+    user: User = Depends(get_current_user),
+    db: StandardDatabase = Depends(database.get),
+):
+    """
+    Revokes every access token emitted for the user so far, on every device.
+    """
+    revoke_all_tokens(db, user)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 async def get_current_confirmed_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -171,7 +225,7 @@ def create_user_account(
         password_hash=hash_password(user_in.password),
         **user_in.dict(),
     )
-    db.collection("users").insert(db_user.json(by_alias=True))
+    db.collection("users").insert(db_user.to_db())
     # Return a regular User
     return User(**db_user.dict(by_alias=True))
 
@@ -181,51 +235,89 @@ delete_current_user_responses = {
 }
 
 
+def deletion_job_key(user_key: str) -> str:
+    """
+    The key of the job deleting the account of `user_key`.
+    It is the same for every request (so that they are deduplicated),
+    but can not be guessed without the SECRET_KEY: the job can be read by its key alone.
+    """
+    digest = hmac.new(SECRET_KEY.encode(), user_key.encode(), sha256).digest()
+    return "delete_account-" + urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+@job_type("delete_account", readable_by_key=True)
+def delete_account(
+    db: StandardDatabase, job: Job, report_progress: Callable[[float], None]
+) -> None:
+    """
+    Deletes the resources of the job's owner, then their account.
+    The job itself is kept, so that its outcome can be read until it expires.
+    """
+    collections = [c for c in dict.fromkeys(COLLECTIONS) if c not in ("users", "jobs")]
+    for done, c in enumerate(collections):
+        db.collection(c).delete_match({"owner_key": job.owner_key})
+        report_progress(done / len(collections))
+    db.aql.execute(
+        """
+        FOR other IN jobs
+            FILTER other.owner_key == @owner_key AND other._key != @key
+            REMOVE other IN jobs
+        """,
+        bind_vars={"owner_key": job.owner_key, "key": job.key},
+    )
+    db.collection("users").delete(job.owner_key, ignore_missing=True)
+
+
 @router.delete(
     "/users/current",
     summary="Delete currently logged-in user",
     responses=delete_current_user_responses,
-    status_code=status.HTTP_204_NO_CONTENT,
+    status_code=status.HTTP_202_ACCEPTED,
 )
 async def delete_current_user(
+    response: Response,
     user: User = Depends(get_current_user),
     really_delete: bool = False,
     db: StandardDatabase = Depends(database.get),
-):
+) -> PublicJob:
     """
     Deletes the currently-logged-in user, and all of the associated resources.
     This action does not require the user to have confirmed its email address.
+
+    The deletion is done in the background: follow it with the returned job's
+    GET /jobs/{key}, which answers without authentication since the account
+    is gone once the job succeeded.
     """
     if not really_delete:
-        return HTTPException(
+        raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Set really_delete to True to confirm deletion",
         )
 
-    db.collection("users").delete(user.key)
-    for c in COLLECTIONS:
-        if c == "users":
-            continue
-
-        db.collection(c).delete_match({"owner_key": user.key})
-
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
+    job = enqueue(
+        db, "delete_account", owner_key=user.key, key=deletion_job_key(user.key)
+    )
+    response.headers["Location"] = f"/jobs/{job.key}"
+    return PublicJob(**job.dict(by_alias=True))
 
 
 @router.get("/personal_data_archive")
-async def get_personal_data_archive(
+def get_personal_data_archive(
+    request: Request,
     user: User = Depends(get_current_confirmed_user),
     db: StandardDatabase = Depends(database.get),
 ) -> dict:
     """
     Get an archive of all of the data linked to the user.
     """
+    return share(user.key, request, lambda: compute_personal_data_archive(db, user))
+
+
+def compute_personal_data_archive(db: StandardDatabase, user: User) -> dict:
     data = {}
     # The user's data
     data["user"] = db.collection("users").get(user.key)
     # the data of which the user is the owner for every collection
-    for c in COLLECTIONS:
-        if c == "users":
-            continue
+    for c in USER_DATA_COLLECTIONS:
         data[c] = [batch for batch in db.collection(c).find({"owner_key": user.key})]
     return data
@@ -0,0 +1,193 @@
+"""
+In-memory cache of the responses of routes that are read much more often than what
+they return changes, like the subjects, events and settings shown on every screen.
+
+Responses are cached per user, route and query string, as the bytes that were sent:
+a hit needs neither the database (past authentication) nor pydantic.
+The least recently used entries are evicted when the cache holds more than
+`MAX_BYTES` of responses, and entries expire after `TTL` seconds.
+
+Entries are dropped as soon as one of the collections they were read from is written
+to by their user: every tracked write (see `schoolsyst_api.changes`) is published to
+the push hub, whose broker tells every worker (see `schoolsyst_api.push`).
+"""
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from time import monotonic
+from typing import Callable, NamedTuple, Optional, Sequence
+
+from fastapi import Depends, Request, Response, status
+from schoolsyst_api.accounts.models import User
+from schoolsyst_api.accounts.users import get_current_confirmed_user
+from schoolsyst_api.etags import etag_matches
+from schoolsyst_api.models import UserKey
+from schoolsyst_api.push import Notification, hub
+
+MAX_BYTES = 32 * 1024 * 1024
+# Seconds after which entries expire, in case a write was not notified
+TTL = 300
+# Headers of a response that are cached along with its body
+CACHED_HEADERS = ("etag", "link")
+
+# (user, path, query string)
+CacheKey = tuple[UserKey, str, str]
+
+
+class Entry(NamedTuple):
+    body: bytes
+    headers: dict[str, str]
+    collections: frozenset[str]
+    expires_at: float
+
+
+class ResponseCache:
+    """
+    A size-bounded LRU cache of response bodies, that can be used from any thread.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = MAX_BYTES,
+        ttl: float = TTL,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self.max_bytes, self.ttl, self.clock = max_bytes, ttl, clock
+        self.entries: OrderedDict[CacheKey, Entry] = OrderedDict()
+        self.keys_of: defaultdict[UserKey, set[CacheKey]] = defaultdict(set)
+        # Number of writes of each user, to not cache what was read before one
+        self.generations: defaultdict[UserKey, int] = defaultdict(int)
+        self.size = 0
+        self.lock = Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key: CacheKey) -> Optional[Entry]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires_at <= self.clock():
+                self.remove(key)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def generation(self, owner_key: UserKey) -> int:
+        with self.lock:
+            return self.generations.get(owner_key, 0)
+
+    def put(
+        self,
+        key: CacheKey,
+        body: bytes,
+        headers: dict[str, str],
+        collections: Sequence[str],
+        generation: int,
+    ) -> None:
+        """
+        Caches a response read from `collections` when its user was at `generation`.
+        """
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            if self.generations.get(key[0], 0) != generation:
+                # Written to while the response was being made, it may be stale
+                return
+            self.remove(key)
+            self.entries[key] = Entry(
+                body, headers, frozenset(collections), self.clock() + self.ttl
+            )
+            self.keys_of[key[0]].add(key)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def remove(self, key: CacheKey) -> None:
+        # Only called with the lock held
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= len(entry.body)
+        self.keys_of[key[0]].discard(key)
+        if not self.keys_of[key[0]]:
+            del self.keys_of[key[0]]
+
+    def invalidate(self, owner_key: UserKey, collection: str) -> None:
+        """
+        Drops the responses of `owner_key` that were read from `collection`.
+        """
+        with self.lock:
+            self.generations[owner_key] += 1
+            for key in list(self.keys_of.get(owner_key, ())):
+                if collection in self.entries[key].collections:
+                    self.remove(key)
+                    self.invalidations += 1
+
+    def notify(self, owner_key: UserKey, notification: Notification) -> None:
+        if notification.get("type") == "change":
+            self.invalidate(owner_key, notification["collection"])
+
+    def stats(self) -> dict[str, float]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self.entries),
+                "size": self.size,
+                "max_size": self.max_bytes,
+            }
+
+
+cache = ResponseCache()
+hub.listen(cache.notify)
+
+
+class Cached:
+    """
+    Serves the response of a route from the `cache`, to use with `Depends()`:
+
+        return cached(["subjects"], lambda: helper.list(...))
+
+    where the function makes the response (a `Response`, e.g. from
+    `resource_base.respond`) when it is not cached, from the given collections.
+    The `X-Cache` header tells whether the response was a hit.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        current_user: User = Depends(get_current_confirmed_user),
+    ) -> None:
+        self.request = request
+        self.key: CacheKey = (current_user.key, request.url.path, request.url.query)
+
+    def __call__(
+        self, collections: Sequence[str], make_response: Callable[[], Response]
+    ) -> Response:
+        entry = cache.get(self.key)
+        if entry is None:
+            generation = cache.generation(self.key[0])
+            response = make_response()
+            if response.status_code == status.HTTP_200_OK:
+                headers = {
+                    name: response.headers[name]
+                    for name in CACHED_HEADERS
+                    if name in response.headers
+                }
+                cache.put(self.key, response.body, headers, collections, generation)
+            response.headers["X-Cache"] = "miss"
+            return response
+
+        headers = {**entry.headers, "X-Cache": "hit"}
+        if "etag" in entry.headers and etag_matches(
+            self.request.headers.get("if-none-match"), entry.headers["etag"]
+        ):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
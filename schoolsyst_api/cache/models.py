@@ -0,0 +1,33 @@
+from schoolsyst_api.models import BaseModel
+
+
+class CacheStats(BaseModel):
+    """
+    Counters of this worker's response cache, since it started.
+    """
+
+    hits: int
+    misses: int
+    # Share of the lookups that were hits
+    hit_rate: float
+    # Entries evicted because the cache was full, or expired
+    evictions: int
+    # Entries dropped because what they were read from was written to
+    invalidations: int
+    entries: int
+    # Bytes of cached responses
+    size: int
+    max_size: int
+
+
+class SingleFlightStats(BaseModel):
+    """
+    Counters of this worker's single-flight layer, since it started.
+    """
+
+    # Responses computed
+    computations: int
+    # Requests that shared the response of an identical one instead
+    coalesced: int
+    # Responses being computed right now
+    in_flight: int
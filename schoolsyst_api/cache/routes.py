@@ -0,0 +1,28 @@
+from fastapi import Depends
+from fastapi_utils.inferring_router import InferringRouter
+from schoolsyst_api.accounts.models import User
+from schoolsyst_api.accounts.users import get_current_user
+from schoolsyst_api.cache import cache
+from schoolsyst_api.cache.models import CacheStats, SingleFlightStats
+from schoolsyst_api.single_flight import flights
+
+router = InferringRouter()
+
+
+@router.get("/cache/stats")
+def get_cache_stats(current_user: User = Depends(get_current_user)) -> CacheStats:
+    """
+    Hit rate and size of the response cache of the worker that answers.
+    """
+    return CacheStats(**cache.stats())
+
+
+@router.get("/cache/single_flight/stats")
+def get_single_flight_stats(
+    current_user: User = Depends(get_current_user),
+) -> SingleFlightStats:
+    """
+    How many requests of the worker that answers shared the response of
+    an identical one (see `schoolsyst_api.single_flight`).
+    """
+    return SingleFlightStats(**flights.stats())
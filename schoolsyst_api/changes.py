@@ -0,0 +1,93 @@
+"""
+Tracking of the changes made to users' resources.
+
+Each user has a change sequence, stored in their document of the `versions`
+collection along with the point of that sequence at which each of their collections
+last changed. Every write to a resource bumps the sequence in the same query
+(see `execute_tracked`) and stamps the written document with the new value (`seq`),
+or leaves a tombstone when the document is removed.
+
+This lets lists be tagged without reading them (see `schoolsyst_api.etags`),
+clients fetch only what changed since they last synced (see `schoolsyst_api.sync`),
+and be notified of the changes as they happen (see `schoolsyst_api.push`).
+"""
+from typing import Any
+
+from arango.database import StandardDatabase
+from arango.exceptions import AQLQueryExecuteError
+from schoolsyst_api.models import UserKey
+from schoolsyst_api.push import hub
+
+# Writes of the same user conflict on their `versions` document
+ARANGO_CONFLICT = 1200
+MAX_ATTEMPTS = 5
+
+BUMP_SEQUENCE = """
+LET seq = FIRST(
+    UPSERT { _key: @owner_key }
+    INSERT {
+        _key: @owner_key,
+        owner_key: @owner_key,
+        seq: 1,
+        collections: { [@changed_collection]: 1 }
+    }
+    UPDATE { seq: OLD.seq + 1, collections: { [@changed_collection]: OLD.seq + 1 } }
+    IN versions
+    RETURN NEW.seq
+)
+"""
+
+# To use in a tracked query that removes `doc`
+LEAVE_TOMBSTONE = """
+INSERT {
+    _key: CONCAT(@changed_collection, ":", doc._key),
+    owner_key: @owner_key,
+    collection: @changed_collection,
+    key: doc._key,
+    seq: seq
+} INTO tombstones OPTIONS { overwrite: true }
+"""
+
+
+def execute_tracked(
+    db: StandardDatabase,
+    owner_key: UserKey,
+    collection: str,
+    query: str,
+    bind_vars: dict[str, Any],
+) -> list[Any]:
+    """
+    Runs an AQL `query` that writes to the `collection` of `owner_key`, bumping their
+    change sequence in the same transaction. The query can use `seq`, the new value
+    of the sequence, to stamp the documents it writes, and `@owner_key`.
+    Concurrent writes of the same user are retried, so that documents are stamped
+    in the order their writes are committed.
+    Returns what the query returns, and notifies the user's devices if that is
+    not empty.
+    """
+    attempt = 1
+    while True:
+        try:
+            [result] = db.aql.execute(
+                f"""
+                {BUMP_SEQUENCE}
+                LET results = ({query})
+                RETURN {{ seq, results }}
+                """,
+                bind_vars={
+                    **bind_vars,
+                    "owner_key": owner_key,
+                    "changed_collection": collection,
+                },
+            )
+            break
+        except AQLQueryExecuteError as error:
+            if error.error_code != ARANGO_CONFLICT or attempt >= MAX_ATTEMPTS:
+                raise
+            attempt += 1
+    if result["results"]:
+        hub.publish(
+            owner_key,
+            {"type": "change", "collection": collection, "seq": result["seq"]},
+        )
+    return result["results"]
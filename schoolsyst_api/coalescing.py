@@ -0,0 +1,152 @@
+"""
+Coalescing of bursts of updates to the same document, for clients that send many
+small changes within a second (progress sliders, autosaving forms, theme toggles),
+which opt in with `?coalesce=true`:
+
+    PATCH /homework/{key}?coalesce=true    {"explicit_progress": 0.4}
+    PATCH /homework/{key}?coalesce=true    {"explicit_progress": 0.45}
+
+Changes to a document are buffered for up to COALESCING_MAX_DELAY_MS (200 by default)
+after the first one, merged in the order they arrived, and written in one update.
+Every caller waits for that write and gets the document it resulted in, so that
+a response still means that the change is stored.
+
+When the API shuts down, pending changes are written right away, unless
+COALESCING_FLUSH_ON_SHUTDOWN is false: their callers then get a 503 instead.
+Updates with an If-Match condition are never coalesced.
+"""
+import os
+from threading import Event, Lock
+from typing import Any, Callable, Hashable, Optional
+
+from fastapi import HTTPException, Query, status
+
+DEFAULT_MAX_DELAY = 0.2
+
+Changes = dict[str, Any]
+
+
+def unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="The server is shutting down, try again",
+    )
+
+
+class Buffer:
+    """
+    Changes waiting to be written to a document, and the outcome of that write.
+    """
+
+    def __init__(self, write: Callable[[Changes], Any]) -> None:
+        self.write = write
+        self.changes: Changes = {}
+        self.done = Event()
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+
+
+class WriteCoalescer:
+    """
+    Buffers the changes to each document, and writes them at most `max_delay`
+    seconds after the first one. Can be used from any thread.
+    """
+
+    def __init__(self, max_delay: float = DEFAULT_MAX_DELAY) -> None:
+        self.max_delay = max_delay
+        self.flush_on_shutdown = True
+        self.buffers: dict[Hashable, Buffer] = {}
+        self.lock = Lock()
+        self.closed = False
+
+    def submit(
+        self, key: Hashable, changes: Changes, write: Callable[[Changes], Any]
+    ) -> Any:
+        """
+        Merges `changes` with the other changes to the document identified by `key`,
+        and returns what `write` returned once it was called with all of them.
+        The first caller's `write` is used, and its errors are raised to every caller.
+        """
+        with self.lock:
+            if self.closed:
+                raise unavailable()
+            buffer = self.buffers.get(key)
+            first = buffer is None
+            if first:
+                buffer = self.buffers[key] = Buffer(write)
+            buffer.changes.update(changes)
+        if first:
+            # Woken up early if everything is flushed at shutdown
+            buffer.done.wait(self.max_delay)
+            self.flush(key, buffer)
+        buffer.done.wait()
+        if buffer.error is not None:
+            raise buffer.error
+        return buffer.result
+
+    def take(self, key: Hashable, buffer: Buffer) -> bool:
+        """
+        Removes `buffer` from the pending ones, unless that was already done.
+        Changes submitted from then on go to a new buffer.
+        """
+        with self.lock:
+            if self.buffers.get(key) is not buffer:
+                return False
+            del self.buffers[key]
+            return True
+
+    def flush(self, key: Hashable, buffer: Buffer) -> None:
+        if not self.take(key, buffer):
+            return
+        try:
+            buffer.result = buffer.write(buffer.changes)
+        except Exception as error:
+            buffer.error = error
+        finally:
+            buffer.done.set()
+
+    def close(self) -> None:
+        """
+        Writes the pending changes (or fails them, if not `flush_on_shutdown`),
+        and stops accepting new ones.
+        """
+        with self.lock:
+            self.closed = True
+            pending = list(self.buffers.items())
+        for key, buffer in pending:
+            if self.flush_on_shutdown:
+                self.flush(key, buffer)
+            elif self.take(key, buffer):
+                buffer.error = unavailable()
+                buffer.done.set()
+
+
+coalescer = WriteCoalescer()
+
+
+def configure() -> None:
+    delay = os.getenv("COALESCING_MAX_DELAY_MS")
+    coalescer.max_delay = int(delay) / 1000 if delay else DEFAULT_MAX_DELAY
+    coalescer.flush_on_shutdown = (
+        os.getenv("COALESCING_FLUSH_ON_SHUTDOWN") or "true"
+    ).lower() in ("1", "true", "yes")
+
+
+def stop() -> None:
+    coalescer.close()
+
+
+class Coalescing:
+    """
+    The `?coalesce=` query parameter of PATCH routes, to use with `Depends()`.
+    """
+
+    def __init__(
+        self,
+        coalesce: bool = Query(
+            False,
+            description="Merge with the other changes to this resource sent within "
+            "a fraction of a second, and write them at once",
+        ),
+    ) -> None:
+        self.enabled = coalesce
@@ -0,0 +1,56 @@
+"""
+Encoding of the documents sent to the database.
+
+Models are turned into documents with `BaseModel.to_db` (or `changes` for partial
+updates), which keeps datetimes, enums, etc. as they are: the database client
+serializes everything it sends with `dumps`, in a single pass with orjson.
+The stored format is the one of pydantic's `.json()`.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from pydantic.color import Color
+from schoolsyst_api.models import BaseModel
+
+
+def default(value: Any) -> Any:
+    """
+    Encodes what orjson does not support natively.
+    """
+    if isinstance(value, BaseModel):
+        return value.serialize()
+    if isinstance(value, Color):
+        return str(value)
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> str:
+    """
+    >>> from datetime import datetime
+    >>> dumps({"at": datetime(2020, 9, 1, 8), "took": timedelta(minutes=1)})
+    '{"at":"2020-09-01T08:00:00","took":60.0}'
+    """
+    return orjson.dumps(value, default=default).decode()
+
+
+loads = orjson.loads
+
+
+def changes(model: BaseModel) -> dict[str, Any]:
+    """
+    The fields that were explicitly set on `model`, to update a document with.
+    """
+    serialized = model.serialize()
+    return {
+        name: serialized[field.alias]
+        for name, field in model.__fields__.items()
+        if name in model.__fields_set__
+    }
@@ -4,6 +4,7 @@ from typing import Optional
 import arango.database
 from arango import ArangoClient
 from dotenv import load_dotenv
+from schoolsyst_api import codec
 
 # Different collections stored in the 'schoolsyst' standard database
 COLLECTIONS = [
@@ -17,6 +18,27 @@ COLLECTIONS = [
     "homework",
     "events",
     "event_mutations",
+    "revoked_tokens",
+    "outbox",
+    "jobs",
+    "versions",
+    "tombstones",
+    "courses",
+    "calendars",
+]
+
+# Collections of the data users put in schoolsyst, that they can export.
+# The others hold internal state (revoked tokens, queued emails with their secret
+# links, jobs, change tracking, generated courses) and must not be exported.
+USER_DATA_COLLECTIONS = [
+    "subjects",
+    "settings",
+    "quizzes",
+    "notes",
+    "grades",
+    "homework",
+    "events",
+    "event_mutations",
 ]
 
 
@@ -30,8 +52,50 @@ def create_collection_if_missing(
 def create_indexes(
     db: arango.database.StandardDatabase,
 ) -> arango.database.StandardDatabase:
+    # Sort fields of the paginated lists (see ResourceRoutesGenerator.sort_by)
+    for collection_name, sort_by in (
+        ("subjects", ["created_at"]),
+        ("grades", ["obtained_at"]),
+        ("homework", ["due_at"]),
+        ("events", ["day", "start"]),
+    ):
+        db.collection(collection_name).add_persistent_index(
+            fields=["owner_key", *sort_by]
+        )
+    # Lists filtered by subject (see schoolsyst_api.filtering)
+    for collection_name in ("grades", "homework"):
+        db.collection(collection_name).add_persistent_index(
+            fields=["owner_key", "subject_key"]
+        )
+    # Mutations overlapping a period (see schoolsyst_api.schedule.mutations)
+    for range_field in ("deleted_in", "added_in"):
+        db.collection("event_mutations").add_persistent_index(
+            fields=["owner_key", f"{range_field}.start"]
+        )
+    # Courses of a period (see schoolsyst_api.schedule.calendar)
+    db.collection("courses").add_persistent_index(fields=["owner_key", "day", "start"])
+    # Changes since a point of the user's change sequence (see schoolsyst_api.sync)
+    for collection_name in (
+        "subjects",
+        "grades",
+        "homework",
+        "events",
+        "event_mutations",
+        "notes",
+        "tombstones",
+    ):
+        db.collection(collection_name).add_persistent_index(fields=["owner_key", "seq"])
     # Users
     db.collection("users").add_persistent_index(fields=["emails", "username"])
+    # Revoked tokens
+    db.collection("revoked_tokens").add_persistent_index(fields=["revoked_at"])
+    db.collection("revoked_tokens").add_ttl_index(fields=["expires_at"], expiry_time=0)
+    # Emails
+    db.collection("outbox").add_persistent_index(fields=["status", "next_attempt_at"])
+    # Jobs
+    db.collection("jobs").add_persistent_index(fields=["status", "run_after"])
+    db.collection("jobs").add_persistent_index(fields=["owner_key"])
+    db.collection("jobs").add_ttl_index(fields=["expires_at"], expiry_time=0)
     return db
 
 
@@ -71,7 +135,11 @@ def _get(database_name: Optional[str] = None) -> arango.database.StandardDatabas
         f"[ DB ] Logging into database {database_name} at {os.getenv('ARANGODB_HOST')}"
     )
 
-    client = ArangoClient(hosts=os.getenv("ARANGODB_HOST"))
+    client = ArangoClient(
+        hosts=os.getenv("ARANGODB_HOST"),
+        serializer=codec.dumps,
+        deserializer=codec.loads,
+    )
     username, password = (
         os.getenv("ARANGODB_USERNAME"),
         os.getenv("ARANGO_ROOT_PASSWORD"),
@@ -1,4 +1,6 @@
-from pydantic import AnyHttpUrl, BaseModel
+from typing import Optional
+
+from pydantic import AnyHttpUrl, BaseModel, PositiveInt, conint
 
 
 class EnvironmentVariables(BaseModel):
@@ -8,3 +10,18 @@ class EnvironmentVariables(BaseModel):
     ARANGODB_USERNAME: str
     ARANGODB_HOST: AnyHttpUrl
     ARANGO_ROOT_PASSWORD: str
+    # Set by python -m schoolsyst_api.accounts.calibration
+    ARGON2_MEMORY_COST: Optional[PositiveInt] = None
+    ARGON2_TIME_COST: Optional[PositiveInt] = None
+    ARGON2_PARALLELISM: Optional[PositiveInt] = None
+    # Mail server used by python -m schoolsyst_api.mail.dispatcher
+    SMTP_HOST: Optional[str] = None
+    SMTP_PORT: Optional[PositiveInt] = None
+    SMTP_USERNAME: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_STARTTLS: bool = False
+    # Threads running background jobs in the API's process (see schoolsyst_api.jobs)
+    JOBS_WORKERS: Optional[conint(ge=0)] = None
+    # Coalescing of ?coalesce=true updates (see schoolsyst_api.coalescing)
+    COALESCING_MAX_DELAY_MS: Optional[conint(ge=0)] = None
+    COALESCING_FLUSH_ON_SHUTDOWN: bool = True
@@ -0,0 +1,125 @@
+"""
+Entity tags and conditional requests.
+
+Single resources are tagged with their document's revision (`_rev`),
+lists from the version of the user's collection (see `schoolsyst_api.changes`).
+GET requests with a matching `If-None-Match` are answered with `304 Not Modified`
+(see `fastapi_etag.add_exception_handler`), and PATCH or DELETE requests
+with an `If-Match` that does not match anymore with `412 Precondition Failed`.
+"""
+import json
+from hashlib import sha256
+from typing import Any, Optional
+
+from fastapi import Header, HTTPException, Request, Response, status
+from fastapi_etag.dependency import CacheHit
+
+precondition_failed_responses = {
+    412: {"description": "The resource was modified since (see If-Match)"}
+}
+
+
+def precondition_failed() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="The resource was modified since",
+    )
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    A strong entity tag for a representation that depends on `parts` only.
+
+    >>> make_etag("_bZ2d1--_")
+    '"86e675e6b1d2ca470da61152"'
+    >>> make_etag("_bZ2d1--_", ["title"]) != make_etag("_bZ2d1--_")
+    True
+    """
+    digest = sha256(json.dumps(parts, default=str).encode()).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def revision_etag(revision: str, *variant: Any) -> str:
+    """
+    A strong entity tag for a representation of a document at a given `revision`.
+    The revision can be told back from it (see `revision_of`),
+    to check If-Match conditions in the database.
+
+    >>> revision_etag("_bZ2d1--_")
+    '"_bZ2d1--_"'
+    >>> revision_etag("_bZ2d1--_", ["title"])
+    '"_bZ2d1--_.480db31e"'
+    """
+    if not variant:
+        return f'"{revision}"'
+    return f'"{revision}.{make_etag(*variant)[1:9]}"'
+
+
+def revision_of(etag: str) -> str:
+    """
+    >>> revision_of('"_bZ2d1--_.480db31e"')
+    '_bZ2d1--_'
+    """
+    return etag.strip('"').split(".")[0]
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """
+    Whether `etag` is one of the entity tags of an If-None-Match `header`
+    (using the weak comparison).
+
+    >>> etag_matches('"a", W/"b"', '"b"')
+    True
+    >>> etag_matches("*", '"c"')
+    True
+    """
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class Conditions:
+    """
+    The conditional request headers, to use with `Depends()`.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        response: Response,
+        if_none_match: Optional[str] = Header(None),
+        if_match: Optional[str] = Header(None),
+    ) -> None:
+        self.request, self.response = request, response
+        self.if_none_match, self.if_match = if_none_match, if_match
+
+    def check_not_modified(self, etag: Optional[str]) -> None:
+        """
+        Answers `304 Not Modified` if the client already has this representation,
+        else sends its `etag`.
+        """
+        if etag is None:
+            return
+        if etag_matches(self.if_none_match, etag):
+            raise CacheHit(status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        self.response.headers["ETag"] = etag
+
+    def if_match_revisions(self) -> Optional[list[str]]:
+        """
+        Revisions that a resource must be at to satisfy the If-Match condition,
+        or `None` if any revision does.
+        """
+        if self.if_match is None or self.if_match.strip() == "*":
+            return None
+        return [
+            revision_of(tag.strip())
+            for tag in self.if_match.split(",")
+            # If-Match uses the strong comparison
+            if not tag.strip().startswith("W/")
+        ]
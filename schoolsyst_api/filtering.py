@@ -0,0 +1,181 @@
+"""
+The `?filter=` and `?sort=` query parameters of list routes:
+
+    /homework/?filter=subject_key eq X and due_at lt 2026-11-01&sort=-due_at
+
+A filter is made of conditions joined by `and`. Each one is a field, an operator
+(`eq`, `ne`, `lt`, `le`, `gt`, `ge` or `in`) and a value, in double quotes if it
+contains spaces. `in` takes comma-separated values, and `null` matches empty fields.
+Sorting is on comma-separated fields, in descending order when prefixed with `-`.
+
+Fields are checked against the resource's model and values validated with their
+field's type, then bound as parameters of AQL conditions: nothing from the query
+string ends up in the query itself, except field names that exist on the model.
+"""
+import re
+from contextlib import suppress
+from datetime import date, datetime, time
+from typing import Any, Optional
+
+from fastapi import HTTPException, Query, status
+from pydantic.fields import SHAPE_SINGLETON, ModelField
+from schoolsyst_api import codec
+from schoolsyst_api.models import BaseModel
+
+OPERATORS = {
+    "eq": "==",
+    "ne": "!=",
+    "lt": "<",
+    "le": "<=",
+    "gt": ">",
+    "ge": ">=",
+    "in": "IN",
+}
+MAX_CONDITIONS = 10
+TOKEN = re.compile(r'\s*(?:"((?:[^"\\]|\\.)*)"|([^\s"]+))')
+
+
+def bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def tokenize(expression: str) -> list[str]:
+    """
+    >>> tokenize('title eq "Chapter \\\\"2\\\\"" and type in test,exercise')
+    ['title', 'eq', 'Chapter "2"', 'and', 'type', 'in', 'test,exercise']
+    """
+    tokens, position = [], 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN.match(expression, position)
+        if not match:
+            raise bad_request(f"Invalid filter: unexpected {expression[position:]!r}")
+        quoted, bare = match.groups()
+        tokens.append(bare if quoted is None else re.sub(r"\\(.)", r"\1", quoted))
+        position = match.end()
+    return tokens
+
+
+def parse_filter(expression: str) -> list[tuple[str, str, str]]:
+    """
+    The (field, operator, value) conditions of a filter.
+
+    >>> parse_filter("subject_key eq abc and due_at lt 2026-11-01")
+    [('subject_key', 'eq', 'abc'), ('due_at', 'lt', '2026-11-01')]
+    """
+    tokens = tokenize(expression)
+    if len(tokens) % 4 != 3 or any(t.lower() != "and" for t in tokens[3::4]):
+        raise bad_request(
+            "Invalid filter: expected conditions like `field operator value`, "
+            "joined by `and`"
+        )
+    conditions = list(zip(tokens[0::4], tokens[1::4], tokens[2::4]))
+    if len(conditions) > MAX_CONDITIONS:
+        raise bad_request(f"Invalid filter: more than {MAX_CONDITIONS} conditions")
+    for _, operator, _ in conditions:
+        if operator not in OPERATORS:
+            raise bad_request(
+                f"Invalid filter: unknown operator {operator}. "
+                f"Available operators: {', '.join(OPERATORS)}"
+            )
+    return conditions
+
+
+def parse_sort(expression: str) -> list[tuple[str, bool]]:
+    """
+    The (field, descending) pairs to sort on.
+
+    >>> parse_sort("-due_at,title")
+    [('due_at', True), ('title', False)]
+    """
+    return [
+        (name.strip().lstrip("-"), name.strip().startswith("-"))
+        for name in expression.split(",")
+        if name.strip()
+    ]
+
+
+def filterable_fields(model: type[BaseModel]) -> dict[str, ModelField]:
+    """
+    Fields of `model` that hold a single value, that can be compared.
+    """
+    return {
+        name: field
+        for name, field in model.__fields__.items()
+        if field.shape == SHAPE_SINGLETON
+        and not (isinstance(field.type_, type) and issubclass(field.type_, BaseModel))
+    }
+
+
+def field_of(model: type[BaseModel], name: str) -> ModelField:
+    fields = filterable_fields(model)
+    if name not in fields:
+        raise bad_request(
+            f"Cannot filter or sort on {name}. "
+            f"Available fields: {', '.join(sorted(fields))}"
+        )
+    return fields[name]
+
+
+def validate_value(model: type[BaseModel], field: ModelField, raw: str) -> Any:
+    """
+    `raw` as stored in the database, if it is a valid value for `field`.
+    """
+    if raw == "null":
+        if not field.allow_none:
+            raise bad_request(f"{field.name} cannot be null")
+        return None
+    if isinstance(field.type_, type) and issubclass(field.type_, datetime):
+        # Dates stand for their midnight
+        with suppress(ValueError):
+            raw = datetime.combine(date.fromisoformat(raw), time()).isoformat()
+    value, errors = field.validate(raw, {}, loc=field.name, cls=model)
+    if errors:
+        raise bad_request(f"Invalid value for {field.name}: {raw!r}")
+    return codec.loads(codec.dumps(value))
+
+
+class Filtering:
+    """
+    The `?filter=` and `?sort=` query parameters, to use with `Depends()`.
+    """
+
+    def __init__(
+        self,
+        filter_: Optional[str] = Query(
+            None,
+            alias="filter",
+            description="Conditions like `due_at lt 2026-11-01`, joined by `and`. "
+            "Operators: eq, ne, lt, le, gt, ge, in (with comma-separated values)",
+        ),
+        sort: Optional[str] = Query(
+            None,
+            description="Comma-separated fields to sort on, "
+            "prefixed with `-` for descending order",
+        ),
+    ) -> None:
+        self.conditions = parse_filter(filter_) if filter_ else []
+        self.sort = parse_sort(sort) if sort else []
+
+    def compile(self, model: type[BaseModel]) -> tuple[list[str], dict[str, Any]]:
+        """
+        AQL conditions on `doc`, and the bind variables they use.
+        """
+        conditions, bind_vars = [], {}
+        for i, (name, operator, raw) in enumerate(self.conditions):
+            field = field_of(model, name)
+            if operator == "in":
+                value = [validate_value(model, field, v) for v in raw.split(",")]
+            else:
+                value = validate_value(model, field, raw)
+            conditions.append(f"doc.{field.alias} {OPERATORS[operator]} @filter{i}")
+            bind_vars[f"filter{i}"] = value
+        return conditions, bind_vars
+
+    def sort_fields(self, model: type[BaseModel]) -> list[tuple[str, bool]]:
+        """
+        (stored name, descending) of the fields to sort on.
+        """
+        return [
+            (field_of(model, name).alias, descending) for name, descending in self.sort
+        ]
@@ -5,22 +5,50 @@ from fastapi import Depends
 from fastapi_utils.inferring_router import InferringRouter
 from schoolsyst_api import database
 from schoolsyst_api.accounts.users import User, get_current_confirmed_user
+from schoolsyst_api.coalescing import Coalescing
+from schoolsyst_api.etags import Conditions, precondition_failed_responses
+from schoolsyst_api.filtering import Filtering
 from schoolsyst_api.grades.models import Grade, InGrade, PatchGrade
 from schoolsyst_api.models import ObjectBareKey
-from schoolsyst_api.resource_base import ResourceRoutesGenerator
+from schoolsyst_api.resource_base import (
+    Expansion,
+    Fieldset,
+    Pagination,
+    Relation,
+    ResourceRoutesGenerator,
+)
+from schoolsyst_api.subjects.models import Subject
 
 router = InferringRouter()
 helper = ResourceRoutesGenerator(
-    name_sg="grade", name_pl="grades", model_in=InGrade, model_out=Grade
+    name_sg="grade",
+    name_pl="grades",
+    model_in=InGrade,
+    model_out=Grade,
+    sort_by=("obtained_at",),
+    relations={"subject": Relation("subject_key", "subjects", Subject)},
 )
 
 
 @router.get("/grades/")
 def list_grades(
+    page: Pagination = Depends(),
+    fieldset: Fieldset = Depends(),
+    expansion: Expansion = Depends(),
+    conditions: Conditions = Depends(),
+    filtering: Filtering = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ) -> list[Grade]:
-    return helper.list(db, current_user)
+    return helper.list(
+        db,
+        current_user,
+        page,
+        fieldset=fieldset,
+        expansion=expansion,
+        conditions=conditions,
+        filtering=filtering,
+    )
 
 
 @router.post("/grades/", status_code=201)
@@ -35,28 +63,34 @@ def create_grade(
 @router.get("/grades/{key}")
 def get_grade(
     key: ObjectBareKey,
+    fieldset: Fieldset = Depends(),
+    expansion: Expansion = Depends(),
+    conditions: Conditions = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ) -> Grade:
-    return helper.get(db, current_user, key)
+    return helper.get(db, current_user, key, fieldset, conditions, expansion)
 
 
-@router.delete("/grades/{key}")
+@router.delete("/grades/{key}", responses=precondition_failed_responses)
 def delete_grade(
     key: ObjectBareKey,
+    conditions: Conditions = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ):
-    return helper.delete(db, current_user, key)
+    return helper.delete(db, current_user, key, conditions)
 
 
-@router.patch("/grades/{key}")
+@router.patch("/grades/{key}", responses=precondition_failed_responses)
 def update_grade(
     key: ObjectBareKey,
     changes: PatchGrade,
+    conditions: Conditions = Depends(),
+    coalescing: Coalescing = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ) -> Grade:
     if changes.actual:
         changes.obtained_at = datetime.now()
-    return helper.update(db, current_user, key, changes)
+    return helper.update(db, current_user, key, changes, conditions, coalescing)
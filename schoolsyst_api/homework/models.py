@@ -60,6 +60,13 @@ class InHomework(BaseModel):
     notes: list[ObjectKey] = []
     grades: list[ObjectKey] = []
 
+    computed_from = {
+        "completed": {"explicit_progress", "tasks"},
+        "progress": {"explicit_progress", "tasks"},
+        "late": {"explicit_progress", "tasks", "due_at"},
+        "progress_from_tasks": {"tasks"},
+    }
+
     @property
     def completed(self) -> bool:
         return self.progress >= 1
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Union
 
 from arango.database import StandardDatabase
 from fastapi import Depends, HTTPException, Query, status
@@ -6,15 +7,47 @@ from fastapi_utils.inferring_router import InferringRouter
 from schoolsyst_api import database
 from schoolsyst_api.accounts.models import User
 from schoolsyst_api.accounts.users import get_current_confirmed_user
+from schoolsyst_api.coalescing import Coalescing
+from schoolsyst_api.etags import Conditions, precondition_failed_responses
+from schoolsyst_api.filtering import Filtering
+from schoolsyst_api.grades.models import Grade
 from schoolsyst_api.homework.models import Homework, InHomework, PatchHomework
+from schoolsyst_api.json_patch import PatchOperation
 from schoolsyst_api.models import ObjectBareKey
-from schoolsyst_api.resource_base import ResourceRoutesGenerator
+from schoolsyst_api.notes.models import Note
+from schoolsyst_api.resource_base import (
+    Expansion,
+    Fieldset,
+    Pagination,
+    Relation,
+    ResourceRoutesGenerator,
+)
+from schoolsyst_api.subjects.models import Subject
 
 router = InferringRouter()
 helper = ResourceRoutesGenerator(
-    name_sg="homework", name_pl="homework", model_in=InHomework, model_out=Homework,
+    name_sg="homework",
+    name_pl="homework",
+    model_in=InHomework,
+    model_out=Homework,
+    sort_by=("due_at",),
+    time_dependent_on="due_at",
+    relations={
+        "subject": Relation("subject_key", "subjects", Subject),
+        "grades": Relation("grades", "grades", Grade, many=True),
+        "notes": Relation("notes", "notes", Note, many=True),
+    },
 )
 
+# AQL equivalent of `not homework.completed`
+NOT_COMPLETED = """(
+    doc.explicit_progress || (
+        LENGTH(doc.tasks)
+        ? COUNT(doc.tasks[* FILTER CURRENT.completed]) / LENGTH(doc.tasks)
+        : 0
+    )
+) < 1"""
+
 
 @router.post("/homework/", status_code=status.HTTP_201_CREATED)
 def create_homework(
@@ -28,26 +61,46 @@ def create_homework(
 @router.get("/homework/")
 def list_homework(
     all: bool = Query(False),
+    page: Pagination = Depends(),
+    fieldset: Fieldset = Depends(),
+    expansion: Expansion = Depends(),
+    conditions: Conditions = Depends(),
+    filtering: Filtering = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ) -> list[Homework]:
     """
     If ?all is not specified, do not return completed homework
     """
-    homework = helper.list(db, current_user)
-    if not all:
-        homework = [h for h in homework if not h.completed]
-    return homework
+    return helper.list(
+        db,
+        current_user,
+        page,
+        filters=[] if all else [NOT_COMPLETED],
+        fieldset=fieldset,
+        expansion=expansion,
+        conditions=conditions,
+        filtering=filtering,
+    )
 
 
-@router.patch("/homework/{key}")
+@router.patch("/homework/{key}", responses=precondition_failed_responses)
 def update_homework(
     key: ObjectBareKey,
-    changes: PatchHomework,
+    changes: Union[list[PatchOperation], PatchHomework],
+    conditions: Conditions = Depends(),
+    coalescing: Coalescing = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ) -> Homework:
-    return helper.update(db, current_user, key, changes)
+    """
+    Takes either the fields to change, or a JSON Patch
+    (`application/json-patch+json`, see `schoolsyst_api.json_patch`)
+    to change some of the tasks without sending all of them.
+    """
+    if isinstance(changes, list):
+        return helper.patch(db, current_user, key, changes, conditions)
+    return helper.update(db, current_user, key, changes, conditions, coalescing)
 
 
 @router.put("/homework/{key}/complete_task/{task_key}")
@@ -59,31 +112,43 @@ def complete_homework_task(
 ) -> Homework:
     homework = helper.get(db, current_user, key)
     try:
-        task = [t for t in homework.tasks if t.key == task_key][0]
-    except IndexError:
+        index = [t.key for t in homework.tasks].index(task_key)
+    except ValueError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No task with key {task_key} in subject",
         )
 
-    changes = PatchHomework(
-        tasks=[t.dict(by_alias=True) for t in homework.tasks if t.key != task_key]
-        + [{**task.dict(), "completed": True, "completed_at": datetime.now()}]
+    # Only write that task, failing if the tasks were reordered in the meantime
+    return helper.patch(
+        db,
+        current_user,
+        key,
+        [
+            PatchOperation(op="test", path=f"/tasks/{index}/key", value=task_key),
+            PatchOperation(op="replace", path=f"/tasks/{index}/completed", value=True),
+            PatchOperation(
+                op="replace", path=f"/tasks/{index}/completed_at", value=datetime.now()
+            ),
+        ],
     )
-    return helper.update(db, current_user, key, changes)
 
 
 @router.get("/homework/{key}")
 def get_homework(
     key: ObjectBareKey,
+    fieldset: Fieldset = Depends(),
+    expansion: Expansion = Depends(),
+    conditions: Conditions = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ) -> Homework:
-    return helper.get(db, current_user, key)
+    return helper.get(db, current_user, key, fieldset, conditions, expansion)
 
 
 delete_a_homework_responses = {
     204: {},
+    **precondition_failed_responses,
     403: {"description": "No subject with key {} found"},
     404: {"description": "Currently logged-in user does not own the specified subject"},
 }
@@ -96,7 +161,8 @@ delete_a_homework_responses = {
 )
 def delete_homework(
     key: ObjectBareKey,
+    conditions: Conditions = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ):
-    return helper.delete(db, current_user, key)
+    return helper.delete(db, current_user, key, conditions)
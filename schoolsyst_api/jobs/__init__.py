@@ -0,0 +1,100 @@
+"""
+Background jobs.
+
+Work too long to be done while the client waits (deleting an account, etc.)
+is put in the `jobs` collection with `enqueue`, and done by job runners
+(see `schoolsyst_api.jobs.runner`), that run inside the API's process
+or separately. Clients follow a job's progress with GET /jobs/{key}.
+
+Job types are declared with the `job_type` decorator:
+
+    @job_type("delete_account", concurrency=1)
+    def delete_account(db, job, report_progress):
+        ...
+
+Handlers get the job and a function to report their progress (from 0 to 1) with,
+and return the job's result. Since a job can be run again when its runner dies
+or it raises an exception, handlers must be idempotent.
+
+Finished jobs are kept for JOB_RETENTION (see `schoolsyst_api.jobs.runner`).
+Jobs of types declared with `readable_by_key=True` can be followed without
+being logged in, by their key: their keys must then be unguessable.
+"""
+from typing import Any, Callable, NamedTuple, Optional
+
+import nanoid
+from arango.database import StandardDatabase
+from fastapi_utils.inferring_router import InferringRouter
+from schoolsyst_api.jobs.models import Job
+from schoolsyst_api.models import UserKey
+
+JobHandler = Callable[[StandardDatabase, Job, Callable[[float], None]], Any]
+
+
+class JobType(NamedTuple):
+    handler: JobHandler
+    # How many jobs of this type a runner does at the same time
+    concurrency: int
+    max_attempts: int
+    # Whether GET /jobs/{key} answers without authenticating the job's owner
+    readable_by_key: bool = False
+
+
+job_types: dict[str, JobType] = {}
+
+
+def job_type(
+    name: str,
+    concurrency: int = 1,
+    max_attempts: int = 3,
+    readable_by_key: bool = False,
+) -> Callable[[JobHandler], JobHandler]:
+    """
+    Registers the decorated function as the handler of jobs of type `name`.
+    """
+
+    def decorator(handler: JobHandler) -> JobHandler:
+        job_types[name] = JobType(handler, concurrency, max_attempts, readable_by_key)
+        return handler
+
+    return decorator
+
+
+def enqueue(
+    db: StandardDatabase,
+    type: str,
+    owner_key: Optional[UserKey] = None,
+    arguments: Optional[dict[str, Any]] = None,
+    priority: int = 0,
+    key: Optional[str] = None,
+) -> Job:
+    """
+    Queues a job of the given type.
+    If a `key` is given and a job with that key is already queued or running,
+    that job is returned instead of queuing another one.
+    """
+    job = Job(
+        _key=key or nanoid.generate(),
+        owner_key=owner_key,
+        type=type,
+        arguments=arguments or {},
+        priority=priority,
+        max_attempts=job_types[type].max_attempts,
+    )
+    return Job(
+        **next(
+            db.aql.execute(
+                """
+                UPSERT { _key: @job._key }
+                INSERT @job
+                UPDATE OLD.status IN ["queued", "running"] ? {} : UNSET(@job, "_key")
+                IN jobs
+                RETURN NEW
+                """,
+                bind_vars={"job": job.to_db()},
+            )
+        )
+    )
+
+
+router = InferringRouter()
@@ -0,0 +1,62 @@
+from datetime import datetime
+from enum import auto
+from typing import Any, Optional
+
+from fastapi_utils.enums import StrEnum
+from pydantic import Field, constr
+from schoolsyst_api.models import BaseModel, Primantissa, UserKey
+
+# Generated keys are nanoids, deduplicated jobs use their own keys
+JobKey = constr(regex=r"^[\w-]{1,64}$")
+
+
+class JobStatus(StrEnum):
+    """
+    Lifecycle of a job.
+
+    - queued — waiting to be (re)tried, at `run_after`
+    - running — leased by a runner, until `lease_until`
+    - succeeded
+    - failed — gave up after `max_attempts` attempts
+    """
+
+    queued = auto()
+    running = auto()
+    succeeded = auto()
+    failed = auto()
+
+
+class PublicJob(BaseModel):
+    """
+    What clients see of a job: no arguments, stack traces or lease.
+    """
+
+    key: str = Field(..., alias="_key")
+    type: str
+    status: JobStatus = JobStatus.queued
+    progress: Primantissa = 0
+    result: Optional[Any] = None
+    # A short description of the last error, without the stack trace
+    error: str = ""
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    # Finished jobs are removed from the database at that time
+    expires_at: Optional[datetime] = None
+
+
+class Job(PublicJob):
+    """
+    A unit of work done in the background by a job runner
+    (see `schoolsyst_api.jobs.runner`).
+    """
+
+    owner_key: Optional[UserKey] = None
+    arguments: dict[str, Any] = {}
+    # Higher priorities are run first
+    priority: int = 0
+    attempts: int = 0
+    max_attempts: int = 3
+    last_error: str = ""
+    run_after: datetime = Field(default_factory=datetime.utcnow)
+    lease_id: Optional[str] = None
+    lease_until: Optional[datetime] = None
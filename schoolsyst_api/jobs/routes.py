@@ -0,0 +1,33 @@
+from typing import Optional
+
+from arango.database import StandardDatabase
+from fastapi import Depends, HTTPException, status
+from schoolsyst_api import database
+from schoolsyst_api.accounts.auth import optional_oauth2_scheme
+from schoolsyst_api.accounts.users import get_current_user
+from schoolsyst_api.jobs import job_types, router
+from schoolsyst_api.jobs.models import JobKey, PublicJob
+
+get_job_responses = {404: {"description": "No job with this key"}}
+
+
+@router.get("/jobs/{key}", responses=get_job_responses)
+async def get_job(
+    key: JobKey,
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: StandardDatabase = Depends(database.get),
+) -> PublicJob:
+    """
+    Get the status, progress and result of a background job started by the user.
+    Jobs whose type is readable by key (see `schoolsyst_api.jobs.job_type`),
+    like account deletions, are also answered without authentication.
+    """
+    job = db.collection("jobs").get(key)
+    job_type = job_types.get(job["type"]) if job else None
+    if not (job_type and job_type.readable_by_key):
+        current_user = await get_current_user(token or "", db)
+        if job is None or job["owner_key"] != current_user.key:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND, detail="No job with this key"
+            )
+    return PublicJob(**job)
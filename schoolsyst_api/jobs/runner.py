@@ -0,0 +1,337 @@
+"""
+Runs queued jobs (see `schoolsyst_api.jobs`):
+
+    python -m schoolsyst_api.jobs.runner --workers 4
+
+The API also runs jobs in its own process, with JOBS_WORKERS threads
+(set it to 0 to leave jobs to separate runners only).
+
+Jobs are leased to a runner while it works on them: if it stops responding
+(its lease is not renewed by progress reports), another runner picks the job up again.
+Failed jobs are retried with an exponential backoff, up to their `max_attempts`.
+Finished jobs expire after JOB_RETENTION, and are then removed by a TTL index.
+Each runner does at most `workers` jobs at the same time, and at most the job type's
+`concurrency` of the same type.
+"""
+import os
+import traceback
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Event, Lock, Thread
+from typing import Any, Optional
+
+import nanoid
+from arango.database import StandardDatabase
+from arango.exceptions import AQLQueryExecuteError
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from schoolsyst_api import database
+from schoolsyst_api.jobs import job_types
+from schoolsyst_api.jobs.models import Job, JobStatus
+
+DEFAULT_WORKERS = 2
+# For how long a job is left to a runner after it was claimed or reported progress
+LEASE_DURATION = timedelta(minutes=5)
+RETRY_DELAY_BASE = timedelta(seconds=10)
+RETRY_DELAY_MAX = timedelta(hours=1)
+# For how long the outcome of a finished job can be read
+JOB_RETENTION = timedelta(days=7)
+# Time to wait before checking for jobs again when there is none, in seconds
+POLL_INTERVAL = 1
+# ArangoDB's error code for write-write conflicts
+CONFLICT = 1200
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """
+    Time to wait before running a job again, after `attempts` failed attempts.
+
+    >>> retry_delay(1)
+    datetime.timedelta(seconds=10)
+    >>> retry_delay(4)
+    datetime.timedelta(seconds=80)
+    >>> retry_delay(20)
+    datetime.timedelta(seconds=3600)
+    """
+    return min(RETRY_DELAY_BASE * 2 ** (attempts - 1), RETRY_DELAY_MAX)
+
+
+def error_message(exception: Exception) -> str:
+    """
+    What clients are told of an error, without its stack trace.
+
+    >>> error_message(ValueError("nope"))
+    'ValueError: nope'
+    """
+    return traceback.format_exception_only(type(exception), exception)[-1].strip()
+
+
+def claim_job(db: StandardDatabase, types: list[str]) -> Optional[Job]:
+    """
+    Leases the job with the highest priority among those of the given types that are due,
+    or whose runner stopped responding.
+    """
+    now = datetime.utcnow()
+    try:
+        claimed = list(
+            db.aql.execute(
+                """
+                FOR job IN jobs
+                    FILTER job.type IN @types
+                    FILTER (job.status == "queued" AND job.run_after <= @now)
+                        OR (
+                            job.status == "running"
+                            AND job.lease_until <= @now
+                            AND job.attempts < job.max_attempts
+                        )
+                    SORT job.priority DESC, job.run_after
+                    LIMIT 1
+                    UPDATE job WITH {
+                        status: "running",
+                        attempts: job.attempts + 1,
+                        lease_id: @lease_id,
+                        lease_until: @lease_until,
+                    } IN jobs
+                    RETURN NEW
+                """,
+                bind_vars={
+                    "types": types,
+                    "now": now.isoformat(),
+                    "lease_id": nanoid.generate(),
+                    "lease_until": (now + LEASE_DURATION).isoformat(),
+                },
+            )
+        )
+    except AQLQueryExecuteError as error:
+        if error.error_code == CONFLICT:
+            # Another runner claimed it at the same time
+            return None
+        raise
+    return Job(**claimed[0]) if claimed else None
+
+
+def update_leased_job(db: StandardDatabase, job: Job, changes: dict[str, Any]) -> bool:
+    """
+    Updates `job`, unless it was leased to another runner since.
+    Returns whether it was updated.
+    """
+    return bool(
+        list(
+            db.aql.execute(
+                """
+                LET job = DOCUMENT("jobs", @key)
+                FILTER job.lease_id == @lease_id
+                UPDATE job WITH @changes IN jobs
+                RETURN true
+                """,
+                bind_vars={
+                    "key": job.key,
+                    "lease_id": job.lease_id,
+                    "changes": jsonable_encoder(changes),
+                },
+            )
+        )
+    )
+
+
+def fail_abandoned_jobs(db: StandardDatabase) -> None:
+    """
+    Marks as failed the jobs whose runner stopped responding during their last attempt.
+    """
+    now = datetime.utcnow()
+    expires_at = now + JOB_RETENTION
+    db.aql.execute(
+        """
+        FOR job IN jobs
+            FILTER job.status == "running"
+                AND job.lease_until <= @now
+                AND job.attempts >= job.max_attempts
+            UPDATE job WITH {
+                status: "failed",
+                error: "The job runner stopped responding",
+                last_error: "The job runner stopped responding",
+                finished_at: @now,
+                expires_at: @expires_at,
+            } IN jobs
+        """,
+        bind_vars={"now": now.isoformat(), "expires_at": expires_at.isoformat()},
+    )
+
+
+def run_job(db: StandardDatabase, job: Job) -> None:
+    """
+    Runs a leased job and records its outcome.
+    """
+
+    def report_progress(progress: float) -> None:
+        update_leased_job(
+            db,
+            job,
+            {
+                "progress": min(max(progress, 0), 1),
+                "lease_until": datetime.utcnow() + LEASE_DURATION,
+            },
+        )
+
+    try:
+        result = job_types[job.type].handler(db, job, report_progress)
+    except Exception as exception:
+        now = datetime.utcnow()
+        error = traceback.format_exc(limit=5)
+        if job.attempts >= job.max_attempts:
+            changes = {
+                "status": JobStatus.failed,
+                "finished_at": now,
+                "expires_at": now + JOB_RETENTION,
+            }
+        else:
+            changes = {
+                "status": JobStatus.queued,
+                "run_after": now + retry_delay(job.attempts),
+            }
+        update_leased_job(
+            db,
+            job,
+            {
+                **changes,
+                "error": error_message(exception),
+                "last_error": error,
+                "lease_id": None,
+            },
+        )
+        return
+    now = datetime.utcnow()
+    update_leased_job(
+        db,
+        job,
+        {
+            "status": JobStatus.succeeded,
+            "progress": 1,
+            "result": result,
+            "finished_at": now,
+            "expires_at": now + JOB_RETENTION,
+            "lease_id": None,
+        },
+    )
+
+
+class JobRunner:
+    """
+    Claims and runs jobs in a pool of `workers` threads.
+    """
+
+    def __init__(
+        self,
+        db: StandardDatabase,
+        workers: int = DEFAULT_WORKERS,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        self.db, self.workers, self.poll_interval = db, workers, poll_interval
+        # Number of jobs being run, by type
+        self.running: Counter[str] = Counter()
+        self.lock = Lock()
+        # Set when a worker is freed, or when the runner is stopped
+        self.wake_up = Event()
+        self.stopping = Event()
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="job")
+
+    def available_types(self) -> list[str]:
+        """
+        Types of jobs that a free worker can run right now.
+        """
+        with self.lock:
+            if sum(self.running.values()) >= self.workers:
+                return []
+            return [
+                name
+                for name, job_type in job_types.items()
+                if self.running[name] < job_type.concurrency
+            ]
+
+    def _run(self, job: Job) -> None:
+        try:
+            run_job(self.db, job)
+        finally:
+            with self.lock:
+                self.running[job.type] -= 1
+            self.wake_up.set()
+
+    def run_available_jobs(self) -> int:
+        """
+        Claims jobs until there are no more due or no free worker left.
+        Returns the number of jobs started.
+        """
+        started = 0
+        while not self.stopping.is_set() and (types := self.available_types()):
+            job = claim_job(self.db, types)
+            if job is None:
+                break
+            with self.lock:
+                self.running[job.type] += 1
+            self.executor.submit(self._run, job)
+            started += 1
+        return started
+
+    def loop(self) -> None:
+        while not self.stopping.is_set():
+            try:
+                if not self.run_available_jobs():
+                    fail_abandoned_jobs(self.db)
+                    self.wake_up.wait(self.poll_interval)
+            except Exception:
+                traceback.print_exc()
+                self.stopping.wait(self.poll_interval)
+            self.wake_up.clear()
+
+    def start(self) -> "JobRunner":
+        """
+        Runs jobs from a background thread.
+        """
+        Thread(target=self.loop, daemon=True, name="job-runner").start()
+        return self
+
+    def stop(self, wait: bool = True) -> None:
+        """
+        Stops claiming jobs, and waits for the ones being run to finish if `wait`.
+        """
+        self.stopping.set()
+        self.wake_up.set()
+        self.executor.shutdown(wait=wait)
+
+
+in_process_runner: Optional[JobRunner] = None
+
+
+def start_in_process() -> None:
+    global in_process_runner
+    workers = int(os.getenv("JOBS_WORKERS") or DEFAULT_WORKERS)
+    if workers > 0:
+        in_process_runner = JobRunner(database.get(), workers).start()
+
+
+def stop_in_process() -> None:
+    if in_process_runner is not None:
+        in_process_runner.stop()
+
+
+def main() -> None:
+    parser = ArgumentParser(prog="python -m schoolsyst_api.jobs.runner")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    load_dotenv(".env")
+    # Registers the job types, declared next to the routes that queue them
+    import schoolsyst_api.main  # noqa: F401
+
+    runner = JobRunner(database.get(), args.workers)
+    print(f"[JOBS] Running {', '.join(job_types)} jobs with {args.workers} workers")
+    try:
+        runner.loop()
+    except KeyboardInterrupt:
+        runner.stop(wait=True)
+
+
+if __name__ == "__main__":
+    main()
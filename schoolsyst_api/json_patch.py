@@ -0,0 +1,218 @@
+"""
+JSON Patch (RFC 6902) bodies for the PATCH routes of homework, events and settings,
+sent with the `application/json-patch+json` content type:
+
+    [
+        {"op": "replace", "path": "/tasks/2/completed", "value": true},
+        {"op": "add", "path": "/tasks/-", "value": {"title": "Read chapter 3"}}
+    ]
+
+Instead of sending (and rewriting) a whole list to change one of its elements,
+operations are compiled to an AQL expression for each field they touch, so that the
+database only receives the values that change and puts them in place.
+
+Supported operations are `add`, `remove`, `replace` and `test`, on a field,
+on an element of a list field (by index, or `-` to append) or on a field of such
+an element. Values are validated against the patch model of the resource.
+When an operation targets an element that does not exist, or a `test` fails,
+nothing is changed and the request fails with 412 Precondition Failed,
+just like with an If-Match condition that does not hold.
+"""
+from typing import Any, Literal, NamedTuple, Sequence
+
+from fastapi import HTTPException, status
+from pydantic.fields import SHAPE_LIST, ModelField
+from schoolsyst_api import codec
+from schoolsyst_api.models import BaseModel
+
+MEDIA_TYPE = "application/json-patch+json"
+MAX_OPERATIONS = 50
+
+
+class PatchOperation(BaseModel):
+    op: Literal["add", "remove", "replace", "test"]
+    path: str
+    value: Any = None
+
+
+class CompiledPatch(NamedTuple):
+    # AQL LET and FILTER statements on `doc`, that compute the new values of the
+    # fields and check that the patch applies
+    statements: list[str]
+    # Stored name of each field touched -> AQL variable with its new value
+    fields: dict[str, str]
+    bind_vars: dict[str, Any]
+
+
+def unprocessable(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail
+    )
+
+
+def parse_pointer(path: str) -> list[str]:
+    """
+    The reference tokens of a JSON pointer.
+
+    >>> parse_pointer("/tasks/0/title")
+    ['tasks', '0', 'title']
+    >>> parse_pointer("/a~1b~0c")
+    ['a/b~c']
+    """
+    if not path.startswith("/"):
+        raise unprocessable(f"Invalid path {path!r}: must start with /")
+    return [
+        token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")
+    ]
+
+
+def parse_index(token: str, path: str) -> int:
+    """
+    >>> parse_index("12", "/tasks/12")
+    12
+    """
+    if not token.isdigit() or (token.startswith("0") and token != "0"):
+        raise unprocessable(f"Invalid path {path}: {token!r} is not an index")
+    return int(token)
+
+
+def field_of(model: type[BaseModel], name: str, path: str) -> ModelField:
+    if name not in model.__fields__:
+        raise unprocessable(
+            f"Invalid path {path}: no field {name}. "
+            f"Available fields: {', '.join(model.__fields__)}"
+        )
+    return model.__fields__[name]
+
+
+def element_model(field: ModelField) -> type[BaseModel]:
+    if not (isinstance(field.type_, type) and issubclass(field.type_, BaseModel)):
+        raise unprocessable(f"Elements of {field.name} have no fields")
+    return field.type_
+
+
+def validate_value(
+    model: type[BaseModel], field: ModelField, operation: PatchOperation
+) -> Any:
+    """
+    The value of `operation` as stored in the database, if it is valid for `field`.
+    """
+    value, errors = field.validate(operation.value, {}, loc=field.name, cls=model)
+    if errors:
+        raise unprocessable(f"Invalid value for {operation.path}: {operation.value!r}")
+    return codec.loads(codec.dumps(value))
+
+
+def default_value(field: ModelField) -> Any:
+    """
+    What removing `field` sets it to, as stored in the database.
+    """
+    if field.required:
+        raise unprocessable(f"Cannot remove {field.name}, it is required")
+    default = field.default_factory() if field.default_factory else field.default
+    return codec.loads(codec.dumps(default))
+
+
+def compile_patch(
+    model: type[BaseModel], operations: Sequence[PatchOperation]
+) -> CompiledPatch:
+    """
+    Compiles JSON Patch `operations` on a document of `model`, bound to `doc`.
+    Operations on the same field are applied in order, each one to the value
+    the previous one computed.
+    """
+    if len(operations) > MAX_OPERATIONS:
+        raise unprocessable(f"A patch has at most {MAX_OPERATIONS} operations")
+    statements: list[str] = []
+    fields: dict[str, str] = {}
+    bind_vars: dict[str, Any] = {}
+    for i, operation in enumerate(operations):
+        op, path = operation.op, operation.path
+        tokens = parse_pointer(path)
+        field = field_of(model, tokens[0], path)
+        current = fields.get(field.alias, f"doc.{field.alias}")
+        value = f"@value{i}"
+
+        def assign(expression: str) -> None:
+            statements.append(f"LET patched{i} = {expression}")
+            fields[field.alias] = f"patched{i}"
+
+        if len(tokens) == 1:
+            if op == "remove":
+                bind_vars[f"value{i}"] = default_value(field)
+            else:
+                bind_vars[f"value{i}"] = validate_value(model, field, operation)
+            if op == "test":
+                statements.append(f"FILTER {current} == {value}")
+            else:
+                assign(value)
+            continue
+
+        if field.shape != SHAPE_LIST:
+            raise unprocessable(f"Invalid path {path}: {field.name} is not a list")
+        element = field.sub_fields[0]
+
+        if tokens[1] == "-":
+            if op != "add" or len(tokens) != 2:
+                raise unprocessable(f"Invalid path {path}: - can only be added to")
+            bind_vars[f"value{i}"] = validate_value(model, element, operation)
+            assign(f"PUSH(NOT_NULL({current}, []), {value})")
+            continue
+
+        index = parse_index(tokens[1], path)
+        before, after = (
+            f"SLICE({current}, 0, {index})",
+            f"SLICE({current}, {index + 1})",
+        )
+        statements.append(
+            f"FILTER LENGTH({current}) {'>=' if op == 'add' and len(tokens) == 2 else '>'} "
+            f"{index}"
+        )
+
+        if len(tokens) == 2:
+            if op == "remove":
+                assign(f"REMOVE_NTH({current}, {index})")
+                continue
+            bind_vars[f"value{i}"] = validate_value(model, element, operation)
+            if op == "test":
+                statements.append(f"FILTER NTH({current}, {index}) == {value}")
+            elif op == "add":
+                assign(
+                    f"APPEND(APPEND({before}, [{value}]), SLICE({current}, {index}))"
+                )
+            else:
+                assign(f"APPEND(APPEND({before}, [{value}]), {after})")
+            continue
+
+        if len(tokens) != 3:
+            raise unprocessable(f"Invalid path {path}: too deep")
+        sub_model = element_model(element)
+        sub_field = field_of(sub_model, tokens[2], path)
+        target = f"NTH({current}, {index})"
+        if op == "remove":
+            bind_vars[f"value{i}"] = default_value(sub_field)
+        else:
+            bind_vars[f"value{i}"] = validate_value(sub_model, sub_field, operation)
+        if op == "test":
+            statements.append(f"FILTER {target}.{sub_field.alias} == {value}")
+        else:
+            assign(
+                f"APPEND(APPEND({before}, "
+                f"[MERGE({target}, {{ {sub_field.alias}: {value} }})]), {after})"
+            )
+
+    return CompiledPatch(statements, fields, bind_vars)
+
+
+def update_expression(patch: CompiledPatch) -> str:
+    """
+    An AQL object with the new values of the fields touched by `patch`.
+
+    >>> update_expression(CompiledPatch([], {"tasks": "patched0"}, {}))
+    '{ tasks: patched0 }'
+    """
+    return (
+        "{ "
+        + ", ".join(f"{name}: {value}" for name, value in patch.fields.items())
+        + " }"
+    )
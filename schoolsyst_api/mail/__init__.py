@@ -0,0 +1,82 @@
+"""
+Outgoing emails.
+
+Routes never talk to the mail server: they put emails in the `outbox` collection with
+`queue_email`, and a separate process (`python -m schoolsyst_api.mail.dispatcher`)
+sends them in batches.
+"""
+from datetime import datetime, timedelta
+from hashlib import sha256
+from typing import Optional
+
+from arango.database import StandardDatabase
+from schoolsyst_api.mail.models import OutgoingEmail
+from schoolsyst_api.models import UserKey
+
+# Queuing an email with the same deduplication key as one queued less than
+# DEDUPE_WINDOW ago (or not sent yet) does nothing
+DEDUPE_WINDOW = timedelta(minutes=10)
+
+
+def compose(
+    from_name: str,
+    from_email: str,
+    to_name: str,
+    to_email: str,
+    subject: str,
+    body: str,
+    owner_key: Optional[UserKey] = None,
+    dedupe_key: Optional[str] = None,
+) -> OutgoingEmail:
+    """
+    Creates an email. Unless a `dedupe_key` is given,
+    emails with the same subject to the same address are considered duplicates.
+
+    >>> a = compose("A", "a@example.com", "B", "b@example.com", "Hi", "Hello")
+    >>> b = compose("A", "a@example.com", "B", "b@example.com", "Hi", "Hello again")
+    >>> a.key == b.key
+    True
+    >>> a.key == compose("A", "a@example.com", "C", "c@example.com", "Hi", "Hi").key
+    False
+    """
+    dedupe_key = dedupe_key or f"{to_email}\n{subject}"
+    return OutgoingEmail(
+        _key=sha256(dedupe_key.encode()).hexdigest()[:32],
+        owner_key=owner_key,
+        from_name=from_name,
+        from_email=from_email,
+        to_name=to_name,
+        to_email=to_email,
+        subject=subject,
+        body=body,
+    )
+
+
+def queue_emails(db: StandardDatabase, emails: list[OutgoingEmail]) -> list[bool]:
+    """
+    Puts `emails` in the outbox, in one query.
+    Returns, for each email, whether it was queued (`False` if it is a duplicate).
+    """
+    return list(
+        db.aql.execute(
+            """
+            FOR email IN @emails
+                UPSERT { _key: email._key }
+                INSERT email
+                UPDATE (
+                    OLD.status IN ["pending", "sending"]
+                    OR OLD.created_at > @window_start
+                ) ? {} : UNSET(email, "_key")
+                IN outbox
+                RETURN OLD == null OR NEW.created_at != OLD.created_at
+            """,
+            bind_vars={
+                "emails": [email.to_db() for email in emails],
+                "window_start": (datetime.utcnow() - DEDUPE_WINDOW).isoformat(),
+            },
+        )
+    )
+
+
+def queue_email(db: StandardDatabase, email: OutgoingEmail) -> bool:
+    return queue_emails(db, [email])[0]
@@ -0,0 +1,241 @@
+"""
+Sends the emails waiting in the outbox, in batches, over a pool of SMTP connections
+that stay open between batches:
+
+    python -m schoolsyst_api.mail.dispatcher
+
+The mail server is set with the SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD
+and SMTP_STARTTLS environment variables, and defaults to `localhost:1025`,
+where `python -m schoolsyst_api.mail.local_server` listens.
+
+Failed emails are retried with an exponential backoff, and marked as failed after
+`MAX_ATTEMPTS` attempts. Several dispatchers can run at the same time:
+emails are leased to a dispatcher while it tries to send them.
+"""
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
+from functools import partial
+from queue import Empty, LifoQueue
+from smtplib import (
+    SMTP,
+    SMTPRecipientsRefused,
+    SMTPResponseException,
+    SMTPServerDisconnected,
+)
+from time import sleep
+from typing import Iterator, Optional
+
+from arango.database import StandardDatabase
+from dotenv import load_dotenv
+from schoolsyst_api import database
+from schoolsyst_api.mail.models import OutgoingEmail, OutgoingEmailStatus
+
+BATCH_SIZE = 50
+POOL_SIZE = 4
+MAX_ATTEMPTS = 8
+RETRY_DELAY_BASE = timedelta(seconds=30)
+RETRY_DELAY_MAX = timedelta(hours=6)
+# For how long a dispatcher can try to send a batch before others can claim it
+LEASE_DURATION = timedelta(minutes=5)
+# Time to wait before checking the outbox again when it is empty, in seconds
+POLL_INTERVAL = 2
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """
+    Time to wait before trying again to send an email, after `attempts` failed attempts.
+
+    >>> retry_delay(1)
+    datetime.timedelta(seconds=30)
+    >>> retry_delay(3)
+    datetime.timedelta(seconds=120)
+    >>> retry_delay(20)
+    datetime.timedelta(seconds=21600)
+    """
+    return min(RETRY_DELAY_BASE * 2 ** (attempts - 1), RETRY_DELAY_MAX)
+
+
+def build_message(email: OutgoingEmail) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((email.from_name, email.from_email))
+    message["To"] = formataddr((email.to_name, email.to_email))
+    message["Subject"] = email.subject
+    message.set_content(email.body)
+    return message
+
+
+class SMTPConnectionPool:
+    """
+    Keeps up to `size` SMTP connections open, re-using them across messages.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 1025,
+        size: int = POOL_SIZE,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = False,
+    ) -> None:
+        self.host, self.port, self.size = host, port, size
+        self.username, self.password, self.starttls = username, password, starttls
+        self.idle: LifoQueue[SMTP] = LifoQueue()
+
+    @classmethod
+    def from_environment(cls) -> "SMTPConnectionPool":
+        return cls(
+            host=os.getenv("SMTP_HOST") or "localhost",
+            port=int(os.getenv("SMTP_PORT") or 1025),
+            username=os.getenv("SMTP_USERNAME") or None,
+            password=os.getenv("SMTP_PASSWORD") or None,
+            starttls=(os.getenv("SMTP_STARTTLS") or "").lower() in ("1", "true", "yes"),
+        )
+
+    def connect(self) -> SMTP:
+        connection = SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            connection.starttls()
+        if self.username:
+            connection.login(self.username, self.password or "")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[SMTP]:
+        try:
+            connection = self.idle.get_nowait()
+        except Empty:
+            connection = self.connect()
+        try:
+            yield connection
+        except (SMTPResponseException, SMTPRecipientsRefused):
+            # The server refused the message, the connection itself is fine
+            self.idle.put(connection)
+            raise
+        except Exception:
+            connection.close()
+            raise
+        self.idle.put(connection)
+
+    def send(self, message: EmailMessage) -> None:
+        """
+        Sends `message`, reconnecting once if the server closed an idle connection.
+        """
+        try:
+            with self.connection() as connection:
+                connection.send_message(message)
+        except SMTPServerDisconnected:
+            with self.connection() as connection:
+                connection.send_message(message)
+
+    def close(self) -> None:
+        while True:
+            try:
+                connection = self.idle.get_nowait()
+            except Empty:
+                return
+            try:
+                connection.quit()
+            except OSError:
+                connection.close()
+
+
+def try_sending(pool: SMTPConnectionPool, email: OutgoingEmail) -> Optional[str]:
+    """
+    Sends `email`, returning the error message if that failed.
+    """
+    try:
+        pool.send(build_message(email))
+    except OSError as error:  # SMTPException is a subclass of OSError
+        return f"{type(error).__name__}: {error}"
+    return None
+
+
+def claim_batch(db: StandardDatabase, size: int = BATCH_SIZE) -> list[OutgoingEmail]:
+    """
+    Leases the next `size` emails that are due, so that other dispatchers skip them.
+    """
+    now = datetime.utcnow()
+    return [
+        OutgoingEmail(**email)
+        for email in db.aql.execute(
+            """
+            FOR email IN outbox
+                FILTER email.status IN ["pending", "sending"]
+                    AND email.next_attempt_at <= @now
+                SORT email.next_attempt_at
+                LIMIT @size
+                UPDATE email WITH { status: "sending", next_attempt_at: @lease_until }
+                IN outbox
+                RETURN NEW
+            """,
+            bind_vars={
+                "now": now.isoformat(),
+                "size": size,
+                "lease_until": (now + LEASE_DURATION).isoformat(),
+            },
+        )
+    ]
+
+
+def dispatch_batch(
+    db: StandardDatabase,
+    pool: SMTPConnectionPool,
+    executor: Executor,
+    size: int = BATCH_SIZE,
+) -> int:
+    """
+    Sends a batch of emails and records the outcome of each one.
+    Returns the number of emails that were tried.
+    """
+    emails = claim_batch(db, size)
+    if not emails:
+        return 0
+    errors = executor.map(partial(try_sending, pool), emails)
+
+    now = datetime.utcnow()
+    changes = []
+    for email, error in zip(emails, errors):
+        attempts = email.attempts + 1
+        if error is None:
+            change = {"status": OutgoingEmailStatus.sent, "sent_at": now}
+        elif attempts >= MAX_ATTEMPTS:
+            change = {"status": OutgoingEmailStatus.failed, "last_error": error}
+        else:
+            change = {
+                "status": OutgoingEmailStatus.pending,
+                "last_error": error,
+                "next_attempt_at": now + retry_delay(attempts),
+            }
+        changes.append({"_key": email.key, "attempts": attempts, **change})
+    db.collection("outbox").update_many(changes)
+    return len(emails)
+
+
+def run(
+    db: StandardDatabase, pool: SMTPConnectionPool, poll_interval: float = POLL_INTERVAL
+) -> None:
+    with ThreadPoolExecutor(pool.size) as executor:
+        while True:
+            if not dispatch_batch(db, pool, executor):
+                sleep(poll_interval)
+
+
+def main() -> None:
+    load_dotenv(".env")
+    pool = SMTPConnectionPool.from_environment()
+    print(f"[MAIL] Dispatching emails through {pool.host}:{pool.port}")
+    try:
+        run(database.get(), pool)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
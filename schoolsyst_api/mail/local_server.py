@@ -0,0 +1,113 @@
+"""
+A minimal SMTP server that accepts every message and keeps it in memory
+(and prints it), to develop and test the email dispatcher without a real mail server:
+
+    python -m schoolsyst_api.mail.local_server --port 1025
+
+It only speaks the subset of SMTP that `smtplib` uses to send plain messages.
+"""
+from argparse import ArgumentParser
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+from threading import Lock, Thread
+from typing import NamedTuple
+
+
+class ReceivedMessage(NamedTuple):
+    sender: str
+    recipients: list[str]
+    data: bytes
+
+
+def parse_address(argument: str) -> str:
+    """
+    Extracts the address from the argument of a MAIL or RCPT command.
+
+    >>> parse_address("FROM:<alice@example.com> BODY=8BITMIME")
+    'alice@example.com'
+    >>> parse_address("FROM:<>")
+    ''
+    """
+    path = argument.partition(":")[2].split()
+    return path[0].strip("<>") if path else ""
+
+
+class SMTPHandler(StreamRequestHandler):
+    server: "LocalSMTPServer"
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        sender, recipients = "", []
+        self.reply("220 localhost schoolsyst local SMTP server")
+        while line := self.rfile.readline():
+            command, _, argument = line.decode().strip().partition(" ")
+            command = command.upper()
+            if command == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif command == "HELO":
+                self.reply("250 localhost")
+            elif command == "MAIL":
+                sender, recipients = parse_address(argument), []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                recipients.append(parse_address(argument))
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while (data_line := self.rfile.readline()) not in (b".\r\n", b""):
+                    # Undo dot-stuffing
+                    data.append(
+                        data_line[1:] if data_line.startswith(b".") else data_line
+                    )
+                self.server.receive(ReceivedMessage(sender, recipients, b"".join(data)))
+                self.reply("250 OK")
+            elif command in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class LocalSMTPServer(ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "localhost", port: int = 1025, echo: bool = False):
+        super().__init__((host, port), SMTPHandler)
+        self.echo = echo
+        self.messages: list[ReceivedMessage] = []
+        self.lock = Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def receive(self, message: ReceivedMessage) -> None:
+        with self.lock:
+            self.messages.append(message)
+        if self.echo:
+            print(
+                f"---------- from {message.sender} to {', '.join(message.recipients)}"
+            )
+            print(message.data.decode(errors="replace"))
+
+    def start(self) -> "LocalSMTPServer":
+        """
+        Serves in a background thread.
+        """
+        Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(prog="python -m schoolsyst_api.mail.local_server")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    print(f"Listening for SMTP on {args.host}:{args.port}")
+    LocalSMTPServer(args.host, args.port, echo=True).serve_forever()
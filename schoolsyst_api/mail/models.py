@@ -0,0 +1,45 @@
+from datetime import datetime
+from enum import auto
+from typing import Optional
+
+from fastapi_utils.enums import StrEnum
+from pydantic import EmailStr, Field
+from schoolsyst_api.models import BaseModel, UserKey
+
+
+class OutgoingEmailStatus(StrEnum):
+    """
+    Lifecycle of an email in the outbox.
+
+    - pending — waiting to be (re)tried, at `next_attempt_at`
+    - sending — claimed by a dispatcher, until `next_attempt_at`
+    - sent
+    - failed — gave up after too many attempts
+    """
+
+    pending = auto()
+    sending = auto()
+    sent = auto()
+    failed = auto()
+
+
+class OutgoingEmail(BaseModel):
+    """
+    An email waiting in (or gone from) the outbox.
+    Its key is derived from a deduplication key (see `schoolsyst_api.mail.compose`).
+    """
+
+    key: str = Field(..., alias="_key")
+    owner_key: Optional[UserKey] = None
+    from_name: str
+    from_email: EmailStr
+    to_name: str
+    to_email: EmailStr
+    subject: str
+    body: str
+    status: OutgoingEmailStatus = OutgoingEmailStatus.pending
+    attempts: int = 0
+    last_error: str = ""
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
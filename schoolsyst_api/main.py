@@ -1,16 +1,22 @@
 from pathlib import Path
 
+import schoolsyst_api.cache.routes
 import schoolsyst_api.grades.routes
 import schoolsyst_api.homework.routes
+import schoolsyst_api.jobs.routes
+import schoolsyst_api.jobs.runner
+import schoolsyst_api.push.routes
 import schoolsyst_api.schedule.routes
 import schoolsyst_api.settings.routes
 import schoolsyst_api.statistics.routes
 import schoolsyst_api.subjects.routes
+import schoolsyst_api.sync.routes
 import typed_dotenv
 import uvicorn
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
-from schoolsyst_api import __version__, accounts, cors, database, docs
+from fastapi_etag import add_exception_handler as add_etag_exception_handler
+from schoolsyst_api import __version__, accounts, coalescing, cors, database, docs
 from schoolsyst_api.docs import edit_openapi_spec
 from schoolsyst_api.env import EnvironmentVariables
 
@@ -27,6 +33,14 @@ api = FastAPI(
 typed_dotenv.load_into(EnvironmentVariables, Path(__file__).parent.parent / ".env")
 # Initialize the database
 api.add_event_handler("startup", database.initialize)
+# Coalesce bursts of updates, writing what is pending on shutdown
+api.add_event_handler("startup", coalescing.configure)
+api.add_event_handler("shutdown", coalescing.stop)
+# Run background jobs
+api.add_event_handler("startup", schoolsyst_api.jobs.runner.start_in_process)
+api.add_event_handler("shutdown", schoolsyst_api.jobs.runner.stop_in_process)
+# Answer conditional requests with 304 Not Modified (see schoolsyst_api.etags)
+add_etag_exception_handler(api)
 # Handle CORS
 api.add_middleware(**cors.middleware_params)
 # Include routes
@@ -37,6 +51,10 @@ api.include_router(schoolsyst_api.settings.routes.router, tags=["Settings"])
 api.include_router(schoolsyst_api.schedule.routes.router, tags=["Schedule"])
 api.include_router(schoolsyst_api.grades.routes.router, tags=["Grades"])
 api.include_router(schoolsyst_api.statistics.routes.router, tags=["Statistics"])
+api.include_router(schoolsyst_api.jobs.routes.router, tags=["Jobs"])
+api.include_router(schoolsyst_api.sync.routes.router, tags=["Sync"])
+api.include_router(schoolsyst_api.push.routes.router, tags=["Sync"])
+api.include_router(schoolsyst_api.cache.routes.router, tags=["Cache"])
 # Modify the OpenAPI spec
 edit_openapi_spec(api)
 
@@ -7,14 +7,20 @@ Some prefixes to the model's names indicate particular variants of that model:
 - "DB" — model of the document stored in the database
 - ""
 """
-from datetime import date, datetime, timedelta
+import json
+from copy import deepcopy
+from datetime import date, datetime, time, timedelta
 from enum import Enum, auto
-from typing import Any, Optional, Union
+from functools import lru_cache, partial
+from inspect import isclass
+from typing import Any, Callable, ClassVar, NamedTuple, Optional, Union
 
 import nanoid
 from fastapi_utils.enums import StrEnum
 from pydantic import BaseModel as PydanticBaseModel
-from pydantic import Field, confloat, constr
+from pydantic import Field, ValidationError, confloat, constr
+from pydantic.color import Color
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON, ModelField
 
 # Misc. pydantic constrained types
 
@@ -32,6 +38,23 @@ ObjectKey = constr(
 ObjectBareKey = constr(regex=f"[{ID_CHARSET}]{{{OBJECT_KEY_LEN}}}")
 OBJECT_KEY_FORMAT = "{owner}:{object}"
 
+# Stamped on the documents written by `BaseModel.to_db`.
+# Bump it whenever a model changes in a way that makes the documents
+# already in the database invalid (new required field, stricter constraint, etc.):
+# they will then be validated again when read.
+SCHEMA_VERSION = 1
+
+# Properties included when serializing models,
+# see https://github.com/samuelcolvin/pydantic/issues/935
+SERIALIZED_PROPERTIES = {
+    "_key",
+    "slug",
+    "completed",
+    "late",
+    "progress",
+    "progress_from_tasks",
+}
+
 
 def userkey():
     """
@@ -63,14 +86,70 @@ class BaseModel(PydanticBaseModel):
     Credits: https://github.com/samuelcolvin/pydantic/issues/935#issuecomment-641175527
     """
 
+    # Fields that each property is computed from,
+    # so that they can be fetched when only the property is asked for
+    computed_from: ClassVar[dict[str, set[str]]] = {}
+
+    @classmethod
+    def property_dependencies(cls) -> dict[str, set[str]]:
+        """
+        `computed_from` of this model and of all of its base classes.
+        """
+        dependencies = {}
+        for klass in reversed(cls.__mro__):
+            dependencies.update(vars(klass).get("computed_from", {}))
+        return dependencies
+
+    def to_db(self) -> dict[str, Any]:
+        """
+        The document to store in the database, stamped with the `SCHEMA_VERSION`
+        (see `schoolsyst_api.codec`).
+        """
+        return {**self.serialize(), "schema_version": SCHEMA_VERSION}
+
+    @classmethod
+    def from_db(cls, document: dict[str, Any]):
+        """
+        Builds the model from a document of the database.
+        Documents written by `to_db` with the current `SCHEMA_VERSION` are trusted:
+        their values are only converted back to python types, not validated.
+        Others are validated as usual.
+        """
+        if document.get("schema_version") != SCHEMA_VERSION:
+            return cls(**document)
+        return cls.from_trusted(document)
+
+    @classmethod
+    def from_trusted(cls, document: dict[str, Any]):
+        values = {}
+        for field in trusted_fields(cls):
+            if field.alias in document:
+                value = document[field.alias]
+                if value is not None and field.convert is not None:
+                    value = field.convert(value)
+            elif field.default is None:
+                # Missing required field: let pydantic report it
+                return cls(**document)
+            else:
+                value = field.default()
+            values[field.name] = value
+        return cls.construct(
+            _fields_set={
+                field.name for field in trusted_fields(cls) if field.alias in document
+            },
+            **values,
+        )
+
     @classmethod
     def get_properties(cls):
-        return [
-            prop
-            for prop in dir(cls)
-            if isinstance(getattr(cls, prop), property)
-            and prop not in ("__values__", "fields")
-        ]
+        return list(model_properties(cls))
+
+    def serialize(self) -> dict[str, Any]:
+        """
+        Same as `.dict(by_alias=True)`, but with values that orjson can serialize
+        (to send it in an `ORJSONResponse`), and much faster.
+        """
+        return serializer(type(self))(self)
 
     def dict(
         self,
@@ -92,16 +171,8 @@ class BaseModel(PydanticBaseModel):
             exclude_defaults=exclude_defaults,
             exclude_none=exclude_none,
         )
-        include = include or set()
-        include |= {
-            "_key",
-            "slug",
-            "completed",
-            "late",
-            "progress",
-            "progress_from_tasks",
-        }
-        props = self.get_properties()
+        include = (include or set()) | SERIALIZED_PROPERTIES
+        props = model_properties(type(self))
         # Include and exclude properties
         if include:
             props = [prop for prop in props if prop in include]
@@ -115,6 +186,145 @@ class BaseModel(PydanticBaseModel):
         return attribs
 
 
+class TrustedField(NamedTuple):
+    name: str
+    alias: str
+    # Converts a JSON value to the field's python type (None when it already is)
+    convert: Optional[Callable[[Any], Any]]
+    # Makes the default value, None for required fields
+    default: Optional[Callable[[], Any]]
+
+
+def validating_converter(model: type[BaseModel], field: ModelField) -> Callable:
+    def convert(value: Any) -> Any:
+        value, errors = field.validate(value, {}, loc=field.alias, cls=model)
+        if errors:
+            raise ValidationError([errors], model)
+        return value
+
+    return convert
+
+
+def trusted_converter(model: type[BaseModel], field: ModelField) -> Optional[Callable]:
+    """
+    Cheapest way to turn a JSON value written by pydantic back into the field's type.
+    Types not known to be safe to skip fall back to pydantic's validation.
+    """
+    if field.shape == SHAPE_LIST:
+        convert = trusted_converter(model, field.sub_fields[0])
+        if convert is None:
+            return list
+        return lambda values: [convert(value) for value in values]
+    if field.shape != SHAPE_SINGLETON or field.sub_fields or not isclass(field.type_):
+        return validating_converter(model, field)
+    type_ = field.type_
+    if issubclass(type_, BaseModel):
+        return type_.from_trusted
+    if issubclass(type_, datetime):
+        return datetime.fromisoformat
+    if issubclass(type_, date):
+        return date.fromisoformat
+    if issubclass(type_, time):
+        return time.fromisoformat
+    if issubclass(type_, Enum):
+        return type_
+    if issubclass(type_, Color):
+        return Color
+    if issubclass(type_, (str, bool, int, float)):
+        return None
+    return validating_converter(model, field)
+
+
+@lru_cache(maxsize=None)
+def trusted_fields(model: type[BaseModel]) -> tuple[TrustedField, ...]:
+    def default(field: ModelField) -> Optional[Callable[[], Any]]:
+        if field.required:
+            return None
+        if field.default_factory is not None:
+            return field.default_factory
+        return lambda: deepcopy(field.default)
+
+    return tuple(
+        TrustedField(
+            name=field.name,
+            alias=field.alias,
+            convert=trusted_converter(model, field),
+            default=default(field),
+        )
+        for field in model.__fields__.values()
+    )
+
+
+@lru_cache(maxsize=None)
+def model_properties(model: type[BaseModel]) -> tuple[str, ...]:
+    return tuple(
+        prop
+        for prop in dir(model)
+        if isinstance(getattr(model, prop), property)
+        and prop not in ("__values__", "fields")
+    )
+
+
+def to_json_value(value: Any, encoder: Callable[[Any], Any]) -> Any:
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return json.loads(json.dumps(value, default=encoder))
+
+
+def json_converter(model: type[BaseModel], field: ModelField) -> Optional[Callable]:
+    """
+    Turns a value of the field into something orjson serializes the way
+    pydantic's `.json()` would. Returns None when orjson can take the value as is.
+    """
+    if field.shape == SHAPE_LIST:
+        convert = json_converter(model, field.sub_fields[0])
+        if convert is None:
+            return None
+        return lambda values: [convert(value) for value in values]
+    if field.shape != SHAPE_SINGLETON or field.sub_fields or not isclass(field.type_):
+        return partial(to_json_value, encoder=model.__json_encoder__)
+    type_ = field.type_
+    if issubclass(type_, BaseModel):
+        return lambda value: value.serialize()
+    if issubclass(type_, (str, bool, int, float, Enum, datetime, date, time)):
+        return None
+    if issubclass(type_, Color):
+        return str
+    if issubclass(type_, timedelta):
+        return timedelta.total_seconds
+    return partial(to_json_value, encoder=model.__json_encoder__)
+
+
+@lru_cache(maxsize=None)
+def serializer(model: type[BaseModel]) -> Callable[[BaseModel], dict[str, Any]]:
+    """
+    Compiles `BaseModel.serialize` for `model`: which converter each field needs and
+    which properties to include is only figured out once.
+    """
+    fields = [
+        (field.name, field.alias, json_converter(model, field))
+        for field in model.__fields__.values()
+    ]
+    properties = [
+        prop for prop in model_properties(model) if prop in SERIALIZED_PROPERTIES
+    ]
+    encode_property = partial(to_json_value, encoder=model.__json_encoder__)
+
+    def serialize(instance: BaseModel) -> dict[str, Any]:
+        values = instance.__dict__
+        serialized = {}
+        for name, alias, convert in fields:
+            value = values.get(name)
+            serialized[alias] = (
+                value if value is None or convert is None else convert(value)
+            )
+        for prop in properties:
+            serialized[prop] = encode_property(getattr(instance, prop))
+        return serialized
+
+    return serialize
+
+
 class OwnedResource(BaseModel):
     """
     Base model for resources owned by users
@@ -125,6 +335,8 @@ class OwnedResource(BaseModel):
     updated_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.now)
 
+    computed_from = {"_key": {"owner_key", "object_key"}}
+
     @property
     def _key(self) -> ObjectKey:
         return f"{self.owner_key}:{self.object_key}"
@@ -149,13 +361,13 @@ class DateRange(BaseModel):
         return self.start <= o.start and self.end >= o.end
 
     def __xor__(self, o: "DateRange") -> "DateRange":
-        return DateRange(
+        return type(self)(
             start=o.start if o.start >= self.start else self.start,
             end=o.end if o.end >= self.end else self.end,
         )
 
     def __or__(self, o: "DateRange") -> "DateRange":
-        return DateRange(
+        return type(self)(
             start=o.start if o.start <= self.start else self.start,
             end=o.end if o.end >= self.end else self.end,
         )
@@ -0,0 +1,140 @@
+"""
+Real-time notification of changes, for clients open on several devices.
+
+Every tracked write (see `schoolsyst_api.changes`) is published to the `hub`,
+which fans it out to the change streams of that user opened on this worker
+(GET /changes/stream, see `schoolsyst_api.push.routes`). Notifications only carry
+the collection and the new point of the user's change sequence: clients fetch
+the changes themselves with GET /sync.
+
+Workers are told about each other's writes by the hub's `Broker`, and can
+`listen` to every notification (see `schoolsyst_api.cache`). The default
+`LocalBroker` only delivers within the process, which is enough with a single
+worker; other brokers (Redis pub/sub, etc.) subclass `Broker`.
+
+Each stream only holds an `asyncio.Queue`: idle streams cost a few hundred bytes
+and wake up every `HEARTBEAT_INTERVAL` to keep the connection open.
+Clients that do not keep up get their queue replaced by a single `RESYNC`.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Optional
+
+from schoolsyst_api.models import UserKey
+
+Notification = dict[str, Any]
+# Sent instead of the notifications a stream could not keep up with
+RESYNC: Notification = {"type": "resync"}
+# Notifications waiting to be sent on a single stream
+QUEUE_SIZE = 64
+# Seconds between keep-alive messages on idle streams
+HEARTBEAT_INTERVAL = 15
+
+
+class Broker(ABC):
+    """
+    Carries notifications between the API's workers.
+    """
+
+    def connect(self, deliver: Callable[[UserKey, Notification], None]) -> None:
+        """
+        Sets the function to call, from any thread, with the notifications
+        published by every worker.
+        """
+        self.deliver = deliver
+
+    @abstractmethod
+    def publish(self, owner_key: UserKey, notification: Notification) -> None:
+        """
+        Sends `notification` to every worker, including this one.
+        """
+
+
+class LocalBroker(Broker):
+    """
+    Stand-in for a cross-worker broker, that only delivers within this process.
+    """
+
+    def publish(self, owner_key: UserKey, notification: Notification) -> None:
+        self.deliver(owner_key, notification)
+
+
+class Subscription:
+    """
+    The notifications waiting to be sent on a change stream.
+    Only used from the event loop.
+    """
+
+    def __init__(self, size: int = QUEUE_SIZE) -> None:
+        self.queue: asyncio.Queue[Notification] = asyncio.Queue(size)
+
+    def put(self, notification: Notification) -> None:
+        if self.queue.full():
+            # Drop what the client could not keep up with, it will have to resync
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+        else:
+            self.queue.put_nowait(notification)
+
+    async def get(self, timeout: float) -> Optional[Notification]:
+        """
+        The next notification, or None if there was none for `timeout` seconds.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Hub:
+    """
+    Fans notifications out to the change streams opened on this worker.
+    """
+
+    def __init__(self, broker: Optional[Broker] = None) -> None:
+        self.subscriptions: defaultdict[UserKey, set[Subscription]] = defaultdict(set)
+        self.listeners: list[Callable[[UserKey, Notification], None]] = []
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.broker = broker or LocalBroker()
+        self.broker.connect(self.deliver)
+
+    def publish(self, owner_key: UserKey, notification: Notification) -> None:
+        """
+        Notifies the streams of `owner_key`, on every worker. Can be called from any thread.
+        """
+        self.broker.publish(owner_key, notification)
+
+    def listen(self, listener: Callable[[UserKey, Notification], None]) -> None:
+        """
+        Calls `listener` with every notification, from the thread that delivers it.
+        """
+        self.listeners.append(listener)
+
+    def deliver(self, owner_key: UserKey, notification: Notification) -> None:
+        for listener in self.listeners:
+            listener(owner_key, notification)
+        if self.loop is None or not self.subscriptions.get(owner_key):
+            return
+        self.loop.call_soon_threadsafe(self.put, owner_key, notification)
+
+    def put(self, owner_key: UserKey, notification: Notification) -> None:
+        for subscription in self.subscriptions.get(owner_key, ()):
+            subscription.put(notification)
+
+    @asynccontextmanager
+    async def subscribe(self, owner_key: UserKey) -> AsyncIterator[Subscription]:
+        self.loop = asyncio.get_running_loop()
+        subscription = Subscription()
+        self.subscriptions[owner_key].add(subscription)
+        try:
+            yield subscription
+        finally:
+            self.subscriptions[owner_key].discard(subscription)
+            if not self.subscriptions[owner_key]:
+                del self.subscriptions[owner_key]
+
+
+hub = Hub()
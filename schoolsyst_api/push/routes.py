@@ -0,0 +1,57 @@
+from typing import AsyncIterator
+
+import orjson
+from fastapi import Depends, Request
+from fastapi.responses import StreamingResponse
+from fastapi_utils.inferring_router import InferringRouter
+from schoolsyst_api.accounts.models import User
+from schoolsyst_api.accounts.users import get_current_confirmed_user
+from schoolsyst_api.push import HEARTBEAT_INTERVAL, Notification, hub
+
+router = InferringRouter()
+
+
+def server_sent_event(notification: Notification) -> bytes:
+    """
+    >>> server_sent_event({"type": "change", "collection": "homework", "seq": 42})
+    b'id: 42\\nevent: change\\ndata: {"type":"change","collection":"homework","seq":42}\\n\\n'
+    """
+    event_id = f"id: {notification['seq']}\n" if "seq" in notification else ""
+    return (
+        f"{event_id}event: {notification['type']}\n".encode()
+        + b"data: "
+        + orjson.dumps(notification)
+        + b"\n\n"
+    )
+
+
+async def stream(request: Request, user: User) -> AsyncIterator[bytes]:
+    async with hub.subscribe(user.key) as subscription:
+        # Sent right away, so that clients know the stream is open
+        yield b": connected\n\n"
+        while not await request.is_disconnected():
+            notification = await subscription.get(timeout=HEARTBEAT_INTERVAL)
+            yield server_sent_event(
+                notification
+            ) if notification else b": heartbeat\n\n"
+
+
+@router.get(
+    "/changes/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_changes(
+    request: Request, current_user: User = Depends(get_current_confirmed_user)
+):
+    """
+    Server-sent events notifying of every change made to the user's data,
+    from any device. `change` events carry the collection that changed and the new
+    synchronization point; `resync` events are sent when notifications were lost.
+    Either way, get the changes themselves with GET /sync.
+    """
+    return StreamingResponse(
+        stream(request, current_user),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
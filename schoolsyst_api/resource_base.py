@@ -1,29 +1,479 @@
 import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from datetime import datetime
-from typing import Any
+from functools import lru_cache
+from typing import Any, NamedTuple, Optional, Sequence
 
 from arango.database import StandardDatabase
-from fastapi import HTTPException, Response, status
+from fastapi import HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from pydantic import Field, create_model
+from schoolsyst_api import codec
 from schoolsyst_api.accounts.models import User
-from schoolsyst_api.models import OBJECT_KEY_FORMAT, ObjectBareKey
+from schoolsyst_api.changes import LEAVE_TOMBSTONE, execute_tracked
+from schoolsyst_api.coalescing import Coalescing, coalescer
+from schoolsyst_api.etags import (
+    Conditions,
+    make_etag,
+    precondition_failed,
+    revision_etag,
+)
+from schoolsyst_api.filtering import Filtering
+from schoolsyst_api.json_patch import PatchOperation, compile_patch, update_expression
+from schoolsyst_api.models import OBJECT_KEY_FORMAT, BaseModel, ObjectBareKey
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values: list[Any]) -> str:
+    """
+    Makes an opaque pagination cursor out of the sort values of the last item of a page.
+
+    >>> encode_cursor(["2020-09-01T08:00:00", "abc:def"])
+    'WyIyMDIwLTA5LTAxVDA4OjAwOjAwIiwiYWJjOmRlZiJd'
+    >>> decode_cursor(encode_cursor([None, 3, "x"]))
+    [None, 3, 'x']
+    """
+    return (
+        urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode())
+        .decode()
+        .rstrip("=")
+    )
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    try:
+        values = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+    if not isinstance(values, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor",
+        )
+    return values
+
+
+def keyset_condition(fields: Sequence[str], descending: Sequence[str] = ()) -> str:
+    """
+    AQL condition on `doc` selecting what comes after the cursor's values
+    (bound as @after0, @after1, …) when sorting on `fields`
+    (in descending order for those in `descending`).
+
+    >>> print(keyset_condition(["due_at", "_key"]))
+    (doc.due_at > @after0 OR doc.due_at == @after0 AND doc._key > @after1)
+    >>> print(keyset_condition(["due_at", "_key"], descending=["due_at"]))
+    (doc.due_at < @after0 OR doc.due_at == @after0 AND doc._key > @after1)
+    """
+    return (
+        "("
+        + " OR ".join(
+            " AND ".join(
+                [f"doc.{field} == @after{j}" for j, field in enumerate(fields[:i])]
+                + [
+                    f"doc.{fields[i]} {'<' if fields[i] in descending else '>'} "
+                    f"@after{i}"
+                ]
+            )
+            for i in range(len(fields))
+        )
+        + ")"
+    )
+
+
+class Pagination:
+    """
+    Query parameters of paginated list routes, to use with `Depends()`.
+    The URL of the next page, if any, is sent in the `Link` header.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        response: Response,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = Query(
+            None, description="Cursor to the next page, from the `Link` header"
+        ),
+    ) -> None:
+        self.request, self.response, self.limit = request, response, limit
+        self.after = decode_cursor(after) if after else None
+
+    def link_next_page(self, cursor: str) -> None:
+        url = self.request.url.include_query_params(after=cursor, limit=self.limit)
+        self.response.headers["Link"] = f'<{url}>; rel="next"'
+
+
+class Fieldset:
+    """
+    The `?fields=` query parameter, to use with `Depends()`.
+    Only the listed fields of resources are fetched and returned.
+    """
+
+    def __init__(
+        self,
+        fields: Optional[str] = Query(
+            None,
+            description="Comma-separated names of the fields to return. "
+            "Defaults to all of them",
+        ),
+    ) -> None:
+        self.names = (
+            list(
+                dict.fromkeys(
+                    name.strip() for name in fields.split(",") if name.strip()
+                )
+            )
+            if fields
+            else None
+        )
+
+
+class Expansion:
+    """
+    The `?expand=` query parameter, to use with `Depends()`.
+    The listed related resources are fetched in the same query as the resources,
+    and embedded in their `expanded` object.
+    """
+
+    def __init__(
+        self,
+        expand: Optional[str] = Query(
+            None,
+            description="Comma-separated names of the related resources to embed, "
+            "e.g. `subject,grades`",
+        ),
+    ) -> None:
+        self.names = (
+            list(
+                dict.fromkeys(
+                    name.strip() for name in expand.split(",") if name.strip()
+                )
+            )
+            if expand
+            else []
+        )
+
+
+class Relation(NamedTuple):
+    # Field holding the key(s) of the related resource(s)
+    field: str
+    collection: str
+    model: type[BaseModel]
+    many: bool = False
+
+
+@lru_cache()
+def partial_model(model: type[BaseModel]) -> type[BaseModel]:
+    """
+    A variant of `model` where every field is optional,
+    to validate documents that were fetched with only some of their fields.
+    """
+    return create_model(
+        f"Partial{model.__name__}",
+        __base__=model,
+        **{
+            name: (Optional[field.outer_type_], Field(None, alias=field.alias))
+            for name, field in model.__fields__.items()
+        },
+    )
+
+
+def respond(content: Any, *dependencies: Optional[Any]) -> ORJSONResponse:
+    """
+    Responds with already serialized `content`. Responses returned by routes are
+    sent as is by FastAPI, without the headers set by the dependencies (on their
+    `.response`), so those are copied.
+    """
+    headers = {}
+    for dependency in dependencies:
+        if dependency:
+            headers.update(dependency.response.headers)
+    return ORJSONResponse(content, headers=headers)
 
 
 class ResourceRoutesGenerator:
     def __init__(
-        self, name_sg: str, name_pl: str, model_in: Any, model_out: Any,
+        self,
+        name_sg: str,
+        name_pl: str,
+        model_in: Any,
+        model_out: Any,
+        sort_by: Sequence[str] = ("created_at",),
+        time_dependent_on: Optional[str] = None,
+        relations: Optional[dict[str, Relation]] = None,
     ) -> None:
         self.name_pl = name_pl
         self.name_sg = name_sg
         self.model_in = model_in
         self.model_out = model_out
+        # Lists are sorted on these fields (then on the key),
+        # see database.create_indexes for the matching indexes
+        self.sort_by = sort_by
+        # Date field after which the resource's representation changes
+        # (e.g. homework becomes late), which ETags have to account for
+        self.time_dependent_on = time_dependent_on
+        # Related resources that can be embedded with `?expand=`
+        self.relations = relations or {}
+
+    def projection(
+        self, fieldset: Fieldset, sort_fields: Sequence[str] = ()
+    ) -> list[str]:
+        """
+        Fields of the documents to fetch to return the fields of `fieldset`,
+        which can also include computed properties, and to sort on `sort_fields`
+        (the default sort fields are always included, for pagination cursors).
+        """
+        properties = self.model_out.property_dependencies()
+        fields = set(self.model_out.__fields__) | set(properties) | {"_key"}
+        unknown = [name for name in fieldset.names if name not in fields]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown)}. "
+                f"Available fields: {', '.join(sorted(fields))}",
+            )
+        projection = {
+            "_key",
+            "owner_key",
+            "object_key",
+            "schema_version",
+            *self.sort_by,
+            *sort_fields,
+        }
+        for name in fieldset.names:
+            projection |= properties.get(name, {name})
+        return sorted(projection)
+
+    def pick(self, fieldset: Fieldset, document: dict[str, Any]) -> dict[str, Any]:
+        """
+        The requested fields of a document fetched with `projection`.
+        """
+        resource = partial_model(self.model_out).from_db(document)
+        return jsonable_encoder(
+            {name: getattr(resource, name) for name in fieldset.names}
+        )
+
+    def expanded_collections(self, expansion: Optional[Expansion]) -> list[str]:
+        """
+        Collections of the related resources listed in `expansion`.
+        """
+        names = expansion.names if expansion else []
+        unknown = [name for name in names if name not in self.relations]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot expand {', '.join(unknown)}. "
+                f"Available relations: {', '.join(sorted(self.relations))}",
+            )
+        return [self.relations[name].collection for name in names]
+
+    def expansion_query(self, expansion: Expansion) -> tuple[str, dict[str, Any]]:
+        """
+        An AQL object with the resources related to `doc` listed in `expansion`,
+        looked up by key among those of `@owner_key`, and the bind variables it uses.
+        """
+        collections = self.expanded_collections(expansion)
+        lookups, bind_vars = [], {}
+        for i, (name, collection) in enumerate(zip(expansion.names, collections)):
+            relation = self.relations[name]
+            if relation.many:
+                documents = f"DOCUMENT(@expand{i}, NOT_NULL(doc.{relation.field}, []))"
+            else:
+                documents = f"[DOCUMENT(@expand{i}, doc.{relation.field})]"
+            related = f"""
+                FOR related IN {documents}
+                    FILTER related.owner_key == @owner_key
+                    RETURN related
+            """
+            lookups.append(
+                f"{name}: ({related})" if relation.many else f"{name}: FIRST({related})"
+            )
+            bind_vars[f"expand{i}"] = collection
+        return "{ " + ", ".join(lookups) + " }", bind_vars
+
+    def serialize_expanded(self, expanded: dict[str, Any]) -> dict[str, Any]:
+        """
+        Related resources fetched with `expansion_query`, ready to be sent.
+        """
+        serialized = {}
+        for name, related in expanded.items():
+            model = self.relations[name].model
+            if self.relations[name].many:
+                serialized[name] = [model.from_db(d).serialize() for d in related]
+            else:
+                serialized[name] = related and model.from_db(related).serialize()
+        return serialized
+
+    def expansion_versions(
+        self, db: StandardDatabase, current_user: User, expansion: Expansion
+    ) -> list[Any]:
+        """
+        The points of the user's change sequence at which the collections of
+        the expanded resources last changed, that entity tags have to account for.
+        """
+        collections = self.expanded_collections(expansion)
+        if not collections:
+            return []
+        return next(
+            db.aql.execute(
+                """
+                LET versions = DOCUMENT("versions", @owner_key).collections
+                RETURN (FOR collection IN @collections RETURN versions[collection])
+                """,
+                bind_vars={"owner_key": current_user.key, "collections": collections},
+            )
+        )
+
+    def represent(self, fieldset: Fieldset, document: dict[str, Any]) -> dict[str, Any]:
+        """
+        A resource as sent in responses, with the fields of `fieldset`
+        and the related resources embedded by `expansion_query`.
+        """
+        expanded = document.pop("expanded", None)
+        if fieldset.names is not None:
+            resource = self.pick(fieldset, document)
+        else:
+            resource = self.model_out.from_db(document).serialize()
+        if expanded is not None:
+            resource["expanded"] = self.serialize_expanded(expanded)
+        return resource
+
+    def list(
+        self,
+        db: StandardDatabase,
+        current_user: User,
+        page: Optional[Pagination] = None,
+        filters: Sequence[str] = (),
+        bind_vars: Optional[dict[str, Any]] = None,
+        fieldset: Optional[Fieldset] = None,
+        conditions: Optional[Conditions] = None,
+        filtering: Optional[Filtering] = None,
+        expansion: Optional[Expansion] = None,
+    ):
+        """
+        Lists the resources of `current_user` that match every AQL condition on `doc`
+        of `filters` (using `bind_vars`), and those of `filtering`,
+        which can also change the sort order.
+        Pages seek to the cursor's position on the sort fields instead of skipping
+        what comes before, so that any page is as fast to get as the first one.
+        Every resource is returned if `page` is not given.
+        With a `fieldset` (as in routes), a response is returned directly,
+        without FastAPI validating the resources again,
+        and only the requested fields are fetched if there are some.
+        With `conditions`, revalidations are answered with a 304 before reading
+        any document.
+        The related resources listed in `expansion` are embedded in responses.
+        """
+        if conditions:
+            conditions.check_not_modified(
+                self.list_etag(db, current_user, conditions, expansion)
+            )
+
+        sort = [(field, False) for field in self.sort_by]
+        aql_filters = ["doc.owner_key == @owner_key", *filters]
+        bind_vars = {
+            **(bind_vars or {}),
+            "@collection": self.name_pl,
+            "owner_key": current_user.key,
+        }
+        if filtering:
+            filtering_conditions, filtering_bind_vars = filtering.compile(
+                self.model_out
+            )
+            aql_filters += filtering_conditions
+            bind_vars |= filtering_bind_vars
+            sort = filtering.sort_fields(self.model_out) or sort
+        fields = [*(field for field, _ in sort), "_key"]
+        descending = [field for field, is_descending in sort if is_descending]
+        if page and page.after is not None:
+            if len(page.after) != len(fields):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid pagination cursor",
+                )
+            # The first condition alone lets the index be used
+            aql_filters += [
+                f"doc.{fields[0]} {'<=' if fields[0] in descending else '>='} @after0",
+                keyset_condition(fields, descending),
+            ]
+            bind_vars |= {f"after{i}": value for i, value in enumerate(page.after)}
+        if page:
+            # Fetch one more to know if there is a next page
+            bind_vars["limit"] = page.limit + 1
+        partial = fieldset is not None and fieldset.names is not None
+        document = "doc"
+        if partial:
+            bind_vars["projection"] = self.projection(fieldset, fields)
+            document = "KEEP(doc, @projection)"
+        expanding = fieldset is not None and expansion is not None and expansion.names
+        if expanding:
+            expanded, expansion_bind_vars = self.expansion_query(expansion)
+            document = f"MERGE({document}, {{ expanded: {expanded} }})"
+            bind_vars |= expansion_bind_vars
 
-    def list(self, db: StandardDatabase, current_user: User):
-        cursor = db.collection(self.name_pl).find({"owner_key": current_user.key})
-        return [self.model_out(**item) for item in cursor]
+        documents = list(
+            db.aql.execute(
+                f"""
+                FOR doc IN @@collection
+                    {" ".join(f"FILTER {condition}" for condition in aql_filters)}
+                    SORT {", ".join(
+                        f"doc.{field} {'DESC' if field in descending else 'ASC'}"
+                        for field in fields
+                    )}
+                    {"LIMIT @limit" if page else ""}
+                    RETURN {document}
+                """,
+                bind_vars=bind_vars,
+            )
+        )
+        if page and len(documents) > page.limit:
+            documents = documents[: page.limit]
+            page.link_next_page(
+                encode_cursor([documents[-1].get(field) for field in fields])
+            )
+        if fieldset is not None:
+            return respond(
+                [self.represent(fieldset, d) for d in documents], page, conditions
+            )
+        return [self.model_out.from_db(document) for document in documents]
 
-    def get(self, db: StandardDatabase, current_user: User, key: ObjectBareKey):
+    def fetch(
+        self,
+        db: StandardDatabase,
+        current_user: User,
+        key: ObjectBareKey,
+        projection: Optional[Sequence[str]] = None,
+        expansion: Optional[Expansion] = None,
+    ) -> dict[str, Any]:
+        """
+        Gets the document of one of the user's resources (only its `projection` if set),
+        or answers with a 404. The related resources listed in `expansion` are
+        fetched in the same query (see `expansion_query`).
+        """
         full_key = OBJECT_KEY_FORMAT.format(object=key, owner=current_user.key)
-        resource = db.collection(self.name_pl).get(full_key)
+        document = "doc"
+        bind_vars = {"@collection": self.name_pl, "key": full_key}
+        if projection:
+            document = "KEEP(doc, @projection)"
+            bind_vars["projection"] = ["_key", "owner_key", *projection]
+        if expansion and expansion.names:
+            expanded, expansion_bind_vars = self.expansion_query(expansion)
+            document = f"MERGE({document}, {{ expanded: {expanded} }})"
+            bind_vars |= {**expansion_bind_vars, "owner_key": current_user.key}
+        if document != "doc":
+            resource = next(
+                db.aql.execute(
+                    f"""
+                    LET doc = DOCUMENT(@@collection, @key)
+                    RETURN doc ? {document} : null
+                    """,
+                    bind_vars=bind_vars,
+                )
+            )
+        else:
+            resource = db.collection(self.name_pl).get(full_key)
 
         if not resource:
             raise HTTPException(
@@ -31,9 +481,7 @@ class ResourceRoutesGenerator:
                 detail=f"No {self.name_sg} with key {full_key} found",
             )
 
-        resource = self.model_out(**resource)
-
-        if resource.owner_key != current_user.key:
+        if resource["owner_key"] != current_user.key:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Currently logged-in user does not own the specified {self.name_sg}",
@@ -41,47 +489,275 @@ class ResourceRoutesGenerator:
 
         return resource
 
+    def etag_fields(self) -> Sequence[str]:
+        return ["_rev", *([self.time_dependent_on] if self.time_dependent_on else [])]
+
+    def document_etag(
+        self,
+        document: dict[str, Any],
+        fieldset: Optional[Fieldset] = None,
+        expansion_state: Sequence[Any] = (),
+    ) -> str:
+        """
+        Entity tag of a resource, from a document with at least its `etag_fields`.
+        With expanded related resources, `expansion_state` is what their
+        entity tag depends on (see `get`).
+        """
+        variant = []
+        if fieldset and fieldset.names is not None:
+            variant.append(fieldset.names)
+        if expansion_state:
+            variant.append(list(expansion_state))
+        if self.time_dependent_on:
+            moment = document.get(self.time_dependent_on)
+            if moment is not None and moment <= datetime.now().isoformat():
+                variant.append("past")
+        return revision_etag(document["_rev"], *variant)
+
+    def list_etag(
+        self,
+        db: StandardDatabase,
+        current_user: User,
+        conditions: Conditions,
+        expansion: Optional[Expansion] = None,
+    ) -> str:
+        """
+        Entity tag of a list of the user's resources, from the point of the user's
+        change sequence at which the collection (and those of the related resources
+        listed in `expansion`) last changed.
+        """
+        bind_vars = {
+            "owner_key": current_user.key,
+            "collection": self.name_pl,
+            "related": self.expanded_collections(expansion),
+        }
+        # How many resources are already past their date
+        past = "null"
+        if self.time_dependent_on:
+            past = f"""COUNT(
+                FOR doc IN @@collection
+                    FILTER doc.owner_key == @owner_key
+                        AND doc.{self.time_dependent_on} <= @now
+                    RETURN 1
+            )"""
+            bind_vars |= {
+                "@collection": self.name_pl,
+                "now": datetime.now().isoformat(),
+            }
+        state = next(
+            db.aql.execute(
+                f"""
+                LET versions = DOCUMENT("versions", @owner_key).collections
+                RETURN [
+                    versions[@collection],
+                    {past},
+                    (FOR collection IN @related RETURN versions[collection])
+                ]
+                """,
+                bind_vars=bind_vars,
+            )
+        )
+        return make_etag(
+            current_user.key, self.name_pl, state, str(conditions.request.url.query)
+        )
+
+    def get(
+        self,
+        db: StandardDatabase,
+        current_user: User,
+        key: ObjectBareKey,
+        fieldset: Optional[Fieldset] = None,
+        conditions: Optional[Conditions] = None,
+        expansion: Optional[Expansion] = None,
+    ):
+        """
+        Gets one of the user's resources. With `conditions`, revalidations are answered
+        with a 304 before the document is read.
+        With a `fieldset` (as in routes), a response is returned directly (see `list`),
+        with the related resources listed in `expansion` embedded.
+        """
+        expansion = expansion if fieldset is not None else None
+        expansion_state = []
+        if expansion and expansion.names:
+            expansion_state = [
+                expansion.names,
+                self.expansion_versions(db, current_user, expansion),
+            ]
+        if conditions and conditions.if_none_match:
+            current = self.fetch(db, current_user, key, self.etag_fields())
+            conditions.check_not_modified(
+                self.document_etag(current, fieldset, expansion_state)
+            )
+
+        partial = fieldset is not None and fieldset.names is not None
+        resource = self.fetch(
+            db,
+            current_user,
+            key,
+            [*self.projection(fieldset), *self.etag_fields()] if partial else None,
+            expansion,
+        )
+        etag = self.document_etag(resource, fieldset, expansion_state)
+        if conditions:
+            conditions.check_not_modified(etag)
+
+        if fieldset is None:
+            return self.model_out.from_db(resource)
+        if partial:
+            return ORJSONResponse(
+                self.represent(fieldset, resource), headers={"ETag": etag}
+            )
+        return respond(self.represent(fieldset, resource), conditions)
+
     def create(self, db: StandardDatabase, current_user: User, data):
-        return self.model_out(
-            **db.collection(self.name_pl).insert(
-                self.model_out(**data.dict(), owner_key=current_user.key).json(
-                    by_alias=True
-                ),
-                return_new=True,
-            )["new"]
+        [document] = execute_tracked(
+            db,
+            current_user.key,
+            self.name_pl,
+            "INSERT MERGE(@document, { seq }) INTO @@collection RETURN NEW",
+            {
+                "@collection": self.name_pl,
+                "document": self.model_out(
+                    **data.dict(), owner_key=current_user.key
+                ).to_db(),
+            },
+        )
+        return self.model_out.from_db(document)
+
+    def modify(
+        self,
+        db: StandardDatabase,
+        current_user: User,
+        key: ObjectBareKey,
+        operation: str,
+        bind_vars: dict[str, Any],
+        conditions: Optional[Conditions] = None,
+    ) -> dict[str, Any]:
+        """
+        Runs an AQL `operation` (that uses `doc` and returns the result) on one of
+        the user's resources in a single tracked query (see `execute_tracked`, `seq`
+        has to be stamped on the document), if it matches the If-Match condition.
+        Answers with a 404, 403 or 412 when there is nothing to modify.
+        """
+        full_key = OBJECT_KEY_FORMAT.format(object=key, owner=current_user.key)
+        revisions = conditions.if_match_revisions() if conditions else None
+        result = execute_tracked(
+            db,
+            current_user.key,
+            self.name_pl,
+            f"""
+            FOR doc IN @@collection
+                FILTER doc._key == @key AND doc.owner_key == @owner_key
+                {"FILTER doc._rev IN @revisions" if revisions is not None else ""}
+                {operation}
+            """,
+            {
+                **bind_vars,
+                "@collection": self.name_pl,
+                "key": full_key,
+                **({"revisions": revisions} if revisions is not None else {}),
+            },
         )
+        if not result:
+            # Find out why, raising a 404 or 403
+            self.fetch(db, current_user, key, ["_rev"])
+            raise precondition_failed()
+        return result[0]
 
     def update(
-        self, db: StandardDatabase, current_user: User, key: ObjectBareKey, changes
+        self,
+        db: StandardDatabase,
+        current_user: User,
+        key: ObjectBareKey,
+        changes,
+        conditions: Optional[Conditions] = None,
+        coalescing: Optional[Coalescing] = None,
     ):
-        resource = self.get(db, current_user, key)
-        updated_resource = {
-            **json.loads(resource.json()),
-            **json.loads(changes.json(exclude_unset=True)),
-            "updated_at": datetime.now().isoformat(sep="T"),
-        }
-        new_resource = db.collection(self.name_pl).update(
-            updated_resource, return_new=True
-        )["new"]
-        return self.model_out(**new_resource)
+        """
+        Updates one of the user's resources with the fields set in `changes`.
+        With an If-Match condition, the update is only done if the resource
+        was not modified since. Otherwise, with `coalescing` enabled, the update
+        is merged with the other ones made to the resource within a short delay
+        (see `schoolsyst_api.coalescing`).
+        """
 
-    def delete(self, db: StandardDatabase, current_user: User, key: ObjectBareKey):
-        full_key = OBJECT_KEY_FORMAT.format(object=key, owner=current_user.key)
-        resource = db.collection(self.name_pl).get(full_key)
-        if resource is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"No {self.name_sg} with key {full_key} found",
+        def write(changes: dict[str, Any]) -> dict[str, Any]:
+            return self.modify(
+                db,
+                current_user,
+                key,
+                """
+                UPDATE doc WITH MERGE(@changes, { seq }) IN @@collection
+                    OPTIONS { mergeObjects: false }
+                RETURN NEW
+                """,
+                {"changes": {**changes, "updated_at": datetime.now()}},
+                conditions,
             )
 
-        resource = self.model_out(**resource)
-
-        if resource.owner_key != current_user.key:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Currently logged-in user does not own the specified subject",
+        if (
+            coalescing
+            and coalescing.enabled
+            and not (conditions and conditions.if_match)
+        ):
+            new_resource = coalescer.submit(
+                (self.name_pl, current_user.key, key), codec.changes(changes), write
             )
+        else:
+            new_resource = write(codec.changes(changes))
+        if conditions:
+            conditions.response.headers["ETag"] = self.document_etag(new_resource)
+        return self.model_out.from_db(new_resource)
 
-        db.collection(self.name_pl).delete(full_key)
+    def patch(
+        self,
+        db: StandardDatabase,
+        current_user: User,
+        key: ObjectBareKey,
+        operations: Sequence[PatchOperation],
+        conditions: Optional[Conditions] = None,
+    ):
+        """
+        Applies JSON Patch `operations` to one of the user's resources,
+        validating values against `model_in` (see `schoolsyst_api.json_patch`).
+        """
+        patch = compile_patch(self.model_in, operations)
+        statements = "\n".join(patch.statements)
+        new_resource = self.modify(
+            db,
+            current_user,
+            key,
+            f"""
+            {statements}
+            UPDATE doc WITH MERGE({update_expression(patch)}, {{
+                updated_at: @updated_at, seq
+            }}) IN @@collection OPTIONS {{ mergeObjects: false }}
+            RETURN NEW
+            """,
+            {**patch.bind_vars, "updated_at": datetime.now()},
+            conditions,
+        )
+        if conditions:
+            conditions.response.headers["ETag"] = self.document_etag(new_resource)
+        return self.model_out.from_db(new_resource)
 
+    def delete(
+        self,
+        db: StandardDatabase,
+        current_user: User,
+        key: ObjectBareKey,
+        conditions: Optional[Conditions] = None,
+    ):
+        """
+        Deletes one of the user's resources. With an If-Match condition,
+        it is only deleted if it was not modified since.
+        """
+        self.modify(
+            db,
+            current_user,
+            key,
+            f"REMOVE doc IN @@collection {LEAVE_TOMBSTONE} RETURN true",
+            {},
+            conditions,
+        )
         return Response(status_code=status.HTTP_204_NO_CONTENT)
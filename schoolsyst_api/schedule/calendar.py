@@ -0,0 +1,334 @@
+"""
+Materialized course calendars.
+
+The courses of each user from WINDOW_WEEKS weeks before the current week to
+WINDOW_WEEKS weeks after it are stored in the `courses` collection, and described by
+their document of the `calendars` collection: the window they cover, the point of the
+user's change sequence (see `schoolsyst_api.changes`) they were generated at, and a
+fingerprint of the settings they were generated with.
+
+Reading courses within the window is then a single range query, as long as
+the user's events, mutations and settings did not change since. When they did,
+only the days whose courses may have changed are generated again:
+
+- the days of the week of the events that changed, or were deleted;
+- the days the mutations that changed overlap, before and after the change;
+- every day, if the year layout, offdays or starting week type changed;
+- the days that entered the window since it was last generated.
+
+Requests outside of the window, or with other mutations or week types than
+the default ones, are generated on the fly.
+"""
+from datetime import date, datetime, timedelta
+from hashlib import sha256
+from typing import Any, Iterable, Optional
+
+from arango.database import StandardDatabase
+from schoolsyst_api import codec, settings
+from schoolsyst_api.accounts.models import User
+from schoolsyst_api.models import UserKey, WeekType
+from schoolsyst_api.schedule.courses import days_between, fetch_events, generate_courses
+from schoolsyst_api.schedule.models import Course, EventMutationInterpretation
+from schoolsyst_api.schedule.mutations import MutationIndex, fetch_mutations
+from schoolsyst_api.settings.models import Settings
+
+WINDOW_WEEKS = 8
+# The mutations applied to the courses of the calendar
+DEFAULT_INCLUDE = frozenset(
+    {
+        EventMutationInterpretation.addition,
+        EventMutationInterpretation.deletion,
+        EventMutationInterpretation.reschedule,
+    }
+)
+SCHEDULE_COLLECTIONS = ("events", "event_mutations", "settings")
+
+
+def window(today: date) -> tuple[date, date]:
+    """
+    The [start, end) period the calendar covers.
+
+    >>> window(date(2026, 10, 21))
+    (datetime.date(2026, 8, 24), datetime.date(2026, 12, 21))
+    """
+    monday = today - timedelta(days=today.weekday())
+    return (
+        monday - timedelta(weeks=WINDOW_WEEKS),
+        monday + timedelta(weeks=WINDOW_WEEKS + 1),
+    )
+
+
+def serves(
+    start: date,
+    end: date,
+    include: Iterable[EventMutationInterpretation],
+    week_types: Optional[list[WeekType]],
+    today: date,
+) -> bool:
+    """
+    Whether the courses of [start, end) can be read from the calendar.
+    """
+    window_start, window_end = window(today)
+    return (
+        window_start <= start <= end <= window_end
+        and set(include) == DEFAULT_INCLUDE
+        and not week_types
+    )
+
+
+def schedule_fingerprint(user_settings: Settings) -> str:
+    """
+    Changes when the settings that courses are generated from change.
+    """
+    return sha256(
+        codec.dumps(
+            {
+                "year_layout": user_settings.year_layout,
+                "offdays": user_settings.offdays,
+                "starting_week_type": user_settings.starting_week_type,
+            }
+        ).encode()
+    ).hexdigest()
+
+
+def read(
+    db: StandardDatabase, user: User, start: date, end: date, today: date
+) -> list[Course]:
+    """
+    The courses of [start, end), which must be within the window of `today`,
+    generating what changed in the calendar first if needed.
+    """
+    window_start, window_end = window(today)
+    [result] = db.aql.execute(
+        """
+        LET calendar = DOCUMENT("calendars", @owner_key)
+        LET versions = DOCUMENT("versions", @owner_key)
+        LET fresh = calendar != null
+            AND calendar.start == @window_start
+            AND calendar.end == @window_end
+            AND calendar.seq >= MAX(
+                FOR collection IN @schedule_collections
+                    RETURN NOT_NULL(versions.collections[collection], 0)
+            )
+        RETURN {
+            calendar,
+            seq: NOT_NULL(versions.seq, 0),
+            courses: fresh ? (
+                FOR course IN courses
+                    FILTER course.owner_key == @owner_key
+                    FILTER course.day >= @start AND course.day < @end
+                    SORT course.day, course.start
+                    RETURN course
+            ) : null
+        }
+        """,
+        bind_vars={
+            "owner_key": user.key,
+            "window_start": window_start.isoformat(),
+            "window_end": window_end.isoformat(),
+            "schedule_collections": list(SCHEDULE_COLLECTIONS),
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+        },
+    )
+    if result["courses"] is None:
+        refresh(db, user, result["calendar"], result["seq"], today)
+        return read_courses(db, user.key, start, end)
+    return [Course.from_db(course) for course in result["courses"]]
+
+
+def read_courses(
+    db: StandardDatabase, owner_key: UserKey, start: date, end: date
+) -> list[Course]:
+    return [
+        Course.from_db(course)
+        for course in db.aql.execute(
+            """
+            FOR course IN courses
+                FILTER course.owner_key == @owner_key
+                FILTER course.day >= @start AND course.day < @end
+                SORT course.day, course.start
+                RETURN course
+            """,
+            bind_vars={
+                "owner_key": owner_key,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+            },
+        )
+    ]
+
+
+def changed_days(
+    db: StandardDatabase, owner_key: UserKey, since: int, window_start: date
+) -> tuple[set[int], list[dict[str, Any]], set[date]]:
+    """
+    What changed since the point `since` of the change sequence of `owner_key`:
+    the days of the week of the events that changed, the ranges of the mutations that
+    changed, and the days of the courses generated from either of them.
+    """
+    [result] = db.aql.execute(
+        """
+        LET events = (
+            FOR event IN events
+                FILTER event.owner_key == @owner_key AND event.seq > @since
+                RETURN { key: event._key, day: event.day }
+        )
+        LET mutations = (
+            FOR mutation IN event_mutations
+                FILTER mutation.owner_key == @owner_key AND mutation.seq > @since
+                RETURN {
+                    key: mutation._key,
+                    ranges: [mutation.deleted_in, mutation.added_in]
+                }
+        )
+        LET removed = (
+            FOR tombstone IN tombstones
+                FILTER tombstone.owner_key == @owner_key AND tombstone.seq > @since
+                FILTER tombstone.collection IN ["events", "event_mutations"]
+                RETURN tombstone
+        )
+        LET event_keys = APPEND(
+            events[*].key, removed[* FILTER CURRENT.collection == "events"].key
+        )
+        LET mutation_keys = APPEND(
+            mutations[*].key,
+            removed[* FILTER CURRENT.collection == "event_mutations"].key
+        )
+        RETURN {
+            weekdays: events[*].day,
+            ranges: FLATTEN(mutations[*].ranges),
+            days: (
+                FOR course IN courses
+                    FILTER course.owner_key == @owner_key
+                    FILTER course.day >= @window_start
+                    FILTER course.event_key IN event_keys
+                        OR LENGTH(INTERSECTION(course.mutation_keys, mutation_keys)) > 0
+                    RETURN DISTINCT course.day
+            )
+        }
+        """,
+        bind_vars={
+            "owner_key": owner_key,
+            "since": since,
+            "window_start": window_start.isoformat(),
+        },
+    )
+    return (
+        set(result["weekdays"]),
+        [span for span in result["ranges"] if span is not None],
+        {date.fromisoformat(day) for day in result["days"]},
+    )
+
+
+def refresh(
+    db: StandardDatabase,
+    user: User,
+    calendar: Optional[dict[str, Any]],
+    seq: int,
+    today: date,
+) -> None:
+    """
+    Generates again the courses of the calendar that may have changed since it was
+    last generated, as of the point `seq` of the user's change sequence.
+    """
+    user_settings = settings.get(db, user)
+    fingerprint = schedule_fingerprint(user_settings)
+    window_start, window_end = window(today)
+    window_days = list(days_between(window_start, window_end))
+
+    if calendar is None or calendar["settings"] != fingerprint:
+        days = set(window_days)
+    else:
+        covered_start = date.fromisoformat(calendar["start"])
+        covered_end = date.fromisoformat(calendar["end"])
+        days = {day for day in window_days if not covered_start <= day < covered_end}
+        weekdays, ranges, generated_days = changed_days(
+            db, user.key, calendar["seq"], window_start
+        )
+        days |= {day for day in window_days if day.isoweekday() in weekdays}
+        days |= {day for day in generated_days if window_start <= day < window_end}
+        for span in ranges:
+            first = max(date.fromisoformat(span["start"][:10]), window_start)
+            last = min(
+                date.fromisoformat(span["end"][:10]), window_end - timedelta(days=1)
+            )
+            days.update(days_between(first, last + timedelta(days=1)))
+
+    rebuild(db, user.key, user_settings, sorted(days), window_start, window_end)
+    db.aql.execute(
+        """
+        UPSERT { _key: @owner_key }
+        INSERT MERGE({ _key: @owner_key, owner_key: @owner_key }, @calendar)
+        UPDATE @calendar
+        IN calendars
+        """,
+        bind_vars={
+            "owner_key": user.key,
+            "calendar": {
+                "start": window_start.isoformat(),
+                "end": window_end.isoformat(),
+                "seq": seq,
+                "settings": fingerprint,
+            },
+        },
+    )
+
+
+def rebuild(
+    db: StandardDatabase,
+    owner_key: UserKey,
+    user_settings: Settings,
+    days: list[date],
+    window_start: date,
+    window_end: date,
+) -> None:
+    """
+    Generates the courses of `days` again, and removes those outside of the window.
+    """
+    documents = []
+    now = datetime.now()
+    if days:
+        mutations = MutationIndex(
+            mutation
+            for mutation in fetch_mutations(
+                db, owner_key, days[0], days[-1] + timedelta(days=1)
+            )
+            if mutation.interpretation in DEFAULT_INCLUDE
+        )
+        documents = [
+            {
+                **occurrence.course.to_model(created_at=now).to_db(),
+                "day": occurrence.day.isoformat(),
+                "event_key": occurrence.event_key,
+                "mutation_keys": occurrence.mutation_keys,
+            }
+            for occurrence in generate_courses(
+                owner_key, user_settings, fetch_events(db, owner_key), mutations, days
+            )
+        ]
+        # Courses are keyed by day and event, so that generating them again
+        # overwrites them
+        db.aql.execute(
+            """
+            FOR course IN @courses
+                INSERT course INTO courses OPTIONS { overwrite: true }
+            """,
+            bind_vars={"courses": documents},
+        )
+    db.aql.execute(
+        """
+        FOR course IN courses
+            FILTER course.owner_key == @owner_key
+            FILTER course.day < @window_start OR course.day >= @window_end
+                OR (course.day IN @days AND course._key NOT IN @keys)
+            REMOVE course IN courses
+        """,
+        bind_vars={
+            "owner_key": owner_key,
+            "window_start": window_start.isoformat(),
+            "window_end": window_end.isoformat(),
+            "days": [day.isoformat() for day in days],
+            "keys": [document["_key"] for document in documents],
+        },
+    )
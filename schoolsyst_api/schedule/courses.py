@@ -0,0 +1,201 @@
+"""
+Generation of courses: the events of the schedule, placed on the days they occur
+on (skipping days outside of the year layout, offdays and the other week type),
+with their mutations applied. Each school day (see
+`schoolsyst_api.settings.school_days`) is stamped with the weekly template of its
+week type (see `schoolsyst_api.schedule.template`).
+"""
+from datetime import date, datetime, time, timedelta
+from hashlib import sha256
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from arango.database import StandardDatabase
+from schoolsyst_api.models import (
+    ID_CHARSET,
+    OBJECT_KEY_LEN,
+    DatetimeRange,
+    ObjectBareKey,
+    ObjectKey,
+    UserKey,
+    WeekType,
+)
+from schoolsyst_api.schedule.models import Course, Event, EventMutationInterpretation
+from schoolsyst_api.schedule.mutations import MutationIndex, fetch_mutations
+from schoolsyst_api.schedule.template import WeeklyTemplate
+from schoolsyst_api.settings.models import Settings
+
+
+class Span(NamedTuple):
+    """
+    A [start, end) period, combined like `DatetimeRange`s without building models.
+    """
+
+    start: datetime
+    end: datetime
+
+    @property
+    def duration(self) -> timedelta:
+        return self.end - self.start
+
+    def __xor__(self, o: DatetimeRange) -> "Span":
+        return Span(max(self.start, o.start), max(self.end, o.end))
+
+    def __or__(self, o: DatetimeRange) -> "Span":
+        return Span(min(self.start, o.start), max(self.end, o.end))
+
+
+class PlannedCourse(NamedTuple):
+    """
+    A course while it is generated, turned into a `Course` once done.
+    """
+
+    owner_key: UserKey
+    object_key: ObjectBareKey
+    start: datetime
+    end: datetime
+    subject_key: Optional[ObjectKey]
+    location: str
+
+    def to_model(self, created_at: datetime) -> Course:
+        # Built from validated events and mutations: no need to validate it again
+        return Course.construct(
+            owner_key=self.owner_key,
+            object_key=self.object_key,
+            start=self.start,
+            end=self.end,
+            subject_key=self.subject_key,
+            location=self.location,
+            title=None,
+            color=None,
+            updated_at=None,
+            created_at=created_at,
+        )
+
+
+class Occurrence(NamedTuple):
+    """
+    A course, and what it was generated from.
+    """
+
+    day: date
+    event_key: ObjectKey
+    mutation_keys: list[ObjectKey]
+    course: PlannedCourse
+
+
+def course_object_key(day: date, event_key: ObjectKey) -> ObjectBareKey:
+    """
+    The key of the course of an event on a day, the same every time it is generated.
+
+    >>> course_object_key(date(2020, 9, 1), "zMSLrwGwZA:a2b3c4")
+    'oD8GyF'
+    """
+    digest = sha256(f"{day.isoformat()}:{event_key}".encode()).digest()
+    return "".join(
+        ID_CHARSET[byte % len(ID_CHARSET)] for byte in digest[:OBJECT_KEY_LEN]
+    )
+
+
+def days_between(start: date, end: date) -> Iterator[date]:
+    """
+    >>> [day.day for day in days_between(date(2020, 9, 1), date(2020, 9, 4))]
+    [1, 2, 3]
+    """
+    return (start + timedelta(days=n) for n in range((end - start).days))
+
+
+def fetch_events(db: StandardDatabase, owner_key: UserKey) -> list[Event]:
+    return [
+        Event.from_db(event)
+        for event in db.collection("events").find({"owner_key": owner_key})
+    ]
+
+
+def generate_courses(
+    owner_key: UserKey,
+    user_settings: Settings,
+    events: list[Event],
+    mutations: MutationIndex,
+    days: Iterable[date],
+    week_types: Optional[list[WeekType]] = None,
+) -> Iterator[Occurrence]:
+    """
+    The courses of `events` on `days`. Without `week_types`,
+    each day follows its own week type.
+    """
+    template = WeeklyTemplate(events)
+    school_days = user_settings.school_days()
+    requested_week_types = frozenset(week_types or ())
+    own_week_types = {week_type: frozenset({week_type}) for week_type in WeekType}
+    for day in days:
+        # Skip outside of year layout, and offdays
+        if not school_days.is_school_day(day):
+            continue
+        slots = template.on(
+            day.isoweekday(),
+            requested_week_types or own_week_types[school_days.week_type(day)],
+        )
+        midnight = datetime.combine(day, time())
+        for slot in slots:
+            event = slot.event
+            span = Span(*slot.stamp(midnight))
+            subject_key, location = event.subject_key, event.location
+
+            applied = mutations.on(event._key, day)
+            for mutation in applied:
+                location = mutation.location or location
+                subject_key = mutation.subject_key or subject_key
+                mutated = span
+                if mutation.deleted_in:
+                    mutated ^= mutation.deleted_in
+                if mutation.added_in:
+                    mutated |= mutation.added_in
+                if mutated.duration:
+                    span = mutated
+
+            yield Occurrence(
+                day,
+                event._key,
+                [mutation._key for mutation in applied],
+                PlannedCourse(
+                    owner_key,
+                    course_object_key(day, event._key),
+                    span.start,
+                    span.end,
+                    subject_key,
+                    location,
+                ),
+            )
+
+
+def compute_courses(
+    db: StandardDatabase,
+    owner_key: UserKey,
+    user_settings: Settings,
+    start: date,
+    end: date,
+    include: Iterable[EventMutationInterpretation],
+    week_types: Optional[list[WeekType]] = None,
+) -> list[Course]:
+    """
+    Generates the courses of [start, end) from the events and mutations
+    of `owner_key`, keeping only the mutations whose interpretation is in `include`.
+    """
+    include = set(include)
+    mutations = MutationIndex(
+        mutation
+        for mutation in fetch_mutations(db, owner_key, start, end)
+        if mutation.interpretation in include
+    )
+    now = datetime.now()
+    return [
+        occurrence.course.to_model(created_at=now)
+        for occurrence in generate_courses(
+            owner_key,
+            user_settings,
+            fetch_events(db, owner_key),
+            mutations,
+            user_settings.school_days().between(start, end),
+            week_types,
+        )
+    ]
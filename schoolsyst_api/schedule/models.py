@@ -32,6 +32,8 @@ class InEvent(BaseModel):
 
 
 class Event(OwnedResource, InEvent):
+    computed_from = {"on_both_weeks": {"on_even_weeks", "on_odd_weeks"}}
+
     @property
     def on_both_weeks(self) -> bool:
         """
@@ -0,0 +1,127 @@
+"""
+Lookup of the mutations that apply to a course.
+
+A mutation applies to the course of its event on every day that its `deleted_in`
+or `added_in` range overlaps. Instead of checking every mutation for every course,
+only the mutations overlapping the requested period are fetched (see
+`fetch_mutations`), and those of each event are kept in a list of intervals sorted
+by start (see `MutationIndex`), where the ones overlapping a day are found by
+bisection.
+"""
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, NamedTuple
+
+from arango.database import StandardDatabase
+from schoolsyst_api.models import ObjectKey, UserKey
+from schoolsyst_api.schedule.models import EventMutation
+
+
+class Interval(NamedTuple):
+    start: datetime
+    end: datetime
+    # Position of the mutation in the order they are applied
+    position: int
+    mutation: EventMutation
+
+
+def day_bounds(day: date) -> tuple[datetime, datetime]:
+    """
+    >>> day_bounds(date(2020, 9, 1))
+    (datetime.datetime(2020, 9, 1, 0, 0), datetime.datetime(2020, 9, 2, 0, 0))
+    """
+    start = datetime.combine(day, time())
+    return start, start + timedelta(days=1)
+
+
+class EventIntervals:
+    """
+    The ranges of the mutations of an event, sorted by start.
+    Finding those that overlap a period costs a bisection, plus one step for each
+    range that starts less than the longest one lasts before the period.
+    """
+
+    def __init__(self, intervals: Iterable[Interval]) -> None:
+        self.intervals = sorted(intervals, key=lambda interval: interval.start)
+        self.starts = [interval.start for interval in self.intervals]
+        self.longest = max(
+            (interval.end - interval.start for interval in self.intervals),
+            default=timedelta(),
+        )
+
+    def overlapping(self, start: datetime, end: datetime) -> list[Interval]:
+        # Intervals that start after `end` cannot overlap,
+        # nor can those that start more than `longest` before `start`
+        first = bisect_left(self.starts, start - self.longest)
+        last = bisect_left(self.starts, end, lo=first)
+        return [
+            interval
+            for interval in self.intervals[first:last]
+            if interval.end > start and interval.start < end
+        ]
+
+
+class MutationIndex:
+    """
+    Mutations grouped by the event they apply to.
+    """
+
+    def __init__(self, mutations: Iterable[EventMutation]) -> None:
+        grouped: dict[ObjectKey, list[Interval]] = {}
+        for position, mutation in enumerate(mutations):
+            if mutation.event_key is None:
+                continue
+            for span in (mutation.deleted_in, mutation.added_in):
+                if span is not None:
+                    grouped.setdefault(mutation.event_key, []).append(
+                        Interval(span.start, span.end, position, mutation)
+                    )
+        self.events = {key: EventIntervals(group) for key, group in grouped.items()}
+
+    def on(self, event_key: ObjectKey, day: date) -> list[EventMutation]:
+        """
+        The mutations of the event that apply on `day`, in the order they were given.
+        """
+        intervals = self.events.get(event_key)
+        if intervals is None:
+            return []
+        applying = {
+            interval.position: interval.mutation
+            for interval in intervals.overlapping(*day_bounds(day))
+        }
+        return [applying[position] for position in sorted(applying)]
+
+
+def fetch_mutations(
+    db: StandardDatabase, owner_key: UserKey, start: date, end: date
+) -> list[EventMutation]:
+    """
+    The mutations of `owner_key`'s events that overlap the [start, end) period,
+    in the order they were created.
+    """
+    return [
+        EventMutation.from_db(mutation)
+        for mutation in db.aql.execute(
+            """
+            FOR mutation IN event_mutations
+                FILTER mutation.owner_key == @owner_key
+                FILTER mutation.event_key != null
+                FILTER (
+                    mutation.deleted_in != null
+                    AND mutation.deleted_in.start < @end
+                    AND mutation.deleted_in.end > @start
+                ) OR (
+                    mutation.added_in != null
+                    AND mutation.added_in.start < @end
+                    AND mutation.added_in.end > @start
+                )
+                SORT mutation.created_at
+                RETURN mutation
+            """,
+            bind_vars={
+                "owner_key": owner_key,
+                "start": day_bounds(start)[0].isoformat(),
+                "end": day_bounds(end)[0].isoformat(),
+            },
+        )
+    ]
@@ -1,28 +1,44 @@
-from datetime import date, datetime, timedelta
-from typing import Optional
+from datetime import date, timedelta
+from typing import Optional, Union
 
 from arango.database import StandardDatabase
-from fastapi import Depends, Query, status
+from fastapi import Depends, Query, Request, status
 from fastapi_utils.inferring_router import InferringRouter
 from schoolsyst_api import database, settings
 from schoolsyst_api.accounts.models import User
 from schoolsyst_api.accounts.users import get_current_confirmed_user
-from schoolsyst_api.models import DatetimeRange, ObjectBareKey, WeekType
-from schoolsyst_api.resource_base import ResourceRoutesGenerator
-from schoolsyst_api.schedule import current_week_type
+from schoolsyst_api.cache import Cached
+from schoolsyst_api.coalescing import Coalescing
+from schoolsyst_api.etags import Conditions, precondition_failed_responses
+from schoolsyst_api.filtering import Filtering
+from schoolsyst_api.json_patch import PatchOperation
+from schoolsyst_api.models import ObjectBareKey, WeekType
+from schoolsyst_api.resource_base import (
+    Expansion,
+    Fieldset,
+    Pagination,
+    Relation,
+    ResourceRoutesGenerator,
+)
+from schoolsyst_api.schedule import calendar, courses, current_week_type
 from schoolsyst_api.schedule.models import (
     Course,
     Event,
-    EventMutation,
     EventMutationInterpretation,
     InEvent,
 )
 from schoolsyst_api.settings.models import Settings
-from schoolsyst_api.utils import daterange
+from schoolsyst_api.single_flight import share
+from schoolsyst_api.subjects.models import Subject
 
 router = InferringRouter()
 helper = ResourceRoutesGenerator(
-    name_sg="event", name_pl="events", model_in=InEvent, model_out=Event,
+    name_sg="event",
+    name_pl="events",
+    model_in=InEvent,
+    model_out=Event,
+    sort_by=("day", "start"),
+    relations={"subject": Relation("subject_key", "subjects", Subject)},
 )
 
 
@@ -46,14 +62,32 @@ def create_event(
 
 @router.get("/events/")
 def list_events(
+    page: Pagination = Depends(),
+    fieldset: Fieldset = Depends(),
+    expansion: Expansion = Depends(),
+    conditions: Conditions = Depends(),
+    filtering: Filtering = Depends(),
+    cached: Cached = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ) -> list[Event]:
-    return helper.list(db, current_user)
+    return cached(
+        [helper.name_pl, *helper.expanded_collections(expansion)],
+        lambda: helper.list(
+            db,
+            current_user,
+            page,
+            fieldset=fieldset,
+            expansion=expansion,
+            conditions=conditions,
+            filtering=filtering,
+        ),
+    )
 
 
 @router.get("/courses/{start}/{end}/")
 def list_courses(
+    request: Request,
     start: date,
     end: date,
     include: list[EventMutationInterpretation] = Query(
@@ -65,110 +99,78 @@ def list_courses(
     ),
     week_types: Optional[list[WeekType]] = Query(None),
     current_user: User = Depends(get_current_confirmed_user),
-    settings: Settings = Depends(settings.get),
     db: StandardDatabase = Depends(database.get),
 ) -> list[Course]:
     """
     {start} is included, {end} is excluded (like python's range())
     """
+    return share(
+        current_user.key,
+        request,
+        lambda: compute_courses(db, current_user, start, end, include, week_types),
+    )
+
+
+def compute_courses(
+    db: StandardDatabase,
+    current_user: User,
+    start: date,
+    end: date,
+    include: list[EventMutationInterpretation],
+    week_types: Optional[list[WeekType]],
+) -> list[Course]:
     end = end or start + timedelta(days=1)
-    # Get all of the events
-    all_events = [
-        batch for batch in db.collection("events").find({"owner_key": current_user.key})
-    ]
-    all_events: list[Event] = [Event(**event) for event in all_events]
-    # Get all of the mutations
-    all_mutations = [
-        batch
-        for batch in db.collection("event_mutations").find(
-            {"owner_key": current_user.key}
-        )
-    ]
-    all_mutations: list[EventMutation] = [
-        EventMutation(**mutation) for mutation in all_mutations
-    ]
-    # filter mutations accordinh to ?include
-    all_mutations = [
-        mutation for mutation in all_mutations if mutation.interpretation in include
-    ]
-
-    if week_types == "auto":
-        week_types = [get_week_type(start, settings)]
-
-    courses: list[Course] = []
-    for day in daterange(start, end, precision="days"):
-        # Skip outside of year layout
-        if not any(day in year_part for year_part in settings.year_layout):
-            continue
-        # Skip offdays
-        if settings.in_offdays(day):
-            continue
-        # Get relevant events
-        events = [
-            event
-            for event in all_events
-            if (
-                # (week_type compliance)
-                (event.on_even_weeks and WeekType.even in week_types)
-                or (event.on_odd_weeks and WeekType.odd in week_types)
-            )
-            and (event.day == day)
-        ]
+    today = date.today()
+    if calendar.serves(start, end, include, week_types, today):
+        return calendar.read(db, current_user, start, end, today)
+    return courses.compute_courses(
+        db,
+        current_user.key,
+        settings.get(db, current_user),
+        start,
+        end,
+        include,
+        week_types,
+    )
+
 
-        for event in events:
-            course = Course(
-                start=datetime.combine(date=day, time=event.start),
-                end=datetime.combine(date=day, time=event.end),
-                subject_key=event.subject_key,
-                location=event.location,
-            )
-
-            # Get relevant mutations:
-            mutations = [
-                mutation
-                for mutation in all_mutations
-                if mutation.event_key == event._key
-                and (day in mutation.deleted_in or day in mutation.added_in)
-            ]
-
-            for mutation in mutations:
-                course.location = mutation.location or course.location
-                course.subject_key = mutation.subject_key or course.subject_key
-                course_daterange = DatetimeRange(start=course.start, end=course.end)
-                if mutation.deleted_in:
-                    course_daterange ^= mutation.deleted_in
-                if mutation.added_in:
-                    course_daterange |= mutation.added_in
-                if course_daterange.duration:
-                    course.start = course_daterange.start
-                    course.end = course_daterange.end
-
-            courses += [course]
-
-    return courses
-
-
-@router.patch("/events/{key}")
+@router.patch("/events/{key}", responses=precondition_failed_responses)
 def update_event(
     key: ObjectBareKey,
-    changes: InEvent,
+    changes: Union[list[PatchOperation], InEvent],
+    conditions: Conditions = Depends(),
+    coalescing: Coalescing = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ) -> Event:
-    return helper.update(db, current_user, key, changes)
+    """
+    Takes either the event's new fields, or a JSON Patch
+    (`application/json-patch+json`, see `schoolsyst_api.json_patch`).
+    """
+    if isinstance(changes, list):
+        return helper.patch(db, current_user, key, changes, conditions)
+    return helper.update(db, current_user, key, changes, conditions, coalescing)
 
 
 @router.get("/events/{key}")
 def get_event(
     key: ObjectBareKey,
+    fieldset: Fieldset = Depends(),
+    expansion: Expansion = Depends(),
+    conditions: Conditions = Depends(),
+    cached: Cached = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ) -> Event:
-    return helper.get(db, current_user, key)
+    return cached(
+        [helper.name_pl, *helper.expanded_collections(expansion)],
+        lambda: helper.get(db, current_user, key, fieldset, conditions, expansion),
+    )
 
 
 delete_an_event_responses = {
     204: {},
+    **precondition_failed_responses,
     403: {"description": "No event with key {} found"},
     404: {"description": "Currently logged-in user does not own the specified event"},
 }
@@ -181,7 +183,8 @@ delete_an_event_responses = {
 )
 def delete_event(
     key: ObjectBareKey,
+    conditions: Conditions = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ):
-    return helper.delete(db, current_user, key)
+    return helper.delete(db, current_user, key, conditions)
@@ -0,0 +1,75 @@
+"""
+Weekly templates of the schedule.
+
+The schedule repeats every week of the same type, so instead of looking for the
+events of each day among all of them, they are sorted once into a template:
+for each week type and day of the week, the events that occur then, ordered by
+start time, along with their start and end as offsets from midnight.
+Generating courses then only means stamping each day with its slots.
+"""
+from datetime import datetime, time, timedelta
+from typing import Iterable, NamedTuple
+
+from schoolsyst_api.models import ISOWeekDay, WeekType
+from schoolsyst_api.schedule.models import Event
+
+
+class Slot(NamedTuple):
+    event: Event
+    # From midnight
+    start: timedelta
+    end: timedelta
+
+    def stamp(self, midnight: datetime) -> tuple[datetime, datetime]:
+        return midnight + self.start, midnight + self.end
+
+
+def since_midnight(moment: time) -> timedelta:
+    """
+    >>> since_midnight(time(8, 30))
+    datetime.timedelta(seconds=30600)
+    """
+    return timedelta(
+        hours=moment.hour,
+        minutes=moment.minute,
+        seconds=moment.second,
+        microseconds=moment.microsecond,
+    )
+
+
+class WeeklyTemplate:
+    """
+    The slots of `events`, by week types and day of the week.
+    """
+
+    def __init__(self, events: Iterable[Event]) -> None:
+        slots = sorted(
+            (
+                Slot(event, since_midnight(event.start), since_midnight(event.end))
+                for event in events
+            ),
+            key=lambda slot: (slot.start, slot.end),
+        )
+        # Slots by (week types, ISO day of the week)
+        self.slots: dict[tuple[frozenset[WeekType], int], list[Slot]] = {}
+        for week_types in (
+            frozenset({WeekType.even}),
+            frozenset({WeekType.odd}),
+            frozenset(WeekType),
+        ):
+            for day in ISOWeekDay:
+                self.slots[week_types, day.value] = [
+                    slot
+                    for slot in slots
+                    if slot.event.day == day
+                    and (
+                        (slot.event.on_even_weeks and WeekType.even in week_types)
+                        or (slot.event.on_odd_weeks and WeekType.odd in week_types)
+                    )
+                ]
+
+    def on(self, weekday: int, week_types: frozenset[WeekType]) -> list[Slot]:
+        """
+        The slots of a day of the week, in weeks of the given types.
+        """
+        return self.slots.get((week_types, weekday), [])
@@ -1,9 +1,118 @@
+from datetime import datetime
+from typing import Any, Optional
+
 from arango.database import StandardDatabase
 from fastapi import Depends
 from schoolsyst_api import database
 from schoolsyst_api.accounts.models import User
 from schoolsyst_api.accounts.users import get_current_confirmed_user
-from schoolsyst_api.settings.models import Settings
+from schoolsyst_api.changes import execute_tracked
+from schoolsyst_api.etags import precondition_failed
+from schoolsyst_api.json_patch import PatchOperation, compile_patch, update_expression
+from schoolsyst_api.settings.models import InSettings, Settings
+
+
+def get_document(db: StandardDatabase, current_user: User) -> dict[str, Any]:
+    """
+    Gets the settings document of the current user, creating it if needed.
+    """
+    doc = db.collection("settings").get(current_user.key)
+    # If the user has no settings tied to him, create them with the default values.
+    if doc is None:
+        [doc] = execute_tracked(
+            db,
+            current_user.key,
+            "settings",
+            "INSERT MERGE(@settings, { seq }) INTO settings RETURN NEW",
+            {"settings": Settings(_key=current_user.key).to_db()},
+        )
+    return doc
+
+
+def update_document(
+    db: StandardDatabase,
+    current_user: User,
+    changes: dict[str, Any],
+    revisions: Optional[list[str]] = None,
+) -> dict[str, Any]:
+    """
+    Updates the settings document of the current user with `changes`
+    (creating it with the default values first if needed).
+    With `revisions` (see `Conditions.if_match_revisions`), the document is only
+    updated if it is at one of them, answering with a 412 otherwise.
+    """
+    if revisions is not None:
+        result = execute_tracked(
+            db,
+            current_user.key,
+            "settings",
+            """
+            FOR doc IN settings
+                FILTER doc._key == @owner_key AND doc._rev IN @revisions
+                UPDATE doc WITH MERGE(@changes, { seq }) IN settings
+                RETURN NEW
+            """,
+            {"changes": changes, "revisions": revisions},
+        )
+        if not result:
+            raise precondition_failed()
+        return result[0]
+    [doc] = execute_tracked(
+        db,
+        current_user.key,
+        "settings",
+        """
+        UPSERT { _key: @owner_key }
+        INSERT MERGE(@defaults, @changes, { seq })
+        UPDATE MERGE(@changes, { seq })
+        IN settings
+        RETURN NEW
+        """,
+        {"changes": changes, "defaults": Settings(_key=current_user.key).to_db()},
+    )
+    return doc
+
+
+def patch_document(
+    db: StandardDatabase,
+    current_user: User,
+    operations: list[PatchOperation],
+    revisions: Optional[list[str]] = None,
+) -> dict[str, Any]:
+    """
+    Applies JSON Patch `operations` to the settings document of the current user
+    (see `schoolsyst_api.json_patch`), creating it with the default values if needed.
+    With `revisions`, the document is only patched if it is at one of them.
+    """
+    patch = compile_patch(InSettings, operations)
+    statements = "\n".join(patch.statements)
+    result = execute_tracked(
+        db,
+        current_user.key,
+        "settings",
+        f"""
+        FOR doc IN settings
+            FILTER doc._key == @owner_key
+            {"FILTER doc._rev IN @revisions" if revisions is not None else ""}
+            {statements}
+            UPDATE doc WITH MERGE({update_expression(patch)}, {{
+                updated_at: @updated_at, seq
+            }}) IN settings OPTIONS {{ mergeObjects: false }}
+            RETURN NEW
+        """,
+        {
+            **patch.bind_vars,
+            "updated_at": datetime.now(),
+            **({"revisions": revisions} if revisions is not None else {}),
+        },
+    )
+    if not result:
+        # Settings that do not exist yet can not be at any of the revisions
+        if revisions is None and not db.collection("settings").has(current_user.key):
+            get_document(db, current_user)
+            return patch_document(db, current_user, operations)
+        raise precondition_failed()
+    return result[0]
 
 
 def get(
@@ -21,11 +130,4 @@ def get(
 
         (settings, False)
     """
-    doc = db.collection("settings").get(current_user.key)
-    # If the user has no settings tied to him, create them with the default values.
-    if doc is None:
-        doc = db.collection("settings").insert(
-            Settings(_key=current_user.key).json(by_alias=True), return_new=True
-        )["new"]
-
-    return Settings(**doc)
+    return Settings.from_db(get_document(db, current_user))
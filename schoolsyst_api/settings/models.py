@@ -5,6 +5,7 @@ from typing import Optional
 from fastapi_utils.enums import StrEnum
 from pydantic import Field, PositiveFloat
 from schoolsyst_api.models import BaseModel, DateRange, UserKey, WeekType
+from schoolsyst_api.settings.school_days import SchoolDays, compile_school_days
 
 
 class ThemeName(StrEnum):
@@ -61,8 +62,19 @@ class InSettings(BaseModel):
     """
     offdays: list[DateRange] = []
 
+    def school_days(self) -> SchoolDays:
+        """
+        The school days of the year layout and offdays,
+        compiled once for all settings that have the same ones.
+        """
+        return compile_school_days(
+            tuple((part.start, part.end) for part in self.year_layout),
+            tuple((offday.start, offday.end) for offday in self.offdays),
+            self.starting_week_type,
+        )
+
     def in_offdays(self, o: date) -> bool:
-        return any(o in offday_range for offday_range in self.offdays)
+        return self.school_days().is_offday(o)
 
 
 # TODO: autonatic Enum with list of attrs of InSettings as values
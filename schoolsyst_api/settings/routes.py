@@ -1,12 +1,22 @@
-import json
 from datetime import datetime
+from typing import Any, Union
 
 from arango.database import StandardDatabase
 from fastapi import Depends
+from fastapi.responses import ORJSONResponse
 from fastapi_utils.inferring_router import InferringRouter
-from schoolsyst_api import database, settings
+from schoolsyst_api import codec, database, settings
 from schoolsyst_api.accounts.models import User
 from schoolsyst_api.accounts.users import get_current_confirmed_user
+from schoolsyst_api.cache import Cached
+from schoolsyst_api.coalescing import Coalescing, coalescer
+from schoolsyst_api.etags import (
+    Conditions,
+    precondition_failed_responses,
+    revision_etag,
+)
+from schoolsyst_api.json_patch import PatchOperation
+from schoolsyst_api.resource_base import respond
 from schoolsyst_api.settings.models import InSettings, SettingKey, Settings
 
 router = InferringRouter()
@@ -18,25 +28,65 @@ def get_default_settings() -> InSettings:
 
 
 @router.get("/settings")
-def get_settings(settings: Settings = Depends(settings.get)) -> Settings:
-    return settings
+def get_settings(
+    conditions: Conditions = Depends(),
+    cached: Cached = Depends(),
+    db: StandardDatabase = Depends(database.get),
+    current_user: User = Depends(get_current_confirmed_user),
+) -> Settings:
+    return cached(["settings"], lambda: read_settings(db, current_user, conditions))
+
+
+def read_settings(
+    db: StandardDatabase, current_user: User, conditions: Conditions
+) -> ORJSONResponse:
+    if conditions.if_none_match:
+        # Revalidate without reading the whole document
+        revision = next(
+            db.aql.execute(
+                'RETURN DOCUMENT("settings", @key)._rev',
+                bind_vars={"key": current_user.key},
+            )
+        )
+        conditions.check_not_modified(revision_etag(revision) if revision else None)
+    document = settings.get_document(db, current_user)
+    conditions.check_not_modified(revision_etag(document["_rev"]))
+    return respond(Settings.from_db(document).serialize(), conditions)
 
 
-@router.patch("/settings")
+@router.patch("/settings", responses=precondition_failed_responses)
 def update_settings(
-    changes: InSettings,
+    changes: Union[list[PatchOperation], InSettings],
+    conditions: Conditions = Depends(),
+    coalescing: Coalescing = Depends(),
     db: StandardDatabase = Depends(database.get),
-    settings: Settings = Depends(settings.get),
+    current_user: User = Depends(get_current_confirmed_user),
 ) -> Settings:
-    updated_settings = {
-        **json.loads(settings.json(by_alias=True)),
-        **json.loads(changes.json(exclude_unset=True)),
-        "updated_at": datetime.now().isoformat(sep="T"),
-    }
-    new_settings = db.collection("settings").update(updated_settings, return_new=True)[
-        "new"
-    ]
-    return Settings(**new_settings)
+    """
+    Takes either the settings to change, or a JSON Patch
+    (`application/json-patch+json`, see `schoolsyst_api.json_patch`)
+    to change some of the offdays or periods of the year layout.
+    With an If-Match condition, the settings are only changed if they were not
+    modified since, and the update is not coalesced.
+    """
+    revisions = conditions.if_match_revisions()
+    if isinstance(changes, list):
+        new_settings = settings.patch_document(db, current_user, changes, revisions)
+    else:
+
+        def write(changes: dict[str, Any]) -> dict[str, Any]:
+            return settings.update_document(
+                db, current_user, {**changes, "updated_at": datetime.now()}, revisions
+            )
+
+        if coalescing.enabled and not conditions.if_match:
+            new_settings = coalescer.submit(
+                ("settings", current_user.key), codec.changes(changes), write
+            )
+        else:
+            new_settings = write(codec.changes(changes))
+    conditions.response.headers["ETag"] = revision_etag(new_settings["_rev"])
+    return Settings.from_db(new_settings)
 
 
 @router.delete("/settings")
@@ -45,9 +95,9 @@ def reset_all_settings(
     current_user: User = Depends(get_current_confirmed_user),
 ) -> Settings:
     # instead of deleting and re-inserting, update with a completely new object.
-    settings = Settings(_key=current_user.key, updated_at=datetime.now())
-    db.collection("settings").update(json.loads(settings.json(by_alias=True)))
-    return settings
+    default_settings = Settings(_key=current_user.key, updated_at=datetime.now())
+    settings.update_document(db, current_user, default_settings.to_db())
+    return default_settings
 
 
 @router.delete("/settings/{setting_key}")
@@ -57,12 +107,8 @@ def reset_setting(
     current_user: User = Depends(get_current_confirmed_user),
 ) -> Settings:
     default_settings = InSettings()
-    new_settings = db.collection("settings").update(
-        {
-            "_key": current_user.key,
-            setting_key: json.loads(default_settings.json())[setting_key],
-        },
-        return_new=True,
-    )["new"]
-
-    return Settings(**new_settings)
+    new_settings = settings.update_document(
+        db, current_user, {setting_key: default_settings.serialize()[setting_key]}
+    )
+
+    return Settings.from_db(new_settings)
@@ -0,0 +1,158 @@
+"""
+School days, compiled from the year layout and offdays of the settings.
+
+Instead of looking through the year layout and offdays for each day, they are
+compiled once (per distinct settings, see `compile_school_days`) into one byte per day,
+from the start of the earliest range to the end of the latest one, with flags
+telling whether the day is in the year layout, whether it is an offday, and whether
+it is in a week of the starting week type. Checking a day is then an index
+into that array, and the school days of a period are found by translating
+a slice of it.
+"""
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import compress
+from typing import Iterable, Iterator
+
+from schoolsyst_api.models import DateRange, WeekType
+
+IN_LAYOUT = 1
+OFFDAY = 2
+STARTING_WEEK_TYPE = 4
+# Days compiled at most, from the start of the earliest range:
+# later days are checked against the ranges
+MAX_DAYS = 3660
+
+# Maps flags to 1 for school days (in the layout, not an offday), to 0 otherwise
+SCHOOL_DAY = bytes(
+    int(flags & (IN_LAYOUT | OFFDAY) == IN_LAYOUT) for flags in range(256)
+)
+
+
+def days(start: date, count: int) -> Iterator[date]:
+    return (start + timedelta(days=n) for n in range(count))
+
+
+def week_type(starting_week_type: WeekType, year_start: date, day: date) -> WeekType:
+    """
+    The week type of `day`, for a year that started on `year_start`
+    with a week of `starting_week_type`. Week types change every seven days from
+    the start of the year; days before it are in weeks of the other type.
+
+    >>> week_type(WeekType.even, date(2020, 9, 1), date(2020, 9, 7))
+    <WeekType.even: 'even'>
+    >>> week_type(WeekType.even, date(2020, 9, 1), date(2020, 9, 8))
+    <WeekType.odd: 'odd'>
+    >>> week_type(WeekType.even, date(2020, 9, 1), date(2020, 8, 31))
+    <WeekType.odd: 'odd'>
+    """
+    # The week of the year `day` is in, counting from 1
+    week = max((day - year_start).days // 7 + 1, 0)
+    if week % 2 != 0:
+        return starting_week_type
+    return WeekType.other_one(starting_week_type)
+
+
+class SchoolDays:
+    """
+    The compiled school days of a year layout, offdays and starting week type.
+    """
+
+    def __init__(
+        self,
+        year_layout: Iterable[DateRange],
+        offdays: Iterable[DateRange],
+        starting_week_type: WeekType,
+    ) -> None:
+        self.year_layout, self.offdays = list(year_layout), list(offdays)
+        self.starting_week_type = starting_week_type
+        self.year_start = self.year_layout[0].start if self.year_layout else None
+        ranges = self.year_layout + self.offdays
+        self.first = min((r.start for r in ranges), default=date.min)
+        last = max((r.end for r in ranges), default=date.min)
+        self.flags = bytearray(min(max((last - self.first).days, 0), MAX_DAYS))
+        for flag, spans in ((IN_LAYOUT, self.year_layout), (OFFDAY, self.offdays)):
+            for span in spans:
+                start = max(self.index(span.start), 0)
+                end = min(self.index(span.end), len(self.flags))
+                for i in range(start, end):
+                    self.flags[i] |= flag
+        if self.year_start is not None:
+            for i, day in enumerate(days(self.first, len(self.flags))):
+                if week_type(starting_week_type, self.year_start, day) == (
+                    starting_week_type
+                ):
+                    self.flags[i] |= STARTING_WEEK_TYPE
+
+    def index(self, day: date) -> int:
+        return (day - self.first).days
+
+    def flags_of(self, day: date) -> int:
+        i = self.index(day)
+        if 0 <= i < len(self.flags):
+            return self.flags[i]
+        # Beyond MAX_DAYS, or outside of every range
+        flags = 0
+        if any(day in span for span in self.year_layout):
+            flags |= IN_LAYOUT
+        if any(day in span for span in self.offdays):
+            flags |= OFFDAY
+        return flags
+
+    def in_layout(self, day: date) -> bool:
+        return bool(self.flags_of(day) & IN_LAYOUT)
+
+    def is_offday(self, day: date) -> bool:
+        return bool(self.flags_of(day) & OFFDAY)
+
+    def is_school_day(self, day: date) -> bool:
+        return bool(SCHOOL_DAY[self.flags_of(day)])
+
+    def week_type(self, day: date) -> WeekType:
+        i = self.index(day)
+        if self.year_start is None:
+            return self.starting_week_type
+        if not 0 <= i < len(self.flags):
+            return week_type(self.starting_week_type, self.year_start, day)
+        if self.flags[i] & STARTING_WEEK_TYPE:
+            return self.starting_week_type
+        return WeekType.other_one(self.starting_week_type)
+
+    def mask(self, start: date, end: date) -> bytes:
+        """
+        For each day of [start, end), 1 if it is a school day, 0 otherwise.
+        """
+        count = max((end - start).days, 0)
+        i = self.index(start)
+        lo, hi = max(i, 0), min(i + count, len(self.flags))
+        if lo >= hi:
+            return bytes(self.is_school_day(day) for day in days(start, count))
+        before = [self.is_school_day(day) for day in days(start, lo - i)]
+        after = [
+            self.is_school_day(day)
+            for day in days(self.first + timedelta(days=hi), i + count - hi)
+        ]
+        return bytes(before) + self.flags[lo:hi].translate(SCHOOL_DAY) + bytes(after)
+
+    def between(self, start: date, end: date) -> list[date]:
+        """
+        The school days of [start, end).
+        """
+        return list(compress(days(start, (end - start).days), self.mask(start, end)))
+
+
+@lru_cache(maxsize=1024)
+def compile_school_days(
+    year_layout: tuple[tuple[date, date], ...],
+    offdays: tuple[tuple[date, date], ...],
+    starting_week_type: WeekType,
+) -> SchoolDays:
+    """
+    Compiles the school days of settings, once for all the settings that have
+    the same year layout, offdays and starting week type.
+    """
+    return SchoolDays(
+        [DateRange.construct(start=start, end=end) for start, end in year_layout],
+        [DateRange.construct(start=start, end=end) for start, end in offdays],
+        starting_week_type,
+    )
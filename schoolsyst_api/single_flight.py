@@ -0,0 +1,91 @@
+"""
+Single-flight execution of identical concurrent reads.
+
+Opening the app on several tabs or devices at once fires the same expensive requests
+(courses of the week, grade statistics, the personal data archive) at the same time.
+Routes that respond with `share` compute their response once per user, route and
+query string at any given time: requests that arrive while it is being computed wait
+for it and get the same response body, instead of computing it again.
+Nothing is kept once the response is computed (see `schoolsyst_api.cache` for that).
+"""
+from threading import Event, Lock
+from typing import Any, Callable, Hashable, Optional
+
+from fastapi import Request, Response
+from schoolsyst_api import codec
+from schoolsyst_api.models import UserKey
+
+
+class Flight:
+    """
+    A computation in progress, and its outcome.
+    """
+
+    def __init__(self) -> None:
+        self.done = Event()
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time. Can be used from any thread.
+    """
+
+    def __init__(self) -> None:
+        self.flights: dict[Hashable, Flight] = {}
+        self.lock = Lock()
+        # Computations run, and requests that shared one instead
+        self.computations = self.coalesced = 0
+
+    def do(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        What `compute` returns, or what the computation of `key` already in progress
+        returns. Its errors are raised to every caller.
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is None:
+                flight = self.flights[key] = Flight()
+                self.computations += 1
+                leading = True
+            else:
+                self.coalesced += 1
+                leading = False
+        if leading:
+            try:
+                flight.result = compute()
+            except Exception as error:
+                flight.error = error
+            finally:
+                with self.lock:
+                    del self.flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stats(self) -> dict[str, int]:
+        with self.lock:
+            return {
+                "computations": self.computations,
+                "coalesced": self.coalesced,
+                "in_flight": len(self.flights),
+            }
+
+
+flights = SingleFlight()
+
+
+def share(owner_key: UserKey, request: Request, compute: Callable[[], Any]) -> Response:
+    """
+    Responds with what `compute` returns (serialized with `codec`), computing it
+    only once for identical concurrent requests of `owner_key`.
+    """
+    body = flights.do(
+        (owner_key, request.url.path, request.url.query),
+        lambda: codec.dumps(compute()),
+    )
+    return Response(body, media_type="application/json")
@@ -2,14 +2,14 @@ from datetime import date
 from typing import Optional, Union
 
 from arango.database import StandardDatabase
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi_utils.inferring_router import InferringRouter
-from schoolsyst_api import database, settings
+from schoolsyst_api import database
 from schoolsyst_api.accounts.models import User
 from schoolsyst_api.accounts.users import get_current_confirmed_user
 from schoolsyst_api.grades.models import Grade
 from schoolsyst_api.models import DateRange, ObjectBareKey, Primantissa
-from schoolsyst_api.settings.models import Settings
+from schoolsyst_api.single_flight import share
 from schoolsyst_api.statistics.models import GradeStats
 
 router = InferringRouter()
@@ -55,12 +55,26 @@ def percentage_of_goal(avg: Primantissa, goal: Primantissa) -> float:
 
 @router.get("/statistics/grades/{start}/{end}")
 def get_grade_statistics(
+    request: Request,
     start: date,
     end: date,
     subject: Optional[ObjectBareKey] = None,
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
-    settings: Settings = Depends(settings.get),
+) -> GradeStats:
+    return share(
+        current_user.key,
+        request,
+        lambda: compute_grade_statistics(db, current_user, start, end, subject),
+    )
+
+
+def compute_grade_statistics(
+    db: StandardDatabase,
+    current_user: User,
+    start: date,
+    end: date,
+    subject: Optional[ObjectBareKey],
 ) -> GradeStats:
     # TODO: use AQLs instead
     criterias = {"owner_key": current_user.key}
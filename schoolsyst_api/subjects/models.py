@@ -17,6 +17,8 @@ class InSubject(BaseModel):
     goal: Optional[Primantissa] = None
     location: str = ""
 
+    computed_from = {"slug": {"name"}}
+
     @property
     def slug(self) -> str:  # unique
         return slugify(self.name)
@@ -4,8 +4,12 @@ from fastapi_utils.inferring_router import InferringRouter
 from schoolsyst_api import database
 from schoolsyst_api.accounts.models import User
 from schoolsyst_api.accounts.users import get_current_confirmed_user
+from schoolsyst_api.cache import Cached
+from schoolsyst_api.coalescing import Coalescing
+from schoolsyst_api.etags import Conditions, precondition_failed_responses
+from schoolsyst_api.filtering import Filtering
 from schoolsyst_api.models import ObjectBareKey
-from schoolsyst_api.resource_base import ResourceRoutesGenerator
+from schoolsyst_api.resource_base import Fieldset, Pagination, ResourceRoutesGenerator
 from schoolsyst_api.subjects.models import InSubject, PatchSubject, Subject
 
 router = InferringRouter()
@@ -27,33 +31,57 @@ def create_subject(
 
 @router.get("/subjects/")
 def list_subjects(
+    page: Pagination = Depends(),
+    fieldset: Fieldset = Depends(),
+    conditions: Conditions = Depends(),
+    filtering: Filtering = Depends(),
+    cached: Cached = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ) -> list[Subject]:
-    return helper.list(db, current_user)
+    return cached(
+        [helper.name_pl],
+        lambda: helper.list(
+            db,
+            current_user,
+            page,
+            fieldset=fieldset,
+            conditions=conditions,
+            filtering=filtering,
+        ),
+    )
 
 
-@router.patch("/subjects/{key}")
+@router.patch("/subjects/{key}", responses=precondition_failed_responses)
 def update_subject(
     key: ObjectBareKey,
     changes: PatchSubject,
+    conditions: Conditions = Depends(),
+    coalescing: Coalescing = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ) -> Subject:
-    return helper.update(db, current_user, key, changes)
+    return helper.update(db, current_user, key, changes, conditions, coalescing)
 
 
 @router.get("/subjects/{key}")
 def get_subject(
     key: ObjectBareKey,
+    fieldset: Fieldset = Depends(),
+    conditions: Conditions = Depends(),
+    cached: Cached = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ) -> Subject:
-    return helper.get(db, current_user, key)
+    return cached(
+        [helper.name_pl],
+        lambda: helper.get(db, current_user, key, fieldset, conditions),
+    )
 
 
 delete_a_subject_responses = {
     204: {},
+    **precondition_failed_responses,
     403: {"description": "No subject with key {} found"},
     404: {"description": "Currently logged-in user does not own the specified subject"},
 }
@@ -66,7 +94,8 @@ delete_a_subject_responses = {
 )
 def delete_subject(
     key: ObjectBareKey,
+    conditions: Conditions = Depends(),
     db: StandardDatabase = Depends(database.get),
     current_user: User = Depends(get_current_confirmed_user),
 ):
-    return helper.delete(db, current_user, key)
+    return helper.delete(db, current_user, key, conditions)
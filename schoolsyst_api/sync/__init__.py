@@ -0,0 +1,143 @@
+"""
+Delta synchronization, for clients that keep a copy of the user's data.
+
+A first GET /sync returns every document along with a token. Later calls
+with `?since=<token>` only return what was created, updated or deleted since,
+using the change sequence stamped on documents and tombstones on writes
+(see `schoolsyst_api.changes`).
+"""
+from typing import Any, Optional
+
+from arango.database import StandardDatabase
+from schoolsyst_api.grades.models import Grade
+from schoolsyst_api.homework.models import Homework
+from schoolsyst_api.models import BaseModel, UserKey
+from schoolsyst_api.notes.models import Note
+from schoolsyst_api.schedule.models import Event, EventMutation
+from schoolsyst_api.settings.models import Settings
+from schoolsyst_api.subjects.models import Subject
+
+SYNCED_MODELS: dict[str, type[BaseModel]] = {
+    "subjects": Subject,
+    "grades": Grade,
+    "homework": Homework,
+    "events": Event,
+    "event_mutations": EventMutation,
+    "settings": Settings,
+    "notes": Note,
+}
+# Settings are keyed by their owner's key instead of having an `owner_key`
+OWNED_BY = {"settings": "doc._key"}
+
+DEFAULT_SYNC_SIZE = 1000
+MAX_SYNC_SIZE = 5000
+
+
+def owned(collection: str) -> str:
+    return f"{OWNED_BY.get(collection, 'doc.owner_key')} == @owner_key"
+
+
+def everything(db: StandardDatabase, owner_key: UserKey) -> tuple[int, dict[str, Any]]:
+    """
+    Every document of the user, and the point of their change sequence it is at.
+    Done in a single query, which reads from a consistent snapshot.
+    """
+    subqueries = ", ".join(
+        f"{collection}: (FOR doc IN {collection} FILTER {owned(collection)} RETURN doc)"
+        for collection in SYNCED_MODELS
+    )
+    result = next(
+        db.aql.execute(
+            f"""
+            RETURN {{
+                seq: DOCUMENT("versions", @owner_key).seq || 0,
+                documents: {{ {subqueries} }}
+            }}
+            """,
+            bind_vars={"owner_key": owner_key},
+        )
+    )
+    return result["seq"], result["documents"]
+
+
+def changes_since(
+    db: StandardDatabase, owner_key: UserKey, since: int, limit: int
+) -> list[dict[str, Any]]:
+    """
+    Up to `limit` of the changes made after the point `since` of the user's change
+    sequence, in order. Each change has the `collection` and `seq`, and either the
+    new `document` or the `deleted` key.
+    """
+    subqueries = [
+        f"""(
+            FOR doc IN {collection}
+                FILTER {owned(collection)} AND doc.seq > @since
+                SORT doc.seq
+                LIMIT @limit
+                RETURN {{ collection: "{collection}", seq: doc.seq, document: doc }}
+        )"""
+        for collection in SYNCED_MODELS
+    ]
+    subqueries.append(
+        """(
+            FOR tombstone IN tombstones
+                FILTER tombstone.owner_key == @owner_key AND tombstone.seq > @since
+                SORT tombstone.seq
+                LIMIT @limit
+                RETURN {
+                    collection: tombstone.collection,
+                    seq: tombstone.seq,
+                    deleted: tombstone.key
+                }
+        )"""
+    )
+    return list(
+        db.aql.execute(
+            f"""
+            FOR change IN UNION({", ".join(subqueries)})
+                SORT change.seq
+                LIMIT @limit
+                RETURN change
+            """,
+            bind_vars={"owner_key": owner_key, "since": since, "limit": limit},
+        )
+    )
+
+
+def serialize(collection: str, document: dict[str, Any]) -> dict[str, Any]:
+    return SYNCED_MODELS[collection].from_db(document).serialize()
+
+
+def sync(
+    db: StandardDatabase,
+    owner_key: UserKey,
+    since: Optional[int] = None,
+    limit: int = DEFAULT_SYNC_SIZE,
+) -> tuple[int, bool, dict[str, list], dict[str, list]]:
+    """
+    What changed for the user after the point `since` of their change sequence
+    (everything if `since` is None): returns the point the client is at afterwards,
+    whether there is more to fetch from there, the updated documents and the keys
+    of the deleted ones, by collection.
+    """
+    updated: dict[str, list[dict[str, Any]]] = {name: [] for name in SYNCED_MODELS}
+    deleted: dict[str, list[str]] = {name: [] for name in SYNCED_MODELS}
+    if since is None:
+        seq, documents = everything(db, owner_key)
+        for collection, collection_documents in documents.items():
+            updated[collection] = [
+                serialize(collection, d) for d in collection_documents
+            ]
+        return seq, False, updated, deleted
+
+    changes = changes_since(db, owner_key, since, limit + 1)
+    more = len(changes) > limit
+    changes = changes[:limit]
+    for change in changes:
+        if "deleted" in change:
+            deleted.setdefault(change["collection"], []).append(change["deleted"])
+        else:
+            updated[change["collection"]].append(
+                serialize(change["collection"], change["document"])
+            )
+    return (changes[-1]["seq"] if changes else since), more, updated, deleted
@@ -0,0 +1,18 @@
+from typing import Any
+
+from schoolsyst_api.models import BaseModel
+
+
+class Sync(BaseModel):
+    """
+    What changed since the last synchronization, by collection.
+    """
+
+    # To pass as `?since=` to the next synchronization
+    token: str
+    # Not everything fit in this response: synchronize again right away
+    more: bool
+    # Documents created or updated, as returned by their collection's routes
+    updated: dict[str, list[dict[str, Any]]]
+    # Keys of the documents deleted
+    deleted: dict[str, list[str]]
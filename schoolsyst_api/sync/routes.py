@@ -0,0 +1,51 @@
+from typing import Optional
+
+from arango.database import StandardDatabase
+from fastapi import Depends, HTTPException, Query, status
+from fastapi_utils.inferring_router import InferringRouter
+from schoolsyst_api import database
+from schoolsyst_api.accounts.models import User
+from schoolsyst_api.accounts.users import get_current_confirmed_user
+from schoolsyst_api.resource_base import decode_cursor, encode_cursor
+from schoolsyst_api.sync import DEFAULT_SYNC_SIZE, MAX_SYNC_SIZE, sync
+from schoolsyst_api.sync.models import Sync
+
+router = InferringRouter()
+
+get_sync_responses = {400: {"description": "Invalid synchronization token"}}
+
+
+def decode_token(token: str) -> int:
+    try:
+        values = decode_cursor(token)
+    except HTTPException:
+        values = None
+    if not values or len(values) != 1 or not isinstance(values[0], int):
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, detail="Invalid synchronization token"
+        )
+    return values[0]
+
+
+@router.get("/sync", responses=get_sync_responses)
+def synchronize(
+    since: Optional[str] = Query(
+        None, description="The token returned by the last synchronization"
+    ),
+    limit: int = Query(
+        DEFAULT_SYNC_SIZE,
+        ge=1,
+        le=MAX_SYNC_SIZE,
+        description="Maximum number of changes to return",
+    ),
+    db: StandardDatabase = Depends(database.get),
+    current_user: User = Depends(get_current_confirmed_user),
+) -> Sync:
+    """
+    Get every document of the user that was created, updated or deleted since the
+    last synchronization, or all of them without a `since` token.
+    """
+    seq, more, updated, deleted = sync(
+        db, current_user.key, decode_token(since) if since else None, limit
+    )
+    return Sync(token=encode_cursor([seq]), more=more, updated=updated, deleted=deleted)
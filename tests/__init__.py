@@ -52,4 +52,4 @@ def insert_mocks(
         if not m.startswith("__")
     ]
     for mock in mock_objects:
-        db.collection(collection_name).insert(mock.json(by_alias=True))
+        db.collection(collection_name).insert(mock.to_db())
@@ -4,6 +4,7 @@ from arango.database import StandardDatabase
 from fastapi import status
 from isodate import isodatetime
 from schoolsyst_api.accounts.models import User
+from schoolsyst_api.jobs.runner import claim_job, run_job
 from tests import authed_request, client, database_mock, mocks
 from tests.mocks import ALICE_PASSWORD
 
@@ -170,3 +171,58 @@ def test_password_analysis():
     assert "password" not in response.json().keys()
     assert "strong_enough" in response.json().keys()
     assert not response.json()["strong_enough"]
+
+
+def test_logout():
+    with database_mock() as db:
+        db.collection("users").insert(mocks.users.alice.json(by_alias=True))
+
+        with authed_request(client, "alice", ALICE_PASSWORD) as params:
+            with authed_request(client, "alice", ALICE_PASSWORD) as other_params:
+                response = client.post("/auth/logout", **params)
+                assert response.status_code == status.HTTP_204_NO_CONTENT
+
+                assert client.get("/users/current", **params).status_code == 401
+                assert client.get("/users/current", **other_params).status_code == 200
+
+
+def test_logout_everywhere():
+    with database_mock() as db:
+        db.collection("users").insert(mocks.users.alice.json(by_alias=True))
+
+        with authed_request(client, "alice", ALICE_PASSWORD) as params:
+            with authed_request(client, "alice", ALICE_PASSWORD) as other_params:
+                response = client.post("/auth/logout/everywhere", **params)
+                assert response.status_code == status.HTTP_204_NO_CONTENT
+
+                assert client.get("/users/current", **params).status_code == 401
+                assert client.get("/users/current", **other_params).status_code == 401
+
+
+def test_delete_current_user():
+    with database_mock() as db:
+        db.collection("users").insert(mocks.users.alice.json(by_alias=True))
+
+        with authed_request(client, "alice", ALICE_PASSWORD) as params:
+            response = client.delete("/users/current", **params)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+            response = client.delete(
+                "/users/current", params={"really_delete": True}, **params
+            )
+            assert response.status_code == status.HTTP_202_ACCEPTED
+            assert response.json()["type"] == "delete_account"
+            location = response.headers["Location"]
+            assert location == f"/jobs/{response.json()['_key']}"
+
+            response = client.get(location, **params)
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json()["status"] == "queued"
+            assert "lease_id" not in response.json()
+            assert "last_error" not in response.json()
+
+        # The account is gone once the job is done, but the job can still be read
+        run_job(db, claim_job(db, ["delete_account"]))
+        response = client.get(location)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] == "succeeded"
@@ -35,6 +35,72 @@ def test_list_homework():
             ]
 
 
+def test_list_homework_fields():
+    with database_mock() as db:
+        db: StandardDatabase
+        insert_mocks(db, "users")
+        insert_mocks(db, "homework")
+
+        with authed_request(client, "alice", ALICE_PASSWORD) as params:
+            response = client.get("/homework/?fields=title,progress", **params)
+
+            assert response.status_code == 200
+            homework = mocks.homework.exos_math_not_completed_of_alice
+            assert response.json() == [
+                {"title": homework.title, "progress": homework.progress}
+            ]
+
+            response = client.get("/homework/?fields=title,password", **params)
+            assert response.status_code == 400
+
+
+def test_list_homework_filtered():
+    with database_mock() as db:
+        db: StandardDatabase
+        insert_mocks(db, "users")
+        insert_mocks(db, "homework")
+
+        with authed_request(client, "alice", ALICE_PASSWORD) as params:
+            response = client.get("/homework/?all=true&sort=-due_at", **params)
+            assert [h["title"] for h in response.json()] == [
+                mocks.homework.exos_math_not_completed_of_alice.title,
+                mocks.homework.coursework_français_completed_alice.title,
+            ]
+
+            response = client.get(
+                "/homework/?all=true&filter=due_at lt 2020-10-01 and type eq coursework",
+                **params,
+            )
+            assert [h["title"] for h in response.json()] == [
+                mocks.homework.coursework_français_completed_alice.title
+            ]
+
+            response = client.get("/homework/?filter=owner_key ne x", **params)
+            assert response.status_code == 400
+
+
+def test_list_homework_expanded():
+    with database_mock() as db:
+        db: StandardDatabase
+        insert_mocks(db, "users")
+        insert_mocks(db, "subjects")
+        insert_mocks(db, "homework")
+
+        with authed_request(client, "alice", ALICE_PASSWORD) as params:
+            response = client.get(
+                "/homework/?all=true&sort=due_at&expand=subject,grades", **params
+            )
+            assert response.status_code == 200
+            assert [h["expanded"]["subject"]["name"] for h in response.json()] == [
+                mocks.subjects.français.name,
+                mocks.subjects.mathematiques.name,
+            ]
+            assert all(h["expanded"]["grades"] == [] for h in response.json())
+
+            response = client.get("/homework/?expand=teacher", **params)
+            assert response.status_code == 400
+
+
 def test_read_homework_not_authed():
     with database_mock():
         response = client.get("/homework/")
@@ -187,3 +253,39 @@ def test_complete_homework_task():
             ][0]["completed"]
             # No other task was marked as completed
             assert len([t for t in response.json()["tasks"] if t["completed"]]) == 1
+
+
+def test_patch_homework_tasks():
+    with database_mock() as db:
+        db: StandardDatabase
+        insert_mocks(db, "users")
+        insert_mocks(db, "homework")
+        homework = mocks.homework.exos_math_not_completed_of_alice
+        with authed_request(client, "alice", ALICE_PASSWORD) as params:
+            response = client.patch(
+                f"/homework/{homework.object_key}",
+                data=json.dumps(
+                    [
+                        {"op": "replace", "path": "/tasks/0/title", "value": "Renamed"},
+                        {"op": "add", "path": "/tasks/-", "value": {"title": "New"}},
+                    ]
+                ),
+                headers={
+                    **params["headers"],
+                    "Content-Type": "application/json-patch+json",
+                },
+            )
+
+            assert response.status_code == status.HTTP_200_OK
+            tasks = response.json()["tasks"]
+            assert len(tasks) == len(homework.tasks) + 1
+            assert tasks[0]["title"] == "Renamed"
+            assert tasks[0]["key"] == homework.tasks[0].key
+            assert tasks[-1]["title"] == "New"
+
+            response = client.patch(
+                f"/homework/{homework.object_key}",
+                json=[{"op": "remove", "path": f"/tasks/{len(tasks)}"}],
+                **params,
+            )
+            assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
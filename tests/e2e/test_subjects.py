@@ -29,6 +29,74 @@ def test_list_subjects():
             )
 
 
+def test_list_subjects_paginated():
+    with database_mock() as db:
+        db: StandardDatabase
+        insert_mocks(db, "users")
+        insert_mocks(db, "subjects")
+
+        with authed_request(client, "alice", ALICE_PASSWORD) as params:
+            response = client.get("/subjects/?limit=1", **params)
+            assert response.status_code == 200
+            assert len(response.json()) == 1
+            next_page = response.headers["Link"].split(";")[0].strip("<>")
+
+            response = client.get(next_page, **params)
+            assert response.status_code == 200
+            assert len(response.json()) == 1
+            assert "Link" not in response.headers
+
+            response = client.get("/subjects/?after=nope", **params)
+            assert response.status_code == 400
+
+
+def test_subjects_conditional_requests():
+    with database_mock() as db:
+        db: StandardDatabase
+        insert_mocks(db, "users")
+        insert_mocks(db, "subjects")
+        subject = mocks.subjects.français
+
+        with authed_request(client, "alice", ALICE_PASSWORD) as params:
+            headers = params["headers"]
+            response = client.get("/subjects/", headers=headers)
+            list_etag = response.headers["ETag"]
+            response = client.get(f"/subjects/{subject.object_key}", headers=headers)
+            etag = response.headers["ETag"]
+
+            response = client.get(
+                "/subjects/", headers={**headers, "If-None-Match": list_etag}
+            )
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            response = client.get(
+                f"/subjects/{subject.object_key}",
+                headers={**headers, "If-None-Match": etag},
+            )
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+            response = client.patch(
+                f"/subjects/{subject.object_key}",
+                json={"location": "L205"},
+                headers={**headers, "If-Match": etag},
+            )
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["ETag"] != etag
+
+            # Lost update
+            response = client.patch(
+                f"/subjects/{subject.object_key}",
+                json={"location": "L206"},
+                headers={**headers, "If-Match": etag},
+            )
+            assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+            response = client.get(
+                "/subjects/", headers={**headers, "If-None-Match": list_etag}
+            )
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["ETag"] != list_etag
+
+
 def test_read_subject_not_authed():
     with database_mock():
         response = client.get("/subjects/")
@@ -0,0 +1,45 @@
+from arango.database import StandardDatabase
+from fastapi import status
+from tests import authed_request, client, database_mock, insert_mocks, mocks
+from tests.mocks import ALICE_PASSWORD
+
+
+def test_sync():
+    with database_mock() as db:
+        db: StandardDatabase
+        insert_mocks(db, "users")
+        insert_mocks(db, "subjects")
+        insert_mocks(db, "homework")
+
+        with authed_request(client, "alice", ALICE_PASSWORD) as params:
+            response = client.get("/sync", **params)
+            assert response.status_code == status.HTTP_200_OK
+            initial = response.json()
+            assert not initial["more"]
+            assert {s["_key"] for s in initial["updated"]["subjects"]} == {
+                mocks.subjects.français._key,
+                mocks.subjects.mathematiques._key,
+            }
+
+            response = client.get(f"/sync?since={initial['token']}", **params)
+            assert response.json()["updated"]["subjects"] == []
+
+            subject = mocks.subjects.français
+            client.patch(
+                f"/subjects/{subject.object_key}", json={"location": "L205"}, **params
+            )
+            client.delete(
+                f"/subjects/{mocks.subjects.mathematiques.object_key}", **params
+            )
+            response = client.get(f"/sync?since={initial['token']}&limit=1", **params)
+            first = response.json()
+            assert first["more"]
+            assert [s["location"] for s in first["updated"]["subjects"]] == ["L205"]
+
+            response = client.get(f"/sync?since={first['token']}", **params)
+            second = response.json()
+            assert not second["more"]
+            assert second["deleted"]["subjects"] == [mocks.subjects.mathematiques._key]
+
+            response = client.get("/sync?since=nope", **params)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
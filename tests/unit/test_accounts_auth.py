@@ -1,12 +1,18 @@
+import asyncio
+import json
+
 from arango.database import StandardDatabase
+from fastapi import BackgroundTasks
 from passlib.context import CryptContext
 from schoolsyst_api.accounts.auth import (
     JWT_SUB_FORMAT,
     analyze_password,
+    argon2_parameters,
     authenticate_user,
     extract_username_from_jwt_payload,
     hash_password,
     is_password_strong_enough,
+    password_context,
     verify_password,
 )
 from tests import database_mock, mocks
@@ -75,3 +81,33 @@ def test_authenticate_user():
             )
             == mocks.users.john
         )
+
+
+def test_argon2_parameters(monkeypatch):
+    monkeypatch.delenv("ARGON2_TIME_COST", raising=False)
+    monkeypatch.setenv("ARGON2_MEMORY_COST", "65536")
+    monkeypatch.setenv("ARGON2_PARALLELISM", "")
+    assert argon2_parameters() == {"memory_cost": 65536}
+
+
+def test_authenticate_user_rehashes_outdated_hashes():
+    with database_mock() as db:
+        db: StandardDatabase
+        outdated_hash = CryptContext(schemes=["argon2"]).hash(
+            JOHN_PASSWORD, memory_cost=1024, rounds=1, parallelism=1
+        )
+        db.collection("users").insert(
+            {
+                **json.loads(mocks.users.john.json(by_alias=True)),
+                "password_hash": outdated_hash,
+            }
+        )
+        tasks = BackgroundTasks()
+
+        assert authenticate_user(db, mocks.users.john.username, JOHN_PASSWORD, tasks)
+        asyncio.run(tasks())
+
+        new_hash = db.collection("users").get(mocks.users.john.key)["password_hash"]
+        assert new_hash != outdated_hash
+        assert not password_context.needs_update(new_hash)
+        assert verify_password(JOHN_PASSWORD, new_hash)
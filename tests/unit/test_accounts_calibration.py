@@ -0,0 +1,26 @@
+from schoolsyst_api.accounts.calibration import (
+    MIN_MEMORY_COST,
+    MIN_TIME_COST,
+    calibrate,
+    measure_verify_time,
+)
+
+
+def test_measure_verify_time():
+    assert 0 < measure_verify_time(MIN_MEMORY_COST, MIN_TIME_COST, 1, samples=1) < 5
+
+
+def test_calibrate_impossible_target():
+    assert calibrate(target=0, parallelism=1, samples=1) == {
+        "memory_cost": MIN_MEMORY_COST,
+        "rounds": MIN_TIME_COST,
+        "parallelism": 1,
+    }
+
+
+def test_calibrate_memory_cap():
+    parameters = calibrate(
+        target=0.5, parallelism=1, max_memory_cost=MIN_MEMORY_COST, samples=1
+    )
+    assert parameters["memory_cost"] == MIN_MEMORY_COST
+    assert parameters["rounds"] >= MIN_TIME_COST
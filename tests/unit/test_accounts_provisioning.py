@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from arango.database import StandardDatabase
+from schoolsyst_api.accounts.provisioning import (
+    ProvisioningStatus,
+    provision_users,
+    validate_rows,
+)
+from tests import database_mock, insert_mocks, mocks
+from tests.mocks import ALICE_PASSWORD, JOHN_PASSWORD
+
+
+def test_validate_rows():
+    seen_usernames, seen_emails = {"bob"}, set()
+    valid, rejected = validate_rows(
+        enumerate(
+            [
+                {"username": "ambre", "email": "ambre@example.com", "password": "x"},
+                {"username": "admin", "email": "admin@example.com", "password": "x"},
+                {"username": "ambre", "email": "ambre2@example.com", "password": "x"},
+                {"username": "bob", "email": "bob@example.com", "password": "x"},
+                {"username": "lou", "email": "not an email", "password": "x"},
+                {"username": "eve", "email": "ambre@example.com", "password": "x"},
+            ],
+            start=2,
+        ),
+        seen_usernames,
+        seen_emails,
+    )
+
+    assert [(row, user.username) for row, user in valid] == [(2, "ambre")]
+    assert [result.row for result in rejected] == [3, 4, 5, 6, 7]
+    assert all(r.status == ProvisioningStatus.rejected for r in rejected)
+    assert "not allowed" in rejected[0].detail
+    assert "more than once" in rejected[1].detail
+    assert rejected[3].detail.startswith("email")
+    assert seen_usernames == {"ambre", "bob"}
+    assert seen_emails == {"ambre@example.com"}
+
+
+def test_provision_users():
+    with database_mock() as db:
+        db: StandardDatabase
+        insert_mocks(db, "users")
+        rows = [
+            {"username": "ambre", "email": "ambre@example.com", "password": "hunter2"},
+            {"username": "ambre", "email": "hey@ambre.example.com", "password": ""},
+            {"username": "lou", "email": mocks.users.john.email, "password": "x"},
+            {
+                "username": "loulou",
+                "email": "lou@example.com",
+                "password": JOHN_PASSWORD,
+            },
+            {"username": "eve", "email": "eve@example.com", "password": ALICE_PASSWORD},
+        ]
+        with ThreadPoolExecutor() as pool:
+            results = list(provision_users(db, rows, pool, batch_size=2))
+
+        assert [r.row for r in results] == [2, 3, 4, 5, 6]
+        assert [r.status for r in results] == [
+            ProvisioningStatus.rejected,
+            ProvisioningStatus.rejected,
+            ProvisioningStatus.rejected,
+            ProvisioningStatus.created,
+            ProvisioningStatus.created,
+        ]
+        assert results[0].detail == "The password is not strong enough"
+        assert results[2].detail == "This email is already taken"
+        assert db.collection("users").all().count() == 4
+        for result in results[3:]:
+            assert db.collection("users").get(result.key)["username"] == result.username
+            assert db.collection("settings").get(result.key) is not None
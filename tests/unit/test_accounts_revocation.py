@@ -0,0 +1,55 @@
+from time import time
+
+from arango.database import StandardDatabase
+from schoolsyst_api.accounts.revocation import (
+    RevocationList,
+    revoke_all_tokens,
+    revoke_token,
+)
+from tests import database_mock, mocks
+
+
+def test_is_revoked_jti():
+    revocations = RevocationList()
+    revocations.apply({"jti": "abc", "expires_at": int(time()) + 60})
+
+    assert revocations.is_revoked("john", {"jti": "abc", "iat": int(time())})
+    assert not revocations.is_revoked("john", {"jti": "abd", "iat": int(time())})
+    assert not revocations.is_revoked("john", {})
+
+
+def test_is_revoked_issued_before():
+    revocations = RevocationList()
+    revocations.apply({"username": "john", "issued_before": 1000})
+    # An older revocation does not cancel a newer one
+    revocations.apply({"username": "john", "issued_before": 500})
+
+    assert revocations.is_revoked("john", {"jti": "abc", "iat": 999})
+    assert revocations.is_revoked("john", {"jti": "abc"})
+    assert not revocations.is_revoked("john", {"jti": "abc", "iat": 1000})
+    assert not revocations.is_revoked("alice", {"jti": "abc", "iat": 999})
+
+
+def test_refresh():
+    with database_mock() as db:
+        db: StandardDatabase
+        revoke_token(
+            db, mocks.users.john, {"jti": "abc", "exp": int(time()) + 60},
+        )
+        revoke_all_tokens(db, mocks.users.alice)
+
+        # Another worker
+        revocations = RevocationList()
+        revocations.refresh(db)
+        assert revocations.is_revoked("john", {"jti": "abc", "iat": int(time())})
+        assert revocations.is_revoked("alice", {"jti": "abd", "iat": 0})
+
+        # Refreshes are throttled...
+        revoke_token(
+            db, mocks.users.john, {"jti": "abd", "exp": int(time()) + 60},
+        )
+        revocations.refresh(db)
+        assert not revocations.is_revoked("john", {"jti": "abd", "iat": int(time())})
+        # ...unless forced
+        revocations.refresh(db, force=True)
+        assert revocations.is_revoked("john", {"jti": "abd", "iat": int(time())})
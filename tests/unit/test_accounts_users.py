@@ -0,0 +1,42 @@
+from arango.database import StandardDatabase
+from schoolsyst_api.accounts.revocation import revoke_all_tokens
+from schoolsyst_api.accounts.users import compute_personal_data_archive
+from schoolsyst_api.database import USER_DATA_COLLECTIONS
+from schoolsyst_api.jobs import enqueue
+from schoolsyst_api.mail import compose, queue_email
+from tests import database_mock, insert_mocks, mocks
+
+INTERNAL_COLLECTIONS = ("outbox", "revoked_tokens", "jobs")
+
+
+def test_user_data_collections_are_not_internal():
+    assert not set(INTERNAL_COLLECTIONS) & set(USER_DATA_COLLECTIONS)
+
+
+def test_personal_data_archive_has_no_internal_data():
+    with database_mock() as db:
+        db: StandardDatabase
+        insert_mocks(db, "users")
+        insert_mocks(db, "subjects")
+        user = mocks.users.john
+        queue_email(
+            db,
+            compose(
+                "schoolsyst",
+                "reset-password@schoolsyst.com",
+                user.username,
+                user.email,
+                "Reset your password",
+                "https://app.schoolsyst.com/reset-password/secret-token",
+                owner_key=user.key,
+            ),
+        )
+        revoke_all_tokens(db, user)
+        enqueue(db, "delete_account", owner_key=user.key)
+
+        archive = compute_personal_data_archive(db, user)
+
+        assert archive["user"]["_key"] == user.key
+        assert archive["subjects"]
+        for collection in INTERNAL_COLLECTIONS:
+            assert collection not in archive
@@ -0,0 +1,134 @@
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from schoolsyst_api.cache import Cached, ResponseCache, cache
+from schoolsyst_api.push import Hub
+from starlette.requests import Request
+from tests import mocks
+
+ALICE, JOHN = "aaaaaaaaaa", "bbbbbbbbbb"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def key(owner_key: str, path: str = "/subjects/") -> tuple[str, str, str]:
+    return (owner_key, path, "")
+
+
+def test_get_and_put():
+    responses = ResponseCache()
+    assert responses.get(key(ALICE)) is None
+    responses.put(key(ALICE), b"[]", {"etag": '"x"'}, ["subjects"], 0)
+    entry = responses.get(key(ALICE))
+    assert entry.body == b"[]"
+    assert entry.headers == {"etag": '"x"'}
+    assert responses.get(key(JOHN)) is None
+    assert responses.stats() == {
+        "hits": 1,
+        "misses": 2,
+        "hit_rate": 1 / 3,
+        "evictions": 0,
+        "invalidations": 0,
+        "entries": 1,
+        "size": 2,
+        "max_size": responses.max_bytes,
+    }
+
+
+def test_least_recently_used_are_evicted():
+    responses = ResponseCache(max_bytes=10)
+    responses.put(key(ALICE, "/a"), b"aaaa", {}, [], 0)
+    responses.put(key(ALICE, "/b"), b"bbbb", {}, [], 0)
+    responses.get(key(ALICE, "/a"))
+    responses.put(key(ALICE, "/c"), b"cccc", {}, [], 0)
+    assert responses.get(key(ALICE, "/b")) is None
+    assert responses.get(key(ALICE, "/a")) is not None
+    assert responses.get(key(ALICE, "/c")) is not None
+    assert responses.size == 8
+    # Too big to be cached at all
+    responses.put(key(ALICE, "/d"), b"d" * 11, {}, [], 0)
+    assert responses.get(key(ALICE, "/d")) is None
+    assert responses.stats()["evictions"] == 1
+
+
+def test_entries_expire():
+    clock = Clock()
+    responses = ResponseCache(ttl=60, clock=clock)
+    responses.put(key(ALICE), b"[]", {}, ["subjects"], 0)
+    clock.now = 59
+    assert responses.get(key(ALICE)) is not None
+    clock.now = 60
+    assert responses.get(key(ALICE)) is None
+    assert responses.size == 0
+
+
+def test_invalidate():
+    responses = ResponseCache()
+    responses.put(key(ALICE, "/subjects/"), b"[]", {}, ["subjects"], 0)
+    responses.put(key(ALICE, "/events/"), b"[]", {}, ["events", "subjects"], 0)
+    responses.put(key(ALICE, "/settings"), b"{}", {}, ["settings"], 0)
+    responses.put(key(JOHN, "/subjects/"), b"[]", {}, ["subjects"], 0)
+    responses.invalidate(ALICE, "subjects")
+    assert responses.get(key(ALICE, "/subjects/")) is None
+    assert responses.get(key(ALICE, "/events/")) is None
+    assert responses.get(key(ALICE, "/settings")) is not None
+    assert responses.get(key(JOHN, "/subjects/")) is not None
+    assert responses.stats()["invalidations"] == 2
+
+
+def test_responses_read_before_a_write_are_not_cached():
+    responses = ResponseCache()
+    generation = responses.generation(ALICE)
+    responses.invalidate(ALICE, "subjects")
+    responses.put(key(ALICE), b"[]", {}, ["subjects"], generation)
+    assert responses.get(key(ALICE)) is None
+
+
+def test_invalidated_by_notifications():
+    hub, responses = Hub(), ResponseCache()
+    hub.listen(responses.notify)
+    responses.put(key(ALICE), b"[]", {}, ["subjects"], 0)
+    hub.publish(ALICE, {"type": "change", "collection": "homework", "seq": 1})
+    assert responses.get(key(ALICE)) is not None
+    hub.publish(ALICE, {"type": "change", "collection": "subjects", "seq": 2})
+    assert responses.get(key(ALICE)) is None
+
+
+def request(*headers: tuple[bytes, bytes]) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/subjects/",
+            "query_string": b"fields=name",
+            "headers": list(headers),
+        }
+    )
+
+
+def test_cached():
+    calls = []
+
+    def make_response() -> Response:
+        calls.append(1)
+        return ORJSONResponse([{"name": "Maths"}], headers={"ETag": '"1"'})
+
+    cached = Cached(request(), mocks.users.alice)
+    response = cached(["subjects"], make_response)
+    assert response.headers["X-Cache"] == "miss"
+    response = cached(["subjects"], make_response)
+    assert response.headers["X-Cache"] == "hit"
+    assert response.body == b'[{"name":"Maths"}]'
+    assert response.headers["ETag"] == '"1"'
+    assert len(calls) == 1
+
+    revalidation = Cached(request((b"if-none-match", b'"1"')), mocks.users.alice)
+    assert revalidation(["subjects"], make_response).status_code == 304
+    cache.invalidate(mocks.users.alice.key, "subjects")
+    assert cached(["subjects"], make_response).headers["X-Cache"] == "miss"
+    assert len(calls) == 2
@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+from time import sleep
+
+import fastapi.exceptions
+from pytest import raises
+from schoolsyst_api.coalescing import WriteCoalescer
+
+KEY = ("homework", "aaaaaaaaaa", "bbbbbbbbbb")
+
+
+class Document:
+    def __init__(self) -> None:
+        self.fields = {"explicit_progress": 0.0, "title": "Exercises"}
+        self.writes = []
+
+    def write(self, changes: dict) -> dict:
+        self.writes.append(dict(changes))
+        self.fields |= changes
+        return dict(self.fields)
+
+
+def test_changes_are_merged_into_one_write():
+    document, coalescer = Document(), WriteCoalescer(max_delay=0.2)
+    changes = [{"explicit_progress": i / 10} for i in range(5)] + [{"title": "Done"}]
+
+    def submit(change: dict) -> dict:
+        return coalescer.submit(KEY, change, document.write)
+
+    with ThreadPoolExecutor(len(changes)) as executor:
+        first = executor.submit(submit, changes[0])
+        # The others arrive while the first one waits
+        sleep(0.05)
+        others = [executor.submit(submit, change) for change in changes[1:]]
+        results = [first.result()] + [future.result() for future in others]
+
+    assert document.writes == [{"explicit_progress": 0.4, "title": "Done"}]
+    assert results == [{"explicit_progress": 0.4, "title": "Done"}] * len(changes)
+    assert not coalescer.buffers
+
+
+def test_later_changes_go_to_a_new_write():
+    document, coalescer = Document(), WriteCoalescer(max_delay=0)
+    coalescer.submit(KEY, {"explicit_progress": 0.1}, document.write)
+    coalescer.submit(KEY, {"explicit_progress": 0.2}, document.write)
+    assert document.writes == [{"explicit_progress": 0.1}, {"explicit_progress": 0.2}]
+
+
+def test_errors_are_raised_to_every_caller():
+    coalescer = WriteCoalescer(max_delay=0)
+
+    def write(changes: dict) -> dict:
+        raise fastapi.exceptions.HTTPException(status_code=404)
+
+    with raises(fastapi.exceptions.HTTPException):
+        coalescer.submit(KEY, {"title": "x"}, write)
+    assert not coalescer.buffers
+
+
+def test_pending_changes_are_flushed_on_shutdown():
+    document, coalescer = Document(), WriteCoalescer(max_delay=60)
+    results = []
+    thread = Thread(
+        target=lambda: results.append(
+            coalescer.submit(KEY, {"title": "Done"}, document.write)
+        )
+    )
+    thread.start()
+    sleep(0.05)
+    coalescer.close()
+    thread.join(timeout=5)
+    assert results == [{"explicit_progress": 0.0, "title": "Done"}]
+    with raises(fastapi.exceptions.HTTPException) as error:
+        coalescer.submit(KEY, {"title": "Again"}, document.write)
+    assert error.value.status_code == 503
+
+
+def test_pending_changes_can_be_dropped_on_shutdown():
+    document, coalescer = Document(), WriteCoalescer(max_delay=60)
+    coalescer.flush_on_shutdown = False
+    errors = []
+
+    def submit() -> None:
+        try:
+            coalescer.submit(KEY, {"title": "Done"}, document.write)
+        except fastapi.exceptions.HTTPException as error:
+            errors.append(error.status_code)
+
+    thread = Thread(target=submit)
+    thread.start()
+    sleep(0.05)
+    coalescer.close()
+    thread.join(timeout=5)
+    assert errors == [503]
+    assert document.writes == []
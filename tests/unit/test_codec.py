@@ -0,0 +1,54 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from schoolsyst_api import codec
+from schoolsyst_api.homework.models import PatchHomework, Task
+from tests import mocks
+
+
+def test_dumps_like_pydantic():
+    for instance in [
+        mocks.users.alice,
+        mocks.subjects.mathematiques,
+        mocks.homework.exos_math_not_completed_of_alice,
+        mocks.settings.alice,
+    ]:
+        document = json.loads(codec.dumps(instance.to_db()))
+        del document["schema_version"]
+        assert document == json.loads(
+            json.dumps(instance.dict(by_alias=True), default=instance.__json_encoder__)
+        )
+
+
+def test_dumps_other_types():
+    assert json.loads(
+        codec.dumps(
+            {
+                "decimal": Decimal("0.5"),
+                "duration": timedelta(hours=1),
+                "color": mocks.subjects.mathematiques.color,
+                "task": Task(title="Read", key="abcdef"),
+            }
+        )
+    ) == {
+        "decimal": 0.5,
+        "duration": 3600.0,
+        "color": str(mocks.subjects.mathematiques.color),
+        "task": {
+            "title": "Read",
+            "key": "abcdef",
+            "completed": False,
+            "completed_at": None,
+        },
+    }
+
+
+def test_changes():
+    changes = PatchHomework(title="Revise", tasks=[Task(title="Read", key="abcdef")])
+    assert codec.changes(changes) == {
+        "title": "Revise",
+        "tasks": [
+            {"title": "Read", "key": "abcdef", "completed": False, "completed_at": None}
+        ],
+    }
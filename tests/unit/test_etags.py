@@ -0,0 +1,37 @@
+from fastapi_etag.dependency import CacheHit
+from pytest import raises
+from schoolsyst_api.etags import Conditions
+from starlette.responses import Response
+
+
+def make_conditions(**headers) -> Conditions:
+    return Conditions(
+        request=None,
+        response=Response(),
+        if_none_match=headers.get("if_none_match"),
+        if_match=headers.get("if_match"),
+    )
+
+
+def test_check_not_modified():
+    conditions = make_conditions()
+    conditions.check_not_modified('"abc"')
+    assert conditions.response.headers["ETag"] == '"abc"'
+
+    conditions = make_conditions(if_none_match='"abd", W/"abc"')
+    with raises(CacheHit) as hit:
+        conditions.check_not_modified('"abc"')
+    assert hit.value.status_code == 304
+    assert hit.value.headers == {"ETag": '"abc"'}
+
+    conditions = make_conditions(if_none_match='"abd"')
+    conditions.check_not_modified('"abc"')
+    assert conditions.response.headers["ETag"] == '"abc"'
+
+
+def test_if_match_revisions():
+    assert make_conditions().if_match_revisions() is None
+    assert make_conditions(if_match="*").if_match_revisions() is None
+    assert make_conditions(
+        if_match='"_bZ2d1--_", W/"_bZ2e2--_", "_bZ2f3--_.480db31e"'
+    ).if_match_revisions() == ["_bZ2d1--_", "_bZ2f3--_"]
@@ -0,0 +1,46 @@
+import fastapi.exceptions
+from pytest import raises
+from schoolsyst_api.filtering import Filtering
+from schoolsyst_api.homework.models import Homework
+from tests import mocks
+
+
+def test_compile():
+    filtering = Filtering(
+        f"subject_key eq {mocks.subjects.français._key} "
+        "and due_at lt 2026-11-01 and type in test,exercise and completed_at eq null",
+        "-due_at,title",
+    )
+    conditions, bind_vars = filtering.compile(Homework)
+    assert conditions == [
+        "doc.subject_key == @filter0",
+        "doc.due_at < @filter1",
+        "doc.type IN @filter2",
+        "doc.completed_at == @filter3",
+    ]
+    assert bind_vars == {
+        "filter0": mocks.subjects.français._key,
+        "filter1": "2026-11-01T00:00:00",
+        "filter2": ["test", "exercise"],
+        "filter3": None,
+    }
+    assert filtering.sort_fields(Homework) == [("due_at", True), ("title", False)]
+
+
+def test_invalid():
+    for filter_, sort in [
+        ("subject_key eq", None),
+        ("subject_key is abc", None),
+        ("subject_key eq abc or title eq x", None),
+        ("subject_key eq not-a-key", None),
+        ("tasks eq x", None),
+        ("title eq null", None),
+        ('title eq "unterminated', None),
+        ("doc._key eq x", None),
+        (None, "-nope"),
+    ]:
+        with raises(fastapi.exceptions.HTTPException) as error:
+            filtering = Filtering(filter_, sort)
+            filtering.compile(Homework)
+            filtering.sort_fields(Homework)
+        assert error.value.status_code == 400
@@ -0,0 +1,158 @@
+import re
+from datetime import datetime, timedelta
+
+from arango.database import StandardDatabase
+from schoolsyst_api.accounts.users import deletion_job_key
+from schoolsyst_api.jobs import enqueue, job_type, job_types
+from schoolsyst_api.jobs.models import Job, JobKey, JobStatus, PublicJob
+from schoolsyst_api.jobs.runner import JobRunner, claim_job, run_job
+from tests import database_mock, insert_mocks, mocks
+
+
+@job_type("test_add", concurrency=2)
+def add(db, job, report_progress):
+    report_progress(0.5)
+    return job.arguments["a"] + job.arguments["b"]
+
+
+@job_type("test_crash", max_attempts=2)
+def crash(db, job, report_progress):
+    raise ValueError("nope")
+
+
+def test_job_type():
+    assert job_types["test_add"].handler is add
+    assert job_types["test_add"].concurrency == 2
+    assert job_types["test_crash"].max_attempts == 2
+
+
+def test_available_types():
+    runner = JobRunner(db=None, workers=3)
+    assert {"test_add", "test_crash"} <= set(runner.available_types())
+
+    runner.running["test_add"] = 2
+    assert "test_add" not in runner.available_types()
+    assert "test_crash" in runner.available_types()
+
+    runner.running["test_crash"] = 1
+    assert runner.available_types() == []
+    runner.stop()
+
+
+def test_enqueue_deduplicates():
+    with database_mock() as db:
+        db: StandardDatabase
+        job = enqueue(db, "test_add", arguments={"a": 1, "b": 2}, key="add")
+        assert job.status == JobStatus.queued
+        again = enqueue(db, "test_add", arguments={"a": 3, "b": 4}, key="add")
+        assert again.arguments == {"a": 1, "b": 2}
+        assert db.collection("jobs").count() == 1
+
+
+def test_claim_job_priority():
+    with database_mock() as db:
+        db: StandardDatabase
+        low = enqueue(db, "test_add", arguments={"a": 1, "b": 2})
+        high = enqueue(db, "test_add", arguments={"a": 1, "b": 2}, priority=5)
+        enqueue(db, "test_crash", priority=10)
+
+        claimed = claim_job(db, ["test_add"])
+        assert claimed.key == high.key
+        assert claimed.status == JobStatus.running
+        assert claimed.attempts == 1
+        assert claim_job(db, ["test_add"]).key == low.key
+        assert claim_job(db, ["test_add"]) is None
+
+
+def test_run_job():
+    with database_mock() as db:
+        db: StandardDatabase
+        enqueue(db, "test_add", arguments={"a": 1, "b": 2}, key="add")
+        run_job(db, claim_job(db, ["test_add"]))
+
+        job = db.collection("jobs").get("add")
+        assert job["status"] == JobStatus.succeeded
+        assert job["result"] == 3
+        assert job["progress"] == 1
+        assert job["expires_at"] > job["finished_at"]
+
+
+def test_run_job_retries():
+    with database_mock() as db:
+        db: StandardDatabase
+        enqueue(db, "test_crash", key="crash")
+        run_job(db, claim_job(db, ["test_crash"]))
+
+        job = db.collection("jobs").get("crash")
+        assert job["status"] == JobStatus.queued
+        assert "ValueError: nope" in job["last_error"]
+        assert job["error"] == "ValueError: nope"
+        assert job["run_after"] > datetime.utcnow().isoformat()
+        assert claim_job(db, ["test_crash"]) is None
+
+        # Last attempt
+        db.collection("jobs").update(
+            {"_key": "crash", "run_after": datetime.utcnow().isoformat()}
+        )
+        run_job(db, claim_job(db, ["test_crash"]))
+        assert db.collection("jobs").get("crash")["status"] == JobStatus.failed
+
+
+def test_claim_job_abandoned():
+    with database_mock() as db:
+        db: StandardDatabase
+        job = enqueue(db, "test_add", arguments={"a": 1, "b": 2})
+        claim_job(db, ["test_add"])
+        assert claim_job(db, ["test_add"]) is None
+
+        # The runner died
+        db.collection("jobs").update(
+            {
+                "_key": job.key,
+                "lease_until": (datetime.utcnow() - timedelta(seconds=1)).isoformat(),
+            }
+        )
+        assert claim_job(db, ["test_add"]).attempts == 2
+
+
+def test_delete_account_job():
+    with database_mock() as db:
+        db: StandardDatabase
+        insert_mocks(db, "users")
+        insert_mocks(db, "subjects")
+        other = enqueue(db, "test_add", owner_key=mocks.users.alice.key)
+        johns = enqueue(db, "test_add", owner_key=mocks.users.john.key)
+        job = enqueue(db, "delete_account", owner_key=mocks.users.alice.key)
+        run_job(db, claim_job(db, ["delete_account"]))
+
+        assert db.collection("jobs").get(job.key)["status"] == JobStatus.succeeded
+        assert not db.collection("jobs").has(other.key)
+        assert db.collection("jobs").has(johns.key)
+        assert not db.collection("users").has(mocks.users.alice.key)
+        assert db.collection("users").has(mocks.users.john.key)
+        assert db.collection("subjects").find({"owner_key": job.owner_key}).empty()
+        assert not db.collection("subjects").find({}).empty()
+
+
+def test_public_job_hides_internals():
+    job = Job(
+        _key="crash",
+        type="test_crash",
+        arguments={"password": "hunter2"},
+        error="ValueError: nope",
+        last_error="Traceback (most recent call last): ...",
+        lease_id="V1StGXR8_Z5jdHi6B-myT",
+    )
+    public = PublicJob(**job.dict(by_alias=True)).dict(by_alias=True)
+    assert public["_key"] == "crash"
+    assert public["error"] == "ValueError: nope"
+    for field in ("arguments", "last_error", "lease_id", "lease_until", "owner_key"):
+        assert field not in public
+
+
+def test_deletion_job_key():
+    key = deletion_job_key(mocks.users.alice.key)
+    assert key == deletion_job_key(mocks.users.alice.key)
+    assert key != deletion_job_key(mocks.users.john.key)
+    assert mocks.users.alice.key not in key
+    assert re.fullmatch(JobKey.regex, key)
@@ -0,0 +1,89 @@
+import fastapi.exceptions
+from pytest import raises
+from schoolsyst_api import codec
+from schoolsyst_api.homework.models import InHomework
+from schoolsyst_api.json_patch import PatchOperation, compile_patch, update_expression
+from schoolsyst_api.settings.models import InSettings
+from tests import mocks
+
+
+def operations(*operations: tuple) -> list[PatchOperation]:
+    return [
+        PatchOperation(op=op, path=path, value=value) for op, path, value in operations
+    ]
+
+
+def test_compile_tasks():
+    patch = compile_patch(
+        InHomework,
+        operations(
+            ("test", "/tasks/1/key", mocks.LOWEM_DOLEM_TASK_KEY),
+            ("replace", "/tasks/1/completed", True),
+            ("add", "/tasks/-", {"title": "Read chapter 3"}),
+            ("remove", "/tasks/0", None),
+        ),
+    )
+    assert patch.statements == [
+        "FILTER LENGTH(doc.tasks) > 1",
+        "FILTER NTH(doc.tasks, 1).key == @value0",
+        "FILTER LENGTH(doc.tasks) > 1",
+        "LET patched1 = APPEND(APPEND(SLICE(doc.tasks, 0, 1), "
+        "[MERGE(NTH(doc.tasks, 1), { completed: @value1 })]), SLICE(doc.tasks, 2))",
+        "LET patched2 = PUSH(NOT_NULL(patched1, []), @value2)",
+        "FILTER LENGTH(patched2) > 0",
+        "LET patched3 = REMOVE_NTH(patched2, 0)",
+    ]
+    assert patch.fields == {"tasks": "patched3"}
+    assert update_expression(patch) == "{ tasks: patched3 }"
+    assert patch.bind_vars["value0"] == mocks.LOWEM_DOLEM_TASK_KEY
+    assert patch.bind_vars["value1"] is True
+    assert patch.bind_vars["value2"]["title"] == "Read chapter 3"
+    assert patch.bind_vars["value2"]["completed"] is False
+    assert "key" in patch.bind_vars["value2"]
+
+
+def test_compile_offdays():
+    patch = compile_patch(
+        InSettings,
+        operations(
+            ("add", "/offdays/0", {"start": "2026-12-21", "end": "2027-01-03"}),
+            ("replace", "/theme", "dark"),
+            ("remove", "/year_layout", None),
+        ),
+    )
+    assert patch.statements == [
+        "FILTER LENGTH(doc.offdays) >= 0",
+        "LET patched0 = APPEND(APPEND(SLICE(doc.offdays, 0, 0), [@value0]), "
+        "SLICE(doc.offdays, 0))",
+        "LET patched1 = @value1",
+        "LET patched2 = @value2",
+    ]
+    assert patch.fields == {
+        "offdays": "patched0",
+        "theme": "patched1",
+        "year_layout": "patched2",
+    }
+    assert patch.bind_vars == {
+        "value0": {"start": "2026-12-21", "end": "2027-01-03"},
+        "value1": "dark",
+        "value2": codec.loads(codec.dumps(InSettings().year_layout)),
+    }
+
+
+def test_invalid():
+    for operation in [
+        ("replace", "tasks/0", None),
+        ("replace", "/nope", 1),
+        ("replace", "/title/0", "x"),
+        ("replace", "/tasks/01/completed", True),
+        ("replace", "/tasks/-", {"title": "x"}),
+        ("replace", "/tasks/0/nope", True),
+        ("replace", "/tasks/0/title/x", "x"),
+        ("replace", "/tasks/0/completed", "not a boolean"),
+        ("remove", "/title", None),
+        ("remove", "/tasks/0/title", None),
+        ("replace", "/notes/0/x", "x"),
+    ]:
+        with raises(fastapi.exceptions.HTTPException) as error:
+            compile_patch(InHomework, operations(operation))
+        assert error.value.status_code == 422, operation
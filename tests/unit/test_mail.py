@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email import message_from_bytes
+
+from arango.database import StandardDatabase
+from schoolsyst_api.mail import compose, queue_email, queue_emails
+from schoolsyst_api.mail.dispatcher import (
+    SMTPConnectionPool,
+    build_message,
+    dispatch_batch,
+    try_sending,
+)
+from schoolsyst_api.mail.local_server import LocalSMTPServer
+from schoolsyst_api.mail.models import OutgoingEmail, OutgoingEmailStatus
+from tests import database_mock, mocks
+
+
+def make_email(subject: str = "Hello", to_email: str = "alice@example.com"):
+    return compose(
+        from_name="schoolsyst",
+        from_email="hey@schoolsyst.com",
+        to_name="alice",
+        to_email=to_email,
+        subject=subject,
+        body="Lorem ipsum dolor sit amet.\n.\nConsectetur",
+        owner_key=mocks.users.alice.key,
+    )
+
+
+def test_build_message():
+    message = build_message(make_email())
+    assert message["From"] == "schoolsyst <hey@schoolsyst.com>"
+    assert message["To"] == "alice <alice@example.com>"
+    assert message["Subject"] == "Hello"
+    assert message.get_content() == "Lorem ipsum dolor sit amet.\n.\nConsectetur\n"
+
+
+def test_pool_reuses_connections():
+    server = LocalSMTPServer(port=0).start()
+    pool = SMTPConnectionPool(port=server.port, size=1)
+    try:
+        for subject in ("One", "Two", "Three"):
+            assert try_sending(pool, make_email(subject)) is None
+        assert pool.idle.qsize() == 1
+    finally:
+        pool.close()
+        server.shutdown()
+        server.server_close()
+
+    assert [m.recipients for m in server.messages] == [["alice@example.com"]] * 3
+    received = message_from_bytes(server.messages[1].data)
+    assert received["Subject"] == "Two"
+    assert (
+        received.get_payload() == "Lorem ipsum dolor sit amet.\r\n.\r\nConsectetur\r\n"
+    )
+
+
+def test_try_sending_unreachable_server():
+    server = LocalSMTPServer(port=0)
+    port = server.port
+    server.server_close()
+
+    error = try_sending(SMTPConnectionPool(port=port), make_email())
+    assert error.startswith("ConnectionRefusedError")
+
+
+def test_queue_email_deduplicates():
+    with database_mock() as db:
+        db: StandardDatabase
+        assert queue_email(db, make_email())
+        assert not queue_email(db, make_email())
+        assert queue_emails(db, [make_email("Other"), make_email()]) == [True, False]
+        assert db.collection("outbox").all().count() == 2
+
+        # Sent a while ago: not a duplicate anymore
+        email = make_email()
+        db.collection("outbox").update(
+            {
+                "_key": email.key,
+                "status": "sent",
+                "created_at": (datetime.utcnow() - timedelta(days=1)).isoformat(),
+            }
+        )
+        assert queue_email(db, email)
+        assert db.collection("outbox").get(email.key)["status"] == "pending"
+
+
+def test_dispatch_batch():
+    server = LocalSMTPServer(port=0).start()
+    with database_mock() as db, ThreadPoolExecutor(2) as executor:
+        db: StandardDatabase
+        queue_emails(db, [make_email(str(n)) for n in range(5)])
+        pool = SMTPConnectionPool(port=server.port, size=2)
+
+        assert dispatch_batch(db, pool, executor, size=4) == 4
+        assert dispatch_batch(db, pool, executor, size=4) == 1
+        assert dispatch_batch(db, pool, executor, size=4) == 0
+        pool.close()
+        assert len(server.messages) == 5
+        for email in db.collection("outbox").all():
+            assert email["status"] == OutgoingEmailStatus.sent
+            assert email["attempts"] == 1
+
+        # The server goes down
+        server.shutdown()
+        server.server_close()
+        retried = make_email("Retried")
+        queue_email(db, retried)
+
+        assert dispatch_batch(db, SMTPConnectionPool(port=server.port), executor) == 1
+        retried = OutgoingEmail(**db.collection("outbox").get(retried.key))
+        assert retried.status == OutgoingEmailStatus.pending
+        assert retried.attempts == 1
+        assert retried.last_error
+        assert retried.next_attempt_at > datetime.utcnow()
+        # Not due yet
+        assert dispatch_batch(db, SMTPConnectionPool(port=server.port), executor) == 0
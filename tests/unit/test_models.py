@@ -0,0 +1,71 @@
+import json
+
+import orjson
+import pytest
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from schoolsyst_api import codec
+from schoolsyst_api.accounts.models import DBUser
+from schoolsyst_api.homework.models import Homework
+from schoolsyst_api.models import SCHEMA_VERSION, BaseModel
+from schoolsyst_api.settings.models import Settings
+from schoolsyst_api.subjects.models import Subject
+from tests import mocks
+
+
+def stored(instance: BaseModel) -> dict:
+    """
+    The document of `instance`, as read back from the database.
+    """
+    return codec.loads(codec.dumps(instance.to_db()))
+
+
+def test_to_db():
+    document = mocks.subjects.mathematiques.to_db()
+    assert document["schema_version"] == SCHEMA_VERSION
+    assert document["_key"] == mocks.subjects.mathematiques._key
+
+
+def test_from_db_trusted():
+    for model, instance in [
+        (DBUser, mocks.users.alice),
+        (Subject, mocks.subjects.mathematiques),
+        (Homework, mocks.homework.exos_math_not_completed_of_alice),
+        (Homework, mocks.homework.test_si_john_half_completed),
+        (Settings, mocks.settings.alice),
+    ]:
+        built = model.from_db(stored(instance))
+        assert built == instance
+        assert built.dict(by_alias=True) == instance.dict(by_alias=True)
+
+
+def test_from_db_missing_defaults():
+    document = stored(mocks.homework.test_si_john_half_completed)
+    del document["tasks"], document["notes"]
+    homework = Homework.from_db(document)
+    assert homework.tasks == [] and homework.notes == []
+    assert "tasks" not in homework.__fields_set__
+
+
+def test_from_db_validates_untrusted_documents():
+    document = stored(mocks.subjects.mathematiques)
+    document["owner_key"] = "not a user key"
+    # Trusted: not validated
+    assert Subject.from_db(document).owner_key == "not a user key"
+    for version in (None, SCHEMA_VERSION - 1):
+        document["schema_version"] = version
+        with pytest.raises(ValidationError):
+            Subject.from_db(document)
+
+
+def test_serialize():
+    for instance in [
+        mocks.users.alice,
+        mocks.subjects.mathematiques,
+        mocks.homework.exos_math_not_completed_of_alice,
+        mocks.settings.alice,
+        mocks.grades.alice_trigo,
+    ]:
+        assert json.loads(orjson.dumps(instance.serialize())) == jsonable_encoder(
+            instance, by_alias=True
+        )
@@ -0,0 +1,53 @@
+import asyncio
+from threading import Thread
+
+from pytest import raises
+from schoolsyst_api.push import RESYNC, Broker, Hub, Subscription
+
+ALICE, JOHN = "aaaaaaaaaa", "bbbbbbbbbb"
+
+
+def change(seq: int) -> dict:
+    return {"type": "change", "collection": "homework", "seq": seq}
+
+
+def test_hub_fans_out_to_the_owner_only():
+    async def run():
+        hub = Hub()
+        async with hub.subscribe(ALICE) as first, hub.subscribe(
+            ALICE
+        ) as second, hub.subscribe(JOHN) as other:
+            # Published from a request's thread
+            thread = Thread(target=hub.publish, args=(ALICE, change(1)))
+            thread.start()
+            thread.join()
+            assert await first.get(timeout=1) == change(1)
+            assert await second.get(timeout=1) == change(1)
+            assert await other.get(timeout=0.01) is None
+        assert not hub.subscriptions
+
+    asyncio.run(run())
+
+
+def test_subscription_overflow():
+    async def run():
+        subscription = Subscription(size=3)
+        for seq in range(5):
+            subscription.put(change(seq))
+        assert await subscription.get(timeout=1) == RESYNC
+        assert await subscription.get(timeout=1) == change(4)
+        assert await subscription.get(timeout=0.01) is None
+
+    asyncio.run(run())
+
+
+def test_publish_without_subscribers():
+    Hub().publish(ALICE, change(1))
+
+
+def test_brokers_must_publish():
+    class Incomplete(Broker):
+        pass
+
+    with raises(TypeError):
+        Incomplete()
@@ -1,17 +1,31 @@
+import json
 from datetime import datetime
 from typing import Optional
 
 import fastapi.exceptions
 from arango.database import StandardDatabase
+from fastapi.encoders import jsonable_encoder
 from parse import parse
 from pytest import raises
+from schoolsyst_api.etags import Conditions
+from schoolsyst_api.filtering import Filtering
 from schoolsyst_api.models import (
     OBJECT_KEY_FORMAT,
     BaseModel,
     OwnedResource,
     objectbarekey,
 )
-from schoolsyst_api.resource_base import ResourceRoutesGenerator
+from schoolsyst_api.resource_base import (
+    Expansion,
+    Fieldset,
+    Pagination,
+    Relation,
+    ResourceRoutesGenerator,
+    decode_cursor,
+)
+from schoolsyst_api.subjects.models import Subject
+from starlette.requests import Request
+from starlette.responses import Response
 from tests import database_mock, insert_mocks, mocks
 
 
@@ -49,6 +63,165 @@ def test_list_ok():
         assert result[0] == lorembacon
 
 
+def make_page(limit: int, after: Optional[str] = None) -> Pagination:
+    request = Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "scheme": "http",
+            "server": ("testserver", 80),
+            "path": "/ipsum/",
+            "query_string": b"",
+            "headers": [],
+        }
+    )
+    return Pagination(request, Response(), limit=limit, after=after)
+
+
+def test_list_paginated():
+    with database_mock() as db:
+        helper = setup_helper_and_db(db)
+        lorems = [
+            LoremOut(
+                dolor=i,
+                sit="ham",
+                owner_key=mocks.users.john.key,
+                created_at=datetime(2020, 9, 1, 8, i % 3),
+            )
+            for i in range(5)
+        ]
+        for lorem in lorems:
+            db.collection("ipsum").insert(lorem.json(by_alias=True))
+
+        pages, cursor = [], None
+        while True:
+            page = make_page(limit=2, after=cursor)
+            pages.append(helper.list(db, mocks.users.john, page))
+            if "Link" not in page.response.headers:
+                break
+            link = page.response.headers["Link"]
+            assert link.startswith("<http://testserver/ipsum/?after=")
+            assert link.endswith('&limit=2>; rel="next"')
+            cursor = link.split("after=")[1].split("&")[0]
+
+        assert [len(p) for p in pages] == [2, 2, 2]
+        # Sorted on the creation date, then on the key
+        expected = sorted(
+            [*lorems, lorembacon], key=lambda lorem: (lorem.created_at, lorem._key)
+        )
+        assert [lorem._key for p in pages for lorem in p] == [
+            lorem._key for lorem in expected
+        ]
+
+
+def test_list_paginated_partial_sorted():
+    with database_mock() as db:
+        helper = setup_helper_and_db(db)
+        lorems = [
+            LoremOut(dolor=i % 3, sit=f"ham {i}", owner_key=mocks.users.john.key)
+            for i in range(5)
+        ]
+        for lorem in lorems:
+            db.collection("ipsum").insert(lorem.json(by_alias=True))
+
+        pages, cursor = [], None
+        while len(pages) < 10:
+            page = make_page(limit=2, after=cursor)
+            response = helper.list(
+                db,
+                mocks.users.john,
+                page,
+                fieldset=Fieldset("sit"),
+                filtering=Filtering(None, "-dolor"),
+            )
+            pages.append(json.loads(response.body))
+            if "Link" not in page.response.headers:
+                break
+            cursor = page.response.headers["Link"].split("after=")[1].split("&")[0]
+
+        assert [len(p) for p in pages] == [2, 2, 1]
+        expected = sorted(lorems, key=lambda lorem: (-lorem.dolor, lorem._key))
+        assert [lorem["sit"] for p in pages for lorem in p] == [
+            lorem.sit for lorem in expected
+        ]
+
+
+def test_decode_cursor_invalid():
+    for cursor in ("nope", "e30", "!!"):
+        with raises(fastapi.exceptions.HTTPException) as error:
+            decode_cursor(cursor)
+        assert error.value.status_code == 400
+
+
+def test_projection():
+    helper = ResourceRoutesGenerator("lorem", "ipsum", Lorem, LoremOut)
+    assert helper.projection(Fieldset("sit,_key")) == [
+        "_key",
+        "created_at",
+        "object_key",
+        "owner_key",
+        "schema_version",
+        "sit",
+    ]
+    assert "dolor" in helper.projection(Fieldset("sit"), ["dolor", "_key"])
+    assert Fieldset("sit, ,_key, ").names == ["sit", "_key"]
+    with raises(fastapi.exceptions.HTTPException) as error:
+        helper.projection(Fieldset("sit,amet"))
+    assert error.value.status_code == 400
+    assert "amet" in error.value.detail
+
+
+def test_expansion_query():
+    helper = ResourceRoutesGenerator(
+        "lorem",
+        "ipsum",
+        Lorem,
+        LoremOut,
+        relations={
+            "subject": Relation("subject_key", "subjects", Subject),
+            "related": Relation("related_keys", "ipsum", LoremOut, many=True),
+        },
+    )
+    assert Expansion("related, ,subject, ").names == ["related", "subject"]
+    expanded, bind_vars = helper.expansion_query(Expansion("related,subject"))
+    assert bind_vars == {"expand0": "ipsum", "expand1": "subjects"}
+    assert expanded.startswith("{ related: (")
+    assert "DOCUMENT(@expand0, NOT_NULL(doc.related_keys, []))" in expanded
+    assert "subject: FIRST(" in expanded
+    assert "[DOCUMENT(@expand1, doc.subject_key)]" in expanded
+    assert expanded.count("FILTER related.owner_key == @owner_key") == 2
+    with raises(fastapi.exceptions.HTTPException) as error:
+        helper.expansion_query(Expansion("subject,amet"))
+    assert error.value.status_code == 400
+    assert "amet" in error.value.detail
+
+
+def test_list_partial():
+    with database_mock() as db:
+        helper = setup_helper_and_db(db)
+        response = helper.list(db, mocks.users.john, fieldset=Fieldset("sit,_key"))
+        assert json.loads(response.body) == [{"sit": "eggs", "_key": lorembacon._key}]
+
+
+def test_get_partial():
+    with database_mock() as db:
+        helper = setup_helper_and_db(db)
+        response = helper.get(
+            db, mocks.users.john, lorembacon.object_key, Fieldset("dolor")
+        )
+        assert json.loads(response.body) == {"dolor": 47}
+
+
+def test_list_response():
+    with database_mock() as db:
+        helper = setup_helper_and_db(db)
+        response = helper.list(db, mocks.users.john, fieldset=Fieldset(None))
+        assert json.loads(response.body) == [
+            jsonable_encoder(resource, by_alias=True)
+            for resource in helper.list(db, mocks.users.john)
+        ]
+
+
 def test_get_not_found():
     with database_mock() as db:
         db: StandardDatabase
@@ -137,6 +310,39 @@ def test_update_ok():
         assert parsed_full_key.named["object"] == result["object_key"]
 
 
+def test_update_if_match():
+    with database_mock() as db:
+        db: StandardDatabase
+        helper = setup_helper_and_db(db)
+        revision = db.collection("ipsum").get(lorembacon._key)["_rev"]
+        conditions = Conditions(
+            request=None, response=Response(), if_match=f'"{revision}"'
+        )
+        result = helper.update(
+            db, mocks.users.john, lorembacon.object_key, LoremPatch(dolor=1), conditions
+        )
+        assert result.dolor == 1
+        assert result.sit == lorembacon.sit
+        new_etag = conditions.response.headers["ETag"]
+        assert new_etag != f'"{revision}"'
+
+        # The resource was modified since the client got it
+        with raises(fastapi.exceptions.HTTPException) as error:
+            helper.update(
+                db,
+                mocks.users.john,
+                lorembacon.object_key,
+                LoremPatch(dolor=2),
+                conditions,
+            )
+        assert error.value.status_code == 412
+        assert db.collection("ipsum").get(lorembacon._key)["dolor"] == 1
+
+        conditions = Conditions(request=None, response=Response(), if_match=new_etag)
+        helper.delete(db, mocks.users.john, lorembacon.object_key, conditions)
+        assert not db.collection("ipsum").has(lorembacon._key)
+
+
 def test_update_not_found():
     with database_mock() as db:
         db: StandardDatabase
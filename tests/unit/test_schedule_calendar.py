@@ -0,0 +1,286 @@
+from datetime import date, datetime, time, timedelta
+
+from arango.database import StandardDatabase
+from schoolsyst_api import settings
+from schoolsyst_api.changes import LEAVE_TOMBSTONE, execute_tracked
+from schoolsyst_api.models import DateRange, DatetimeRange, WeekType
+from schoolsyst_api.schedule import calendar
+from schoolsyst_api.schedule.courses import (
+    PlannedCourse,
+    Span,
+    compute_courses,
+    days_between,
+    generate_courses,
+)
+from schoolsyst_api.schedule.models import Course, Event, EventMutation
+from schoolsyst_api.schedule.mutations import MutationIndex
+from schoolsyst_api.settings.models import Settings
+from tests import database_mock, insert_mocks, mocks
+from tests.mocks import JOHN_KEY
+
+TODAY = date(2020, 10, 14)
+SETTINGS = Settings(
+    _key=JOHN_KEY,
+    year_layout=[DateRange(start=date(2020, 9, 1), end=date(2021, 7, 1))],
+    offdays=[DateRange(start=date(2020, 10, 17), end=date(2020, 11, 2))],
+    starting_week_type=WeekType.even,
+)
+
+
+def event(day, on_even_weeks=True, on_odd_weeks=True):
+    return Event(
+        owner_key=JOHN_KEY,
+        start=time(8),
+        end=time(9),
+        day=day,
+        on_even_weeks=on_even_weeks,
+        on_odd_weeks=on_odd_weeks,
+    )
+
+
+def test_window_covers_whole_weeks_around_the_current_one():
+    start, end = calendar.window(TODAY)
+    assert start == date(2020, 8, 17)
+    assert end == date(2020, 12, 14)
+    assert calendar.window(date(2020, 10, 18)) == (start, end)
+    assert calendar.window(date(2020, 10, 19)) != (start, end)
+
+
+def test_serves_only_the_default_requests_within_the_window():
+    include = calendar.DEFAULT_INCLUDE
+    assert calendar.serves(date(2020, 10, 12), date(2020, 10, 19), include, None, TODAY)
+    assert not calendar.serves(
+        date(2020, 10, 12), date(2021, 1, 4), include, None, TODAY
+    )
+    assert not calendar.serves(
+        date(2020, 10, 12), date(2020, 10, 19), include, [WeekType.odd], TODAY
+    )
+    assert not calendar.serves(
+        date(2020, 10, 12), date(2020, 10, 19), list(include)[:1], None, TODAY
+    )
+
+
+def test_schedule_fingerprint_ignores_unrelated_settings():
+    fingerprint = calendar.schedule_fingerprint(SETTINGS)
+    assert calendar.schedule_fingerprint(SETTINGS.copy(update={"grades_unit": 20})) == (
+        fingerprint
+    )
+    assert calendar.schedule_fingerprint(
+        SETTINGS.copy(update={"starting_week_type": WeekType.odd})
+    ) != (fingerprint)
+    assert calendar.schedule_fingerprint(SETTINGS.copy(update={"offdays": []})) != (
+        fingerprint
+    )
+
+
+def test_generated_courses_follow_the_week_types_and_offdays():
+    monday, odd_wednesday = event(1), event(3, on_even_weeks=False)
+    occurrences = list(
+        generate_courses(
+            JOHN_KEY,
+            SETTINGS,
+            [monday, odd_wednesday],
+            MutationIndex([]),
+            days_between(date(2020, 9, 7), date(2020, 10, 24)),
+        )
+    )
+    # Week types change every seven days from the start of the year
+    assert [(o.day, o.event_key) for o in occurrences] == [
+        (date(2020, 9, 7), monday._key),
+        (date(2020, 9, 9), odd_wednesday._key),
+        (date(2020, 9, 14), monday._key),
+        (date(2020, 9, 21), monday._key),
+        (date(2020, 9, 23), odd_wednesday._key),
+        (date(2020, 9, 28), monday._key),
+        (date(2020, 10, 5), monday._key),
+        (date(2020, 10, 7), odd_wednesday._key),
+        (date(2020, 10, 12), monday._key),
+    ]
+
+
+def test_generated_courses_have_stable_keys_and_record_their_mutations():
+    monday = event(1)
+    mutation = EventMutation(
+        owner_key=JOHN_KEY,
+        event_key=monday._key,
+        location="L013",
+        deleted_in=DatetimeRange(
+            start=datetime(2020, 9, 7, 8), end=datetime(2020, 9, 7, 9)
+        ),
+        added_in=DatetimeRange(
+            start=datetime(2020, 9, 7, 14), end=datetime(2020, 9, 7, 15)
+        ),
+    )
+
+    def generate():
+        return list(
+            generate_courses(
+                JOHN_KEY,
+                SETTINGS,
+                [monday],
+                MutationIndex([mutation]),
+                [date(2020, 9, 7)],
+            )
+        )
+
+    [occurrence] = generate()
+    assert occurrence.mutation_keys == [mutation._key]
+    assert occurrence.course.location == "L013"
+    assert occurrence.course.object_key == generate()[0].course.object_key
+
+
+def test_spans_combine_like_datetime_ranges():
+    course = DatetimeRange(start=datetime(2020, 9, 7, 8), end=datetime(2020, 9, 7, 9))
+    deleted = DatetimeRange(start=datetime(2020, 9, 7, 8), end=datetime(2020, 9, 7, 9))
+    added = DatetimeRange(start=datetime(2020, 9, 8, 14), end=datetime(2020, 9, 8, 15))
+    span = Span(course.start, course.end)
+    assert tuple(span ^ deleted) == ((course ^ deleted).start, (course ^ deleted).end)
+    assert tuple(span | added) == ((course | added).start, (course | added).end)
+    assert (span ^ deleted).duration == (course ^ deleted).duration
+
+
+def test_planned_courses_become_courses():
+    planned = PlannedCourse(
+        JOHN_KEY,
+        "a2b3c4",
+        datetime(2020, 9, 7, 8),
+        datetime(2020, 9, 7, 9),
+        None,
+        "L013",
+    )
+    now = datetime.now()
+    course = planned.to_model(created_at=now)
+    assert course == Course(
+        owner_key=JOHN_KEY,
+        object_key="a2b3c4",
+        start=datetime(2020, 9, 7, 8),
+        end=datetime(2020, 9, 7, 9),
+        location="L013",
+        created_at=now,
+    )
+    assert course._key == f"{JOHN_KEY}:a2b3c4"
+
+
+def setup_schedule(db: StandardDatabase, *documents) -> None:
+    """
+    Stores SETTINGS and the given events and mutations as the API would,
+    stamping them on John's change sequence.
+    """
+    insert_mocks(db, "users")
+    settings.update_document(db, mocks.users.john, SETTINGS.to_db())
+    for document in documents:
+        collection = "events" if isinstance(document, Event) else "event_mutations"
+        execute_tracked(
+            db,
+            JOHN_KEY,
+            collection,
+            f"INSERT MERGE(@document, {{ seq }}) INTO {collection} RETURN NEW",
+            {"document": document.to_db()},
+        )
+
+
+def summary(courses: list[Course]) -> list[tuple]:
+    return sorted(
+        (course._key, course.start, course.end, course.subject_key, course.location)
+        for course in courses
+    )
+
+
+def assert_read_is_computed(db, start, end, today=TODAY):
+    """
+    Reads the courses of [start, end) from the calendar, checking that they are
+    the ones generated on the fly.
+    """
+    read = calendar.read(db, mocks.users.john, start, end, today)
+    computed = compute_courses(
+        db,
+        JOHN_KEY,
+        settings.get(db, mocks.users.john),
+        start,
+        end,
+        calendar.DEFAULT_INCLUDE,
+    )
+    assert summary(read) == summary(computed)
+    return read
+
+
+def test_read_after_an_event_moved():
+    with database_mock() as db:
+        monday = event(1)
+        setup_schedule(db, monday, event(2))
+        start, end = date(2020, 9, 7), date(2020, 10, 17)
+        before = assert_read_is_computed(db, start, end)
+
+        execute_tracked(
+            db,
+            JOHN_KEY,
+            "events",
+            "UPDATE @key WITH { day: 3, seq } IN events RETURN NEW",
+            {"key": monday._key},
+        )
+        after = assert_read_is_computed(db, start, end)
+        assert {course.start.isoweekday() for course in before} == {1, 2}
+        assert {course.start.isoweekday() for course in after} == {2, 3}
+
+
+def test_read_after_a_mutation_was_deleted():
+    with database_mock() as db:
+        monday = event(1)
+        moved = EventMutation(
+            owner_key=JOHN_KEY,
+            event_key=monday._key,
+            location="L013",
+            deleted_in=DatetimeRange(
+                start=datetime(2020, 9, 14, 8), end=datetime(2020, 9, 14, 9)
+            ),
+            added_in=DatetimeRange(
+                start=datetime(2020, 9, 14, 14), end=datetime(2020, 9, 14, 15)
+            ),
+        )
+        setup_schedule(db, monday, moved)
+        start, end = date(2020, 9, 7), date(2020, 9, 28)
+        before = assert_read_is_computed(db, start, end)
+
+        # Removing it leaves a tombstone, that the calendar finds the courses with
+        execute_tracked(
+            db,
+            JOHN_KEY,
+            "event_mutations",
+            f"""
+            FOR doc IN event_mutations
+                FILTER doc._key == @key
+                REMOVE doc IN event_mutations
+                {LEAVE_TOMBSTONE}
+                RETURN true
+            """,
+            {"key": moved._key},
+        )
+        after = assert_read_is_computed(db, start, end)
+        assert [course.location for course in before].count("L013") == 1
+        assert "L013" not in [course.location for course in after]
+
+
+def test_read_after_offdays_changed():
+    with database_mock() as db:
+        setup_schedule(db, event(1), event(4))
+        start, end = date(2020, 10, 12), date(2020, 11, 9)
+        before = assert_read_is_computed(db, start, end)
+
+        settings.update_document(db, mocks.users.john, {"offdays": []})
+        after = assert_read_is_computed(db, start, end)
+        assert len(after) > len(before)
+
+
+def test_read_after_the_window_moved_forward():
+    with database_mock() as db:
+        setup_schedule(db, event(1), event(3, on_even_weeks=False))
+        assert_read_is_computed(db, date(2020, 10, 5), date(2020, 12, 14))
+
+        later = TODAY + timedelta(weeks=4)
+        window_start, window_end = calendar.window(later)
+        after = assert_read_is_computed(db, date(2020, 12, 7), window_end, later)
+        # The days that entered the window were generated
+        assert max(course.start for course in after).date() >= date(2020, 12, 14)
+        # The courses of those that left it were removed
+        assert window_start == date(2020, 9, 14)
+        assert not calendar.read_courses(db, JOHN_KEY, date(2020, 9, 7), window_start)
@@ -0,0 +1,95 @@
+from datetime import date, datetime, timedelta
+
+from schoolsyst_api.models import DatetimeRange
+from schoolsyst_api.schedule.models import EventMutation
+from schoolsyst_api.schedule.mutations import EventIntervals, Interval, MutationIndex
+from tests.mocks import JOHN_KEY
+
+EVENT_KEY = f"{JOHN_KEY}:physicsxxx"
+OTHER_EVENT_KEY = f"{JOHN_KEY}:chemistryx"
+
+
+def mutation(event_key=EVENT_KEY, deleted_in=None, added_in=None, **fields):
+    return EventMutation(
+        owner_key=JOHN_KEY,
+        event_key=event_key,
+        deleted_in=DatetimeRange(start=deleted_in[0], end=deleted_in[1])
+        if deleted_in
+        else None,
+        added_in=DatetimeRange(start=added_in[0], end=added_in[1])
+        if added_in
+        else None,
+        **fields,
+    )
+
+
+def test_mutations_apply_on_the_days_they_overlap():
+    deletion = mutation(deleted_in=(datetime(2020, 9, 1, 8), datetime(2020, 9, 1, 9)))
+    reschedule = mutation(
+        deleted_in=(datetime(2020, 9, 3, 8), datetime(2020, 9, 3, 9)),
+        added_in=(datetime(2020, 9, 4, 14), datetime(2020, 9, 4, 15)),
+    )
+    index = MutationIndex([deletion, reschedule])
+    assert index.on(EVENT_KEY, date(2020, 9, 1)) == [deletion]
+    assert index.on(EVENT_KEY, date(2020, 9, 2)) == []
+    assert index.on(EVENT_KEY, date(2020, 9, 3)) == [reschedule]
+    assert index.on(EVENT_KEY, date(2020, 9, 4)) == [reschedule]
+    assert index.on(OTHER_EVENT_KEY, date(2020, 9, 1)) == []
+
+
+def test_mutations_spanning_several_days():
+    long_one = mutation(deleted_in=(datetime(2020, 9, 1, 8), datetime(2020, 9, 20)))
+    short_one = mutation(
+        deleted_in=(datetime(2020, 9, 10, 8), datetime(2020, 9, 10, 9))
+    )
+    index = MutationIndex([long_one, short_one])
+    assert index.on(EVENT_KEY, date(2020, 9, 10)) == [long_one, short_one]
+    assert index.on(EVENT_KEY, date(2020, 9, 19)) == [long_one]
+    assert index.on(EVENT_KEY, date(2020, 9, 20)) == []
+
+
+def test_mutations_are_applied_in_the_order_they_were_given():
+    later_start = mutation(
+        deleted_in=(datetime(2020, 9, 1, 10), datetime(2020, 9, 1, 11)),
+        location="L013",
+    )
+    earlier_start = mutation(
+        deleted_in=(datetime(2020, 9, 1, 8), datetime(2020, 9, 1, 9)), location="L453",
+    )
+    assert MutationIndex([later_start, earlier_start]).on(
+        EVENT_KEY, date(2020, 9, 1)
+    ) == [later_start, earlier_start]
+
+
+def test_mutations_without_an_event_are_ignored():
+    index = MutationIndex(
+        [
+            mutation(
+                event_key=None,
+                added_in=(datetime(2020, 9, 1, 8), datetime(2020, 9, 1, 9)),
+            )
+        ]
+    )
+    assert index.events == {}
+
+
+def test_overlapping_matches_a_linear_scan():
+    base = datetime(2020, 9, 1)
+    intervals = EventIntervals(
+        Interval(
+            base + timedelta(hours=7 * i),
+            base + timedelta(hours=7 * i + (i % 5) * 3 + 1),
+            i,
+            None,
+        )
+        for i in range(200)
+    )
+    for hours in range(0, 7 * 200, 5):
+        start = base + timedelta(hours=hours)
+        end = start + timedelta(hours=24)
+        expected = [
+            interval
+            for interval in intervals.intervals
+            if interval.end > start and interval.start < end
+        ]
+        assert intervals.overlapping(start, end) == expected
@@ -0,0 +1,49 @@
+from datetime import datetime, time, timedelta
+
+from schoolsyst_api.models import WeekType
+from schoolsyst_api.schedule.models import Event
+from schoolsyst_api.schedule.template import WeeklyTemplate
+from tests.mocks import JOHN_KEY
+
+EVEN, ODD, BOTH = (
+    frozenset({WeekType.even}),
+    frozenset({WeekType.odd}),
+    frozenset(WeekType),
+)
+
+
+def event(day, start, on_even_weeks=True, on_odd_weeks=True):
+    return Event(
+        owner_key=JOHN_KEY,
+        start=start,
+        end=time(start.hour + 1),
+        day=day,
+        on_even_weeks=on_even_weeks,
+        on_odd_weeks=on_odd_weeks,
+    )
+
+
+def test_slots_are_sorted_by_start_and_bucketed_by_week_type():
+    afternoon = event(1, time(14))
+    morning_even = event(1, time(8), on_odd_weeks=False)
+    morning_odd = event(1, time(9), on_even_weeks=False)
+    tuesday = event(2, time(10))
+    template = WeeklyTemplate([afternoon, morning_even, morning_odd, tuesday])
+
+    def events(weekday, week_types):
+        return [slot.event for slot in template.on(weekday, week_types)]
+
+    assert events(1, EVEN) == [morning_even, afternoon]
+    assert events(1, ODD) == [morning_odd, afternoon]
+    assert events(1, BOTH) == [morning_even, morning_odd, afternoon]
+    assert events(2, ODD) == [tuesday]
+    assert events(3, BOTH) == []
+
+
+def test_slots_are_stamped_on_a_day():
+    [slot] = WeeklyTemplate([event(1, time(8, 30))]).on(1, BOTH)
+    midnight = datetime(2020, 9, 7)
+    assert slot.stamp(midnight) == (
+        midnight + timedelta(hours=8, minutes=30),
+        midnight + timedelta(hours=9),
+    )
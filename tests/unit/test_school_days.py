@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+
+from schoolsyst_api.models import DateRange, WeekType
+from schoolsyst_api.schedule import current_week_type
+from schoolsyst_api.settings import school_days
+from schoolsyst_api.settings.models import Settings
+from schoolsyst_api.settings.school_days import SchoolDays, compile_school_days
+from tests.mocks import JOHN_KEY
+
+YEAR_LAYOUT = [
+    DateRange(start=date(2020, 9, 1), end=date(2021, 1, 30)),
+    DateRange(start=date(2021, 2, 1), end=date(2021, 7, 1)),
+]
+OFFDAYS = [
+    DateRange(start=date(2020, 10, 17), end=date(2020, 11, 2)),
+    DateRange(start=date(2021, 6, 20), end=date(2021, 8, 1)),
+]
+
+
+def linear_school_day(day):
+    return any(day in part for part in YEAR_LAYOUT) and not any(
+        day in offday for offday in OFFDAYS
+    )
+
+
+def test_days_match_the_ranges():
+    days = SchoolDays(YEAR_LAYOUT, OFFDAYS, WeekType.odd)
+    day = date(2020, 8, 1)
+    while day < date(2021, 9, 1):
+        assert days.is_school_day(day) == linear_school_day(day)
+        assert days.in_layout(day) == any(day in part for part in YEAR_LAYOUT)
+        assert days.is_offday(day) == any(day in offday for offday in OFFDAYS)
+        day += timedelta(days=1)
+
+
+def test_week_types_match_current_week_type():
+    days = SchoolDays(YEAR_LAYOUT, OFFDAYS, WeekType.odd)
+    day = date(2020, 8, 1)
+    while day < date(2021, 9, 1):
+        assert days.week_type(day) == current_week_type(
+            WeekType.odd, date(2020, 9, 1), day
+        )
+        day += timedelta(days=1)
+
+
+def test_school_days_between():
+    days = SchoolDays(YEAR_LAYOUT, OFFDAYS, WeekType.even)
+    start, end = date(2020, 8, 20), date(2021, 8, 10)
+    expected = [
+        start + timedelta(days=n)
+        for n in range((end - start).days)
+        if linear_school_day(start + timedelta(days=n))
+    ]
+    assert days.between(start, end) == expected
+    assert days.between(date(2019, 1, 1), date(2019, 2, 1)) == []
+    assert days.between(date(2021, 1, 29), date(2021, 2, 2)) == [
+        date(2021, 1, 29),
+        date(2021, 2, 1),
+    ]
+
+
+def test_days_beyond_what_is_compiled(monkeypatch):
+    monkeypatch.setattr(school_days, "MAX_DAYS", 30)
+    days = SchoolDays(YEAR_LAYOUT, OFFDAYS, WeekType.even)
+    assert len(days.flags) == 30
+    assert days.is_school_day(date(2021, 3, 1))
+    assert not days.is_school_day(date(2021, 6, 25))
+    assert days.between(date(2020, 9, 25), date(2020, 10, 5)) == [
+        date(2020, 9, 25) + timedelta(days=n) for n in range(10)
+    ]
+
+
+def test_settings_are_compiled_once():
+    compile_school_days.cache_clear()
+    settings = Settings(_key=JOHN_KEY, year_layout=YEAR_LAYOUT, offdays=OFFDAYS)
+    same = Settings(
+        _key=JOHN_KEY, year_layout=YEAR_LAYOUT, offdays=OFFDAYS, grades_unit=20
+    )
+    assert settings.school_days() is same.school_days()
+    assert compile_school_days.cache_info().misses == 1
+    assert settings.in_offdays(date(2020, 10, 20))
+    assert not settings.in_offdays(date(2020, 10, 16))
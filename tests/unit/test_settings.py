@@ -1,5 +1,8 @@
 import schoolsyst_api.settings
 from arango.database import StandardDatabase
+from fastapi.exceptions import HTTPException
+from pytest import raises
+from schoolsyst_api.json_patch import PatchOperation
 from schoolsyst_api.settings.models import InSettings
 from tests import database_mock, insert_mocks, mocks
 
@@ -16,3 +19,32 @@ def test_get():
 
         # test that the user now has a settings object tied to him in the db
         assert db.collection("settings").get(mocks.users.john.key) is not None
+
+
+def test_update_if_match():
+    with database_mock() as db:
+        db: StandardDatabase
+        insert_mocks(db, "users")
+        user = mocks.users.john
+        revision = schoolsyst_api.settings.get_document(db, user)["_rev"]
+
+        new_settings = schoolsyst_api.settings.update_document(
+            db, user, {"grades_unit": 20}, [revision]
+        )
+        assert new_settings["grades_unit"] == 20
+
+        # The settings were modified since the client got them
+        with raises(HTTPException) as error:
+            schoolsyst_api.settings.update_document(
+                db, user, {"grades_unit": 10}, [revision]
+            )
+        assert error.value.status_code == 412
+        with raises(HTTPException) as error:
+            schoolsyst_api.settings.patch_document(
+                db,
+                user,
+                [PatchOperation(op="replace", path="/grades_unit", value=10)],
+                [revision],
+            )
+        assert error.value.status_code == 412
+        assert db.collection("settings").get(user.key)["grades_unit"] == 20
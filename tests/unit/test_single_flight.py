@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from time import monotonic, sleep
+
+import fastapi.exceptions
+from pytest import raises
+from schoolsyst_api.single_flight import SingleFlight
+
+KEY = ("aaaaaaaaaa", "/courses/2026-10-19/2026-10-26/", "")
+
+
+def test_concurrent_calls_share_one_computation():
+    flights, started, release = SingleFlight(), Event(), Event()
+    calls = []
+
+    def compute() -> list:
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return ["course"]
+
+    with ThreadPoolExecutor(4) as executor:
+        first = executor.submit(flights.do, KEY, compute)
+        started.wait(timeout=5)
+        others = [executor.submit(flights.do, KEY, compute) for _ in range(3)]
+        other_key = flights.do(("bbbbbbbbbb", *KEY[1:]), lambda: ["other"])
+        deadline = monotonic() + 5
+        while flights.stats()["coalesced"] < 3 and monotonic() < deadline:
+            sleep(0.01)
+        release.set()
+        results = [first.result()] + [future.result() for future in others]
+
+    assert results == [["course"]] * 4
+    assert other_key == ["other"]
+    assert len(calls) == 1
+    assert flights.stats() == {"computations": 2, "coalesced": 3, "in_flight": 0}
+
+
+def test_later_calls_compute_again():
+    flights = SingleFlight()
+    assert flights.do(KEY, lambda: 1) == 1
+    assert flights.do(KEY, lambda: 2) == 2
+    assert flights.stats()["coalesced"] == 0
+
+
+def test_errors_are_raised_to_every_caller():
+    flights = SingleFlight()
+
+    def compute():
+        raise fastapi.exceptions.HTTPException(status_code=400)
+
+    with raises(fastapi.exceptions.HTTPException):
+        flights.do(KEY, compute)
+    assert not flights.flights